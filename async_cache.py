@@ -0,0 +1,259 @@
+from typing import Optional, List, Callable, Dict, Any, Awaitable, Iterable, Tuple, Union
+from concurrent.futures import Executor
+import asyncio
+import sys
+import time
+
+from new_adaptive_cache import AdaptiveCache, CachePolicy
+
+
+class AsyncAdaptiveCache:
+    """
+    Front-end asyncio do AdaptiveCache.
+
+    Usa as mesmas estruturas do cache síncrono (dicionário de entradas, LRU, fila
+    de expiração, estimador de frequência, camada de hot keys), acessadas direto
+    do event loop apenas para as trocas de metadados, que são curtas. O que pode
+    bloquear roda num executor: compressão de valores acima do limite,
+    descompressão, promoção para a camada descomprimida e o carregamento
+    preditivo (que lê arquivo). O monitor é uma task no event loop, em vez de um
+    `threading.Timer` novo a cada tick.
+
+    O loop nunca espera pelo lock do cache: se outra thread o segura (recarga,
+    pré-carregamento, camada descomprimida), a operação vai para o executor.
+    Com L2 (`disk_tier`) get/put/delete/lotes sempre rodam no executor, porque
+    leem e gravam arquivos; essa leitura e gravação acontecem fora do lock. Os métodos
+    síncronos (`refresh_policy`, `entry_state`, `stats`...) pegam o lock direto.
+    """
+
+    def __init__(self, max_memory_mb: int, compression_threshold_kb: int,
+                 executor: Optional[Executor] = None, monitor_interval: float = 1.0,
+                 **cache_options: Any):
+        self.cache = AdaptiveCache(max_memory_mb, compression_threshold_kb, start_monitor=False, **cache_options)
+        # None usa o executor padrão do event loop.
+        self.executor = executor
+        self.monitor_interval = monitor_interval
+        self.monitor_task: Optional[asyncio.Task] = None
+        self._closed = False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start()
+
+    def start(self):
+        """Inicia a task do monitor no event loop em execução (idempotente)."""
+        if self.monitor_task is None and not self._closed:
+            self.monitor_task = asyncio.get_running_loop().create_task(self._monitor_access_counts())
+
+    async def _monitor_access_counts(self):
+        while not self._closed:
+            await asyncio.sleep(self.monitor_interval)
+            await self._run_tick(time.time())
+
+    async def _run_tick(self, now: float):
+        # Remover as entradas vencidas só mexe em metadados; o resto vai para o executor.
+        started = time.perf_counter()
+        await self._locked(self.cache._expire_due_entries, now)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.cache._refresh_hot_tier, now)
+        await loop.run_in_executor(self.executor, self.cache.predictive_load)
+        if self.cache.metrics is not None:
+            self.cache.metrics.observe('monitor_tick', time.perf_counter() - started)
+
+    async def _locked(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Roda `function` com o lock do cache sem travar o loop (ver AdaptiveCache._alocked)."""
+        return await self.cache._alocked(self.executor, function, *args)
+
+    async def _call(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Como `_locked`, para métodos do cache que pegam o lock sozinhos."""
+        return await self.cache._acall(self.executor, function, *args)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.cache.cache_data
+
+    def __len__(self) -> int:
+        return len(self.cache.cache_data)
+
+    async def get(self, key: str) -> Optional[str]:
+        if self.cache.metrics is None or not self.cache.metrics.sampled():
+            return await self._get(key)
+        started = time.perf_counter()
+        value = await self._get(key)
+        self.cache.metrics.observe('get', time.perf_counter() - started)
+        return value
+
+    async def _get(self, key: str) -> Optional[str]:
+        return await self.cache._aget(self.executor, key)
+
+    async def put(self, key: str, value: str, policy: Optional[CachePolicy] = None,
+                  tags: Optional[Iterable[str]] = None):
+        if self.cache.metrics is None or not self.cache.metrics.sampled():
+            await self._put(key, value, policy, tags=tags)
+            return
+        started = time.perf_counter()
+        await self._put(key, value, policy, tags=tags)
+        self.cache.metrics.observe('put', time.perf_counter() - started)
+
+    async def _put(self, key: str, value: Any, policy: Optional[CachePolicy], load_time: float = 0.0,
+                   tags: Optional[Iterable[str]] = None):
+        await self.cache._aput(self.executor, key, value, policy, load_time, tags)
+
+    async def get_or_load(self, key: str, loader: Callable[[str], Awaitable[Any]],
+                          policy: Optional[CachePolicy] = None) -> Any:
+        """
+        Lê a chave e, no miss, carrega com `await loader(key)` e grava pelo `put`.
+        Misses concorrentes da mesma chave compartilham um só carregamento.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+        return await self.cache._async_load_flights.do(key, lambda: self._load_and_put(key, loader, policy))
+
+    async def _load_and_put(self, key: str, loader: Callable[[str], Awaitable[Any]],
+                            policy: Optional[CachePolicy]) -> Any:
+        if key in self.cache.cache_data:
+            value = await self.get(key)
+            if value is not None:
+                return value
+        start = time.perf_counter()
+        value = await loader(key)
+        if value is not None:
+            await self._put(key, value, policy, time.perf_counter() - start)
+        return value
+
+    def register_loader(self, loader: Callable[[str], Awaitable[Any]]):
+        """
+        Registra o loader async usado na recarga em background (stale-while-revalidate
+        e XFetch). A recarga roda como corrotina neste event loop.
+        """
+        self.cache.register_loader(self._threadsafe(loader))
+
+    def enable_association_mining(self, loader: Callable[[str], Awaitable[Any]], **options: Any):
+        """Liga a mineração de co-acesso com um loader async (ver AdaptiveCache)."""
+        self.cache.enable_association_mining(self._threadsafe(loader), **options)
+
+    def _threadsafe(self, loader: Callable[[str], Awaitable[Any]]) -> Callable[[str], Any]:
+        # Os pools do cache chamam o loader em outra thread; a corrotina roda no event loop.
+        loop = asyncio.get_running_loop()
+        return lambda key: asyncio.run_coroutine_threadsafe(loader(key), loop).result()
+
+    def refresh_policy(self, key: str, policy: CachePolicy) -> bool:
+        return self.cache.refresh_policy(key, policy)
+
+    def access_count(self, key: str) -> int:
+        return self.cache.access_count(key)
+
+    def entry_state(self, key: str) -> Optional[str]:
+        return self.cache.entry_state(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    def prometheus_text(self, prefix: str = 'adaptive_cache') -> str:
+        return self.cache.prometheus_text(prefix)
+
+    def configure_adaptive_behavior(self, hot_key_threshold: int, enable_predictive_loading: bool, compression_ratio_target: float):
+        self.cache.configure_adaptive_behavior(hot_key_threshold, enable_predictive_loading, compression_ratio_target)
+
+    async def save_snapshot(self, path: str) -> int:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.cache.save_snapshot, path)
+
+    async def load_snapshot(self, path: str, allow_pickle: bool = False) -> int:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.cache.load_snapshot, path,
+                                                                allow_pickle)
+
+    def batch_operation(self) -> 'AsyncBatchOperation':
+        return AsyncBatchOperation(self)
+
+    async def delete(self, key: str) -> bool:
+        return await self._call(self.cache.delete, key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        values = await self._run_batch([('get', key) for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    async def put_many(self, items: Union[Dict[str, Any], Iterable[Tuple[str, Any]]],
+                       policy: Optional[CachePolicy] = None, tags: Optional[Iterable[str]] = None):
+        pairs = items.items() if isinstance(items, dict) else items
+        tags = None if tags is None else tuple(tags) if not isinstance(tags, str) else (tags,)
+        await self._run_batch([('put', key, value, policy, tags) for key, value in pairs])
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        return sum(await self._run_batch([('delete', key) for key in keys]))
+
+    async def invalidate_tag(self, tag: str) -> int:
+        return await self._call(self.cache.invalidate_tag, tag)
+
+    async def invalidate_prefix(self, prefix: str) -> int:
+        return await self._call(self.cache.invalidate_prefix, prefix)
+
+    async def _run_batch(self, operations: List[tuple]) -> List[Any]:
+        # Codifica fora do lock (no executor se houver valor grande), aplica o lote
+        # numa única aquisição (ver _locked) e descomprime os gets no executor.
+        loop = asyncio.get_running_loop()
+        items = [(op[1], op[2]) for op in operations if op[0] == 'put']
+        if any(isinstance(value, (str, bytes)) and sys.getsizeof(value) > self.cache.compression_threshold_kb
+               for _, value in items):
+            encoded = await loop.run_in_executor(self.executor, self.cache._encode_many, items)
+        else:
+            encoded = [(value, None, False) for _, value in items]
+        self.cache._observe_batch(operations)
+        disk_reads = {}
+        if self.cache.disk_tier is not None:
+            disk_reads = await loop.run_in_executor(self.executor, self.cache._read_disk_many, operations)
+        results, pending, deferred = await self._locked(self.cache._apply_batch, operations, encoded, disk_reads)
+        if pending:
+            values = await loop.run_in_executor(
+                self.executor, lambda: [self.cache._decompress_data(*payload) for _, payload in pending])
+            for (index, _), value in zip(pending, values):
+                results[index] = value
+        self.cache._submit_deferred(deferred)
+        return results
+
+    async def close(self):
+        """Para a task do monitor e os pools do cache (sem bloquear o event loop)."""
+        self._closed = True
+        if self.monitor_task is not None:
+            self.monitor_task.cancel()
+            try:
+                await self.monitor_task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.cache.close)
+
+    async def __aenter__(self) -> 'AsyncAdaptiveCache':
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class AsyncBatchOperation:
+    """Versão `async with` do BatchOperation; `results` fica pronto ao sair do bloco."""
+
+    def __init__(self, cache: AsyncAdaptiveCache):
+        self.cache = cache
+        self.operations: List[tuple] = []
+        self.results: List[Any] = []
+
+    def put(self, key: str, value: str, policy: Optional[Any] = None, tags: Optional[Iterable[str]] = None):
+        self.operations.append(('put', key, value, policy, tags))
+
+    def get(self, key: str):
+        self.operations.append(('get', key))
+
+    def delete(self, key: str):
+        self.operations.append(('delete', key))
+
+    def refresh(self, key: str, policy: CachePolicy):
+        self.operations.append(('refresh', key, policy))
+
+    async def __aenter__(self) -> 'AsyncBatchOperation':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.results = await self.cache._run_batch(self.operations)
+        self.operations.clear()
@@ -0,0 +1,129 @@
+"""
+Benchmark de latência do event loop com o cache sob carga mista.
+
+Várias tasks fazem gets e puts (80/20) de valores pequenos e de valores grandes
+compressíveis, enquanto uma task de sonda dorme 1ms em laço e mede o atraso
+com que acorda (lag do event loop). Compara o AdaptiveCache síncrono chamado
+direto das corrotinas com o AsyncAdaptiveCache, que manda compressão e
+descompressão para o executor. Reporta operações concluídas e o lag do loop
+(p50/p99/máx).
+
+`--disk-tier` dá ao cache um L2 em disco e pouca memória, então os puts
+despejam para o disco. `--contention` roda uma thread que segura o lock do
+cache como a recarga e o pré-carregamento em background: lotes de puts com
+`put_many` em laço. O lag medido nesses modos inclui as seções críticas de
+outras threads e do L2.
+
+Uso:
+    python -m benchmarks.bench_async [--tasks 32] [--seconds 3] [--large-kb 1024]
+                                     [--disk-tier] [--contention]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import statistics
+import threading
+import time
+
+from new_adaptive_cache import AdaptiveCache
+from async_cache import AsyncAdaptiveCache
+from disk_tier import DiskTier
+
+
+async def _probe(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+def _background_loads(cache: AdaptiveCache, stop: threading.Event):
+    """Simula recarga/pré-carregamento: lotes de puts vindos de outra thread."""
+    batch = 0
+    while not stop.is_set():
+        cache.put_many({f"prefetch:{batch % 50}:{n}": f"relacionado {n}" * 20 for n in range(200)})
+        batch += 1
+        time.sleep(0.001)
+
+
+async def _run(mode: str, tasks: int, seconds: float, large_kb: int, disk_tier: bool = False,
+               contention: bool = False) -> dict:
+    large = ("produto em promoção " * (large_kb * 1024 // 20 + 1))[:large_kb * 1024]
+    options = dict(max_memory_mb=256, compression_threshold_kb=64)
+    if disk_tier:
+        options.update(max_memory_mb=2, disk_tier=DiskTier(max_disk_mb=512))
+    if mode == 'async':
+        cache = AsyncAdaptiveCache(**options)
+        get, put = cache.get, cache.put
+        sync_cache = cache.cache
+    else:
+        sync_cache = AdaptiveCache(**options)
+        sync_cache.monitor_thread.cancel()
+
+        async def get(key):
+            return sync_cache.get(key)
+
+        async def put(key, value):
+            sync_cache.put(key, value)
+
+    ops = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(rng: random.Random):
+        nonlocal ops
+        while time.perf_counter() < deadline:
+            n = rng.randrange(200)
+            key = f"product:{n}"
+            value = large if n % 10 == 0 else f"produto {n}"
+            if rng.random() < 0.2 or await get(key) is None:
+                await put(key, value)
+            ops += 1
+            await asyncio.sleep(0)
+
+    stop = asyncio.Event()
+    stop_background = threading.Event()
+    background = threading.Thread(target=_background_loads, args=(sync_cache, stop_background), daemon=True)
+    if contention:
+        background.start()
+    lags: list = []
+    probe = asyncio.create_task(_probe(stop, lags))
+    await asyncio.gather(*(worker(random.Random(n)) for n in range(tasks)))
+    stop.set()
+    await probe
+    stop_background.set()
+    if contention:
+        background.join()
+    if mode == 'async':
+        await cache.close()
+    else:
+        sync_cache.close()
+
+    lags.sort()
+    return {
+        'ops': ops,
+        'p50_ms': statistics.median(lags) * 1000,
+        'p99_ms': lags[int(len(lags) * 0.99)] * 1000,
+        'max_ms': lags[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--large-kb', type=int, default=1024)
+    parser.add_argument('--disk-tier', action='store_true')
+    parser.add_argument('--contention', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'modo':<8} {'operações':>10} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag máx ms':>11}")
+    for mode in ('sync', 'async'):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            r = asyncio.run(_run(mode, args.tasks, args.seconds, args.large_kb, args.disk_tier, args.contention))
+        print(f"{mode:<8} {r['ops']:>10} {r['p50_ms']:>11.3f} {r['p99_ms']:>11.2f} {r['max_ms']:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
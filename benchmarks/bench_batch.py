@@ -0,0 +1,79 @@
+"""
+Benchmark do custo por chave das operações em lote contra as unitárias.
+
+Com 10k chaves no cache, lê, grava e remove lotes de `--batch` chaves (200,
+como numa renderização de página) com get/put/delete um a um e com
+get_many/put_many/delete_many, e reporta o custo médio por chave em ns (o
+melhor de 3 rodadas). As chaves removidas são regravadas com put_many nas
+duas colunas, para que cada rodada remova chaves existentes.
+
+Uso:
+    python -m benchmarks.bench_batch [--keys 10000] [--batch 200] [--rounds 200]
+"""
+import argparse
+import random
+import time
+
+from new_adaptive_cache import AdaptiveCache
+
+
+def _ns_per_key(fn, batches, repeat: int = 3) -> float:
+    # Melhor de `repeat` rodadas, para reduzir o ruído.
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for batch in batches:
+            fn(batch)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / sum(len(batch) for batch in batches)
+
+
+def bench(n_keys: int, batch_size: int, rounds: int) -> dict:
+    cache = AdaptiveCache(max_memory_mb=10_000, compression_threshold_kb=1024, start_monitor=False)
+    cache.put_many((f"key:{i}", f"valor {i}") for i in range(n_keys))
+    batches = [random.sample(range(n_keys), batch_size) for _ in range(rounds)]
+    keys = [[f"key:{i}" for i in batch] for batch in batches]
+    items = [[(f"key:{i}", f"valor {i}") for i in batch] for batch in batches]
+
+    def get_single(batch):
+        return {key: cache.get(key) for key in batch}
+
+    def put_single(batch):
+        for key, value in batch:
+            cache.put(key, value)
+
+    def delete_single(batch):
+        for key in batch:
+            cache.delete(key)
+
+    def delete_many(batch):
+        cache.delete_many(batch)
+        cache.put_many((key, "v") for key in batch)
+
+    def delete_then_put(batch):
+        delete_single(batch)
+        cache.put_many((key, "v") for key in batch)
+
+    return {
+        'get': (_ns_per_key(get_single, keys), _ns_per_key(cache.get_many, keys)),
+        'put': (_ns_per_key(put_single, items), _ns_per_key(cache.put_many, items)),
+        'delete+put_many': (_ns_per_key(delete_then_put, keys), _ns_per_key(delete_many, keys)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=10_000)
+    parser.add_argument('--batch', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    result = bench(args.keys, args.batch, args.rounds)
+    print(f"{'operação':<16} {'unitária ns/chave':>18} {'lote ns/chave':>14}")
+    for name, (single, batch) in result.items():
+        print(f"{name:<16} {single:>18.0f} {batch:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
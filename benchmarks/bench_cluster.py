@@ -0,0 +1,108 @@
+"""
+Benchmark de vazão do cluster local (`cluster.py`) de 1 a 8 nós.
+
+Cada nó é um processo com um CacheNode em TCP no localhost e `--memory-mb` de
+memória; `--clients` processos rodam a carga (`benchmarks.workloads`) em
+read-through contra um ClusterClient. Com `--batch N` as leituras vão em
+`get_many` de N chaves (pipeline) e os misses em `put_many`. A capacidade
+total cresce com os nós, então a taxa de acerto também sobe quando o
+conjunto de chaves não cabe num nó só. `--replicate-hot` liga a replicação
+de hot keys (útil com `--workload flash_sale`). Os números dependem dos
+núcleos disponíveis: nós e clientes disputam a mesma CPU.
+
+Uso:
+    python -m benchmarks.bench_cluster [--nodes 1 2 4 8] [--clients 4] [--workload zipf]
+                                       [--keys 50000] [--accesses 20000] [--memory-mb 4]
+                                       [--batch 1] [--replicate-hot]
+"""
+import argparse
+import multiprocessing
+import time
+
+from cluster import CacheNode, ClusterClient
+from benchmarks.workloads import WORKLOADS, payload
+
+
+def _serve(memory_mb: float, ready):
+    node = CacheNode(('127.0.0.1', 0), max_memory_mb=memory_mb, compression_threshold_kb=1)
+    ready.put(node.address)
+    node.serve_forever()
+
+
+def _run_client(addresses, args, seed: int, results):
+    ops = WORKLOADS[args.workload](keys=args.keys, accesses=args.accesses, seed=seed)
+    base = payload(max(op.size for op in ops))
+    gets = hits = 0
+    with ClusterClient(addresses, replicate_hot=args.replicate_hot, hot_refresh_interval=0.5) as client:
+        started = time.perf_counter()
+        for start in range(0, len(ops), args.batch):
+            window = ops[start:start + args.batch]
+            reads = [op for op in window if op.op == 'get']
+            writes = {op.key: base[:op.size] for op in window if op.op == 'put'}
+            if args.batch == 1:
+                for op in reads:
+                    if client.get(op.key) is not None:
+                        hits += 1
+                    else:
+                        writes[op.key] = base[:op.size]
+            elif reads:
+                found = client.get_many(op.key for op in reads)
+                hits += sum(op.key in found for op in reads)
+                writes.update((op.key, base[:op.size]) for op in reads if op.key not in found)
+            gets += len(reads)
+            if args.batch == 1:
+                for key, value in writes.items():
+                    client.put(key, value)
+            elif writes:
+                client.put_many(writes)
+        elapsed = time.perf_counter() - started
+        stats = client.stats()
+    results.put((len(ops), gets, hits, elapsed, [node['entries'] for node in stats.values()]))
+
+
+def run(nodes: int, args):
+    ready = multiprocessing.Queue()
+    servers = [multiprocessing.Process(target=_serve, args=(args.memory_mb, ready), daemon=True) for _ in range(nodes)]
+    for server in servers:
+        server.start()
+    addresses = [ready.get(timeout=30) for _ in servers]
+    results = multiprocessing.Queue()
+    clients = [multiprocessing.Process(target=_run_client, args=(addresses, args, seed, results))
+               for seed in range(1, args.clients + 1)]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    reports = [results.get() for _ in clients]
+    wall = time.perf_counter() - started
+    for process in clients:
+        process.join()
+    for server in servers:
+        server.terminate()
+        server.join()
+    operations = sum(report[0] for report in reports)
+    gets = sum(report[1] for report in reports)
+    hits = sum(report[2] for report in reports)
+    entries = reports[-1][4]
+    return operations / wall, hits / gets if gets else 0.0, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), default='zipf')
+    parser.add_argument('--keys', type=int, default=50000)
+    parser.add_argument('--accesses', type=int, default=20000)
+    parser.add_argument('--memory-mb', type=float, default=4)
+    parser.add_argument('--batch', type=int, default=1)
+    parser.add_argument('--replicate-hot', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'nós':>4} {'ops/s':>10} {'acerto':>8}  entradas por nó")
+    for nodes in args.nodes:
+        throughput, hit_ratio, entries = run(nodes, args)
+        print(f"{nodes:>4} {throughput:>10.0f} {hit_ratio:>8.1%}  {entries}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark de compressão: codec fixo (zlib padrão, sem sonda) vs seleção adaptativa.
+
+Gera uma mistura de payloads JSON, texto e aleatórios acima do
+`compression_threshold_kb` e reporta a latência de put (média e p99) e a
+memória economizada em relação aos tamanhos originais.
+
+Uso:
+    python -m benchmarks.bench_compression [--values 3000] [--size-kb 16]
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import time
+
+from new_adaptive_cache import AdaptiveCache
+
+WORDS = "cache adaptativo chave valor produto tenis meia camiseta pedido cliente entrega preco".split()
+
+
+def make_payloads(count: int, size_kb: int, seed: int = 3):
+    rng = random.Random(seed)
+    size = size_kb * 1024
+    payloads = []
+    for i in range(count):
+        kind = ('json', 'text', 'random')[i % 3]
+        if kind == 'json':
+            items = []
+            while len(json.dumps(items)) < size:
+                items.append({'sku': rng.randrange(10**6), 'nome': rng.choice(WORDS), 'preco': round(rng.random() * 500, 2)})
+            payloads.append((f"product:{i}", json.dumps(items)))
+        elif kind == 'text':
+            payloads.append((f"page:{i}", ' '.join(rng.choice(WORDS) for _ in range(size // 7))))
+        else:
+            payloads.append((f"blob:{i}", os.urandom(size)))
+    return payloads
+
+
+def run(cache: AdaptiveCache, payloads) -> dict:
+    latencies = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for key, value in payloads:
+            start = time.perf_counter()
+            cache.put(key, value)
+            latencies.append(time.perf_counter() - start)
+    original = sum(cache._charge(key, value) for key, value in payloads)
+    latencies.sort()
+    return {
+        'mean_us': statistics.fmean(latencies) * 1e6,
+        'p99_us': latencies[int(len(latencies) * 0.99)] * 1e6,
+        'saved_mb': (original - cache.current_memory_usage) / 2**20,
+        'original_mb': original / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--values', type=int, default=3000)
+    parser.add_argument('--size-kb', type=int, default=16)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.values, args.size_kb)
+    configs = {
+        'zlib fixo, sem sonda': dict(codecs=['zlib-6'], compression_probe=False),
+        'adaptativo (padrão)': dict(),
+        'adaptativo + lzma/bz2': dict(codecs=['zlib-1', 'zlib-6', 'lzma', 'bz2']),
+    }
+    print(f"{'configuração':<24} {'put médio (µs)':>15} {'put p99 (µs)':>13} {'economia (MB)':>14} {'original (MB)':>14}")
+    for name, options in configs.items():
+        cache = AdaptiveCache(max_memory_mb=100_000, compression_threshold_kb=1, **options)
+        cache.monitor_thread.cancel()
+        result = run(cache, payloads)
+        print(f"{name:<24} {result['mean_us']:>15.1f} {result['p99_us']:>13.1f} {result['saved_mb']:>14.2f} {result['original_mb']:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
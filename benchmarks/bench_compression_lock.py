@@ -0,0 +1,89 @@
+"""
+Benchmark da latência de leitura durante puts grandes concorrentes.
+
+Threads leitoras fazem get de chaves pequenas enquanto uma thread escreve
+valores grandes comprimíveis. Compara três modos: compressão sob o lock
+(comportamento antigo, emulado segurando o lock no put), compressão fora do
+lock e compressão em background no pool. Reporta p50/p99 das leituras.
+
+Uso:
+    python -m benchmarks.bench_compression_lock [--value-mb 5] [--puts 20] [--readers 4]
+"""
+import argparse
+import contextlib
+import os
+import random
+import threading
+import time
+
+from new_adaptive_cache import AdaptiveCache
+
+
+class LockedPutCache(AdaptiveCache):
+    """Emula o put antigo: toda a compressão acontece com o lock adquirido."""
+
+    def put(self, key, value, policy=None):
+        with self.lock:
+            super().put(key, value, policy)
+
+
+def run(cache: AdaptiveCache, value: str, puts: int, readers: int) -> dict:
+    for i in range(1000):
+        cache.put(f"small:{i}", "v")
+    stop = threading.Event()
+    latencies = []
+
+    def reader(seed):
+        rng = random.Random(seed)
+        local = []
+        while not stop.is_set():
+            key = f"small:{rng.randrange(1000)}"
+            start = time.perf_counter()
+            cache.get(key)
+            local.append(time.perf_counter() - start)
+        latencies.extend(local)
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    for thread in threads:
+        thread.start()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(puts):
+            cache.put(f"big:{i}", value)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    cache.close()
+
+    latencies.sort()
+    return {
+        'p50_us': latencies[len(latencies) // 2] * 1e6,
+        'p99_us': latencies[int(len(latencies) * 0.99)] * 1e6,
+        'max_ms': latencies[-1] * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--value-mb', type=float, default=5)
+    parser.add_argument('--puts', type=int, default=20)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(9)
+    words = ["pedido", "cliente", "produto", "estoque", "entrega", "preco", "tenis", "meia"]
+    value = ' '.join(rng.choice(words) for _ in range(int(args.value_mb * 2**20 / 7)))
+
+    modes = {
+        'sob o lock (antigo)': lambda: LockedPutCache(max_memory_mb=4096, compression_threshold_kb=1, codecs=['zlib-6']),
+        'fora do lock': lambda: AdaptiveCache(max_memory_mb=4096, compression_threshold_kb=1, codecs=['zlib-6']),
+        'pool em background': lambda: AdaptiveCache(max_memory_mb=4096, compression_threshold_kb=1, codecs=['zlib-6'],
+                                                    compression_workers=2, background_compression_threshold_kb=512),
+    }
+    print(f"{'modo':<22} {'leitura p50 (µs)':>17} {'leitura p99 (µs)':>17} {'máx (ms)':>10}")
+    for name, factory in modes.items():
+        result = run(factory(), value, args.puts, args.readers)
+        print(f"{name:<22} {result['p50_us']:>17.1f} {result['p99_us']:>17.1f} {result['max_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark do segundo nível em disco (L2).
+
+Enche um cache de `--l1-mb` MB com `--keys` valores JSON de ~`--value-kb` KB
+(comprimidos no put), de modo que a maior parte das entradas seja despejada
+para o L2. Mede a latência de `get` (p50/p99, em µs) para: hits no L1, hits no
+L2 (leitura do segmento, promoção de volta ao L1 e descompressão) e misses.
+Para comparar, roda os misses também num cache sem L2.
+
+Uso:
+    python -m benchmarks.bench_disk_tier [--keys 20000] [--value-kb 16] [--l1-mb 32] [--samples 2000]
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import time
+
+from new_adaptive_cache import AdaptiveCache
+from disk_tier import DiskTier
+
+
+def _value(n: int, value_kb: int) -> str:
+    items = [{"id": n * 1000 + i, "name": f"produto {i}", "price": round(random.random() * 100, 2),
+              "tags": random.sample(["novo", "promo", "tenis", "casa", "livro", "jogo"], 3)}
+             for i in range(value_kb * 1024 // 110)]
+    return json.dumps(items)
+
+
+def _measure(cache: AdaptiveCache, keys) -> list:
+    timings = []
+    for key in keys:
+        start = time.perf_counter()
+        cache.get(key)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def _row(label: str, timings: list):
+    if not timings:
+        # Ex.: com poucas chaves tudo cabe no L1 e não há hits no L2 para medir.
+        print(f"{label:<24} {'n/a':>10} {'n/a':>10}")
+        return
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<24} {statistics.median(timings):>10.1f} {p99:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=20000)
+    parser.add_argument('--value-kb', type=int, default=16)
+    parser.add_argument('--l1-mb', type=float, default=32)
+    parser.add_argument('--samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    templates = [_value(n, args.value_kb) for n in range(64)]
+    tier = DiskTier(max_disk_mb=args.keys * args.value_kb / 1024)
+    cache = AdaptiveCache(max_memory_mb=args.l1_mb, compression_threshold_kb=1, start_monitor=False,
+                          disk_tier=tier)
+    plain = AdaptiveCache(max_memory_mb=args.l1_mb, compression_threshold_kb=1, start_monitor=False)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for n in range(args.keys):
+            cache.put(f"key:{n}", f"{n:08d}" + templates[n % len(templates)])
+        tier.flush()
+        in_l1 = list(cache.cache_data)
+        in_l2 = tier.keys()
+        random.shuffle(in_l2)
+        tier_stats = tier.stats()
+
+        l1 = _measure(cache, random.choices(in_l1, k=args.samples) if in_l1 else [])
+        # Cada hit no L2 promove a chave e despeja outra para o disco.
+        l2 = _measure(cache, in_l2[:args.samples])
+        misses = [f"missing:{n}" for n in range(args.samples)]
+        miss = _measure(cache, misses)
+        plain_miss = _measure(plain, misses)
+
+    print(f"{args.keys} chaves, {len(in_l1)} no L1 ({cache.current_memory_usage / 2**20:.1f} MB), "
+          f"{tier_stats['entries']} no L2 ({tier_stats['live_bytes'] / 2**20:.1f} MB em "
+          f"{tier_stats['segments']} segmentos, {tier_stats['flushes']} flushes)")
+    print(f"{'get (µs)':<24} {'p50':>10} {'p99':>10}")
+    _row("hit no L1", l1)
+    _row("hit no L2", l2)
+    _row("miss (com L2)", miss)
+    _row("miss (sem L2)", plain_miss)
+    cache.close()
+    plain.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Harness de hit ratio das políticas de despejo do AdaptiveCache.
+
+Reproduz traces sintéticos em modo read-through (get; no miss, put) com
+entradas de tamanho igual e orçamento para `--capacity` entradas, e compara
+a taxa de acerto de 'lru' (LRU com hot keys protegidas, o comportamento
+original), 'wtinylfu' e 'arc':
+- zipf: popularidade Zipf (s=0.99) sobre `--universe` chaves;
+- scan: o mesmo Zipf intercalado com varreduras de chaves nunca repetidas
+  (importação em lote / crawler), 50% dos acessos;
+- loop: laço sequencial sobre 1,5x a capacidade, o pior caso do LRU.
+
+Uso:
+    python -m benchmarks.bench_eviction [--capacity 1000] [--universe 50000] [--accesses 200000]
+"""
+import argparse
+import contextlib
+import itertools
+import os
+import random
+import sys
+
+from new_adaptive_cache import AdaptiveCache, _ENTRY_OVERHEAD
+
+POLICIES = ('lru', 'wtinylfu', 'arc')
+VALUE = "v" * 100
+
+
+def _zipf_sampler(universe: int, s: float, rng: random.Random):
+    weights = [1 / (rank ** s) for rank in range(1, universe + 1)]
+    cumulative = list(itertools.accumulate(weights))
+    return lambda: f"key:{rng.choices(range(universe), cum_weights=cumulative)[0]}"
+
+
+def zipf_trace(universe: int, accesses: int, seed: int = 1):
+    sample = _zipf_sampler(universe, 0.99, random.Random(seed))
+    return [sample() for _ in range(accesses)]
+
+
+def scan_trace(universe: int, accesses: int, seed: int = 1, scan_length: int = 2000):
+    sample = _zipf_sampler(universe, 0.99, random.Random(seed))
+    trace, scanned = [], itertools.count()
+    while len(trace) < accesses:
+        trace.extend(sample() for _ in range(scan_length))
+        trace.extend(f"scan:{next(scanned)}" for _ in range(scan_length))
+    return trace[:accesses]
+
+
+def loop_trace(capacity: int, accesses: int):
+    span = int(capacity * 1.5)
+    return [f"key:{i % span}" for i in range(accesses)]
+
+
+def hit_ratio(policy: str, trace, capacity: int) -> float:
+    entry = sys.getsizeof("key:00000") + sys.getsizeof(VALUE) + _ENTRY_OVERHEAD
+    cache = AdaptiveCache(max_memory_mb=capacity * entry / (1024 * 1024), compression_threshold_kb=1024,
+                          start_monitor=False, eviction_policy=policy)
+    hits = 0
+    for key in trace:
+        if cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.put(key, VALUE)
+    return hits / len(trace)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--capacity', type=int, default=1000)
+    parser.add_argument('--universe', type=int, default=50_000)
+    parser.add_argument('--accesses', type=int, default=200_000)
+    args = parser.parse_args()
+
+    traces = {
+        'zipf': zipf_trace(args.universe, args.accesses),
+        'scan': scan_trace(args.universe, args.accesses),
+        'loop': loop_trace(args.capacity, args.accesses),
+    }
+    print(f"{'trace':<6} " + " ".join(f"{policy:>9}" for policy in POLICIES))
+    for name, trace in traces.items():
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            ratios = [hit_ratio(policy, trace, args.capacity) for policy in POLICIES]
+        print(f"{name:<6} " + " ".join(f"{ratio:>9.2%}" for ratio in ratios))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark da pausa do monitor de expiração.
+
+Compara o tempo de um tick da varredura antiga (percorre todas as chaves sob o
+lock, checando TTL/TTI/max_access de cada uma) com o tick da ExpirationQueue,
+que só toca nas entradas vencidas. As entradas recebem TTLs espalhados em 1000
+segundos, então cada tick de 1 segundo expira ~0,1% do cache.
+
+Uso:
+    python -m benchmarks.bench_expiration [--entries 1000000] [--ticks 5]
+"""
+import argparse
+import time
+from datetime import timedelta, datetime
+
+from new_adaptive_cache import AdaptiveCache, CachePolicy
+
+
+def _build_cache(entries: int) -> AdaptiveCache:
+    cache = AdaptiveCache(max_memory_mb=100_000, compression_threshold_kb=1024)
+    cache.monitor_thread.cancel()
+    policies = [CachePolicy(ttl=timedelta(seconds=60 + i), tti=timedelta(hours=1)) for i in range(1000)]
+    for i in range(entries):
+        cache.put(f"key:{i}", "v", policy=policies[i % 1000])
+    return cache
+
+
+def legacy_sweep(cache: AdaptiveCache, now: float) -> int:
+    """Reproduz a varredura O(n) antiga (sem remover nada, só o custo de checagem)."""
+    expired = 0
+    now_dt = datetime.fromtimestamp(now)
+    with cache.lock:
+        for key, data_info in cache.cache_data.items():
+            policy = data_info.policy
+            last_access_time = datetime.fromtimestamp(data_info.last_access)
+            if policy.ttl and datetime.fromtimestamp(data_info.creation_time) + policy.ttl < now_dt:
+                expired += 1
+            elif policy.tti and last_access_time + policy.tti < now_dt:
+                expired += 1
+            elif policy.max_access and len(cache.access_timestamps.get(key, ())) >= policy.max_access:
+                expired += 1
+    return expired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--ticks', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Populando {args.entries} entradas...")
+    cache = _build_cache(args.entries)
+    start = time.time()
+
+    print(f"{'tick':>6} {'varredura antiga (ms)':>22} {'heap (ms)':>12} {'expiradas':>10}")
+    for tick in range(args.ticks):
+        now = start + 60 + tick
+        t0 = time.perf_counter()
+        legacy_sweep(cache, now)
+        legacy_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        with cache.lock:
+            expired = cache._expire_due_entries(now)
+        heap_ms = (time.perf_counter() - t0) * 1000
+        print(f"{tick:>6} {legacy_ms:>22.1f} {heap_ms:>12.2f} {expired:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark de memória e precisão dos estimadores de frequência sob carga Zipf.
+
+Simula uma janela de 60 segundos de acessos Zipf e compara o deque de
+timestamps por chave (implementação antiga) com o SlidingWindowCounter e o
+CountMinSketch: memória alocada (tracemalloc), erro relativo médio nas chaves
+mais acessadas e precisão/recall das hot keys no limiar configurado.
+
+Uso:
+    python -m benchmarks.bench_frequency [--keys 100000] [--accesses 1000000] [--zipf 1.1]
+"""
+import argparse
+import itertools
+import random
+import tracemalloc
+from collections import Counter, defaultdict, deque
+
+from frequency import SlidingWindowCounter, CountMinSketch
+
+
+def zipf_keys(n_keys: int, n_accesses: int, s: float, seed: int = 42):
+    rng = random.Random(seed)
+    cum_weights = list(itertools.accumulate(1.0 / (i ** s) for i in range(1, n_keys + 1)))
+    return [f"key:{i}" for i in rng.choices(range(n_keys), cum_weights=cum_weights, k=n_accesses)]
+
+
+def _measure(build):
+    tracemalloc.start()
+    structure = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=100_000)
+    parser.add_argument('--accesses', type=int, default=1_000_000)
+    parser.add_argument('--zipf', type=float, default=1.1)
+    parser.add_argument('--threshold', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=1024)
+    args = parser.parse_args()
+
+    trace = zipf_keys(args.keys, args.accesses, args.zipf)
+    # Espalha os acessos em 59 segundos para ficarem todos na mesma janela.
+    step = 59.0 / len(trace)
+    now = 1_000_000.0 + 59.0
+    exact = Counter(trace)
+    top = [key for key, _ in exact.most_common(100)]
+    real_hot = {key for key, count in exact.items() if count >= args.threshold}
+
+    def build_deques():
+        timestamps = defaultdict(deque)
+        for i, key in enumerate(trace):
+            timestamps[key].append(1_000_000.0 + i * step)
+        return timestamps
+
+    def build(factory):
+        def run():
+            estimator = factory()
+            for i, key in enumerate(trace):
+                estimator.record(key, 1_000_000.0 + i * step)
+            return estimator
+        return run
+
+    print(f"chaves distintas: {len(exact)}, hot keys reais (>= {args.threshold}/min): {len(real_hot)}")
+    print(f"{'estimador':<22} {'memória (MB)':>14} {'erro top-100':>14} {'precisão hot':>14} {'recall hot':>12}")
+    _, deque_bytes = _measure(build_deques)
+    print(f"{'deque de timestamps':<22} {deque_bytes / 2**20:>14.2f} {0.0:>14.3f} {1.0:>14.3f} {1.0:>12.3f}")
+
+    for name, factory in (('SlidingWindowCounter', SlidingWindowCounter),
+                          ('CountMinSketch', lambda: CountMinSketch(top_k=args.top_k))):
+        estimator, used = _measure(build(factory))
+        error = sum(abs(estimator.estimate(k, now) - exact[k]) / exact[k] for k in top) / len(top)
+        detected = {k for k in exact if estimator.is_hot(k, estimator.estimate(k, now), args.threshold)}
+        precision = len(detected & real_hot) / len(detected) if detected else 1.0
+        recall = len(detected & real_hot) / len(real_hot) if real_hot else 1.0
+        print(f"{name:<22} {used / 2**20:>14.2f} {error:>14.3f} {precision:>14.3f} {recall:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark da camada de valores descomprimidos para hot keys.
+
+Mede a latência de get de hot keys comprimidas com a camada desligada
+(cada get descomprime) e ligada (o valor vem pronto da camada).
+
+Uso:
+    python -m benchmarks.bench_hot_tier [--keys 20] [--size-kb 64] [--reads 20000]
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import time
+
+from new_adaptive_cache import AdaptiveCache
+
+
+def run(hot_tier_mb: float, keys: int, size_kb: int, reads: int) -> dict:
+    cache = AdaptiveCache(max_memory_mb=1024, compression_threshold_kb=1, hot_tier_mb=hot_tier_mb)
+    cache.monitor_thread.cancel()
+    cache.configure_adaptive_behavior(hot_key_threshold=10, enable_predictive_loading=False, compression_ratio_target=0.7)
+    rng = random.Random(5)
+    names = [f"product:{i}" for i in range(keys)]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for name in names:
+            items = [{'sku': i, 'nome': f"item {i}", 'estoque': rng.randrange(100)} for i in range(size_kb * 20)]
+            cache.put(name, json.dumps(items))
+    for name in names:
+        for _ in range(10):
+            cache.get(name)
+    cache._run_maintenance(time.time())
+
+    latencies = []
+    for _ in range(reads):
+        name = rng.choice(names)
+        start = time.perf_counter()
+        cache.get(name)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'mean_us': statistics.fmean(latencies) * 1e6,
+        'p99_us': latencies[int(len(latencies) * 0.99)] * 1e6,
+        'tier_entries': len(cache.hot_tier),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=20)
+    parser.add_argument('--size-kb', type=int, default=64)
+    parser.add_argument('--reads', type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'camada':<12} {'get médio (µs)':>15} {'get p99 (µs)':>13} {'entradas na camada':>20}")
+    for name, budget in (('desligada', 0), ('ligada', 64)):
+        result = run(budget, args.keys, args.size_kb, args.reads)
+        print(f"{name:<12} {result['mean_us']:>15.1f} {result['p99_us']:>13.1f} {result['tier_entries']:>20}")
+
+
+if __name__ == '__main__':
+    main()
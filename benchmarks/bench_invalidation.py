@@ -0,0 +1,70 @@
+"""
+Benchmark da invalidação em lote.
+
+Popula o cache com `--entries` chaves `tenant:<t>:item:<i>` (cada uma com a tag
+`tenant:<t>`) e mede, por rodada, o tempo de invalidar um tenant inteiro de
+três formas: varrendo todas as chaves sob o lock (o que era preciso antes dos
+índices), com `invalidate_prefix` e com `invalidate_tag`. Os índices tornam o
+custo proporcional às chaves removidas; a varredura, ao tamanho do cache.
+Também mede quanto os índices custam no put (com e sem tags).
+
+Uso:
+    python -m benchmarks.bench_invalidation [--entries 200000] [--tenants 200] [--rounds 5]
+"""
+import argparse
+import time
+
+from new_adaptive_cache import AdaptiveCache
+
+
+def _populate(cache: AdaptiveCache, entries: int, tenants: int, tagged: bool = True) -> float:
+    started = time.perf_counter()
+    for n in range(entries):
+        tenant = n % tenants
+        cache.put(f"tenant:{tenant}:item:{n}", "v", tags=f"tenant:{tenant}" if tagged else None)
+    return time.perf_counter() - started
+
+
+def scan_invalidate(cache: AdaptiveCache, prefix: str) -> int:
+    """Invalidação sem índice: percorre todas as chaves sob o lock."""
+    with cache.lock:
+        keys = [key for key in cache.cache_data if key.startswith(prefix)]
+        for key in keys:
+            cache._remove_entry(key)
+    return len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=200_000)
+    parser.add_argument('--tenants', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    for tagged in (False, True):
+        cache = AdaptiveCache(max_memory_mb=100_000, compression_threshold_kb=1024, start_monitor=False)
+        seconds = _populate(cache, args.entries, args.tenants, tagged)
+        print(f"put {'com' if tagged else 'sem'} tags: {args.entries / seconds:,.0f} ops/s")
+        cache.close()
+
+    cache = AdaptiveCache(max_memory_mb=100_000, compression_threshold_kb=1024, start_monitor=False)
+    _populate(cache, args.entries, args.tenants)
+    print(f"\n{'rodada':>6} {'varredura (ms)':>15} {'prefixo (ms)':>13} {'tag (ms)':>9} {'removidas':>10}")
+    for tenant in range(min(args.rounds, args.tenants // 3)):
+        t0 = time.perf_counter()
+        removed = scan_invalidate(cache, f"tenant:{3 * tenant}:")
+        scan_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        cache.invalidate_prefix(f"tenant:{3 * tenant + 1}:")
+        prefix_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        cache.invalidate_tag(f"tenant:{3 * tenant + 2}")
+        tag_ms = (time.perf_counter() - t0) * 1000
+        print(f"{tenant:>6} {scan_ms:>15.2f} {prefix_ms:>13.2f} {tag_ms:>9.2f} {removed:>10}")
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
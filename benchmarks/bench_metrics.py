@@ -0,0 +1,83 @@
+"""
+Benchmark do custo das métricas no caminho quente.
+
+Mede a vazão de `get` (hits e misses) e de `put` (valores pequenos e valores
+comprimíveis acima do limite) sem métricas, com `metrics=True` e com as
+latências amostradas (`CacheMetrics(sample_rate=...)`), numa thread e com
+`--threads` threads concorrentes. No fim imprime um trecho do `stats()`.
+
+Uso:
+    python -m benchmarks.bench_metrics [--ops 200000] [--threads 4] [--sample-rate 0.05]
+"""
+import argparse
+import threading
+import time
+
+from new_adaptive_cache import AdaptiveCache
+from metrics import CacheMetrics
+
+
+def _run(cache: AdaptiveCache, operation, keys, threads: int) -> float:
+    chunks = [keys[index::threads] for index in range(threads)]
+    workers = [threading.Thread(target=lambda chunk=chunk: [operation(key) for key in chunk]) for chunk in chunks]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(keys) / (time.perf_counter() - start)
+
+
+def _workloads(cache: AdaptiveCache, args):
+    small = "v" * 64
+    large = "produto tenis promo " * 200
+    hits = [f"key:{n % 10000}" for n in range(args.ops)]
+    misses = [f"missing:{n}" for n in range(args.ops)]
+    large_keys = [f"large:{n % 2000}" for n in range(args.ops // 10)]
+    return [
+        ("put pequeno", lambda key: cache.put(key, small), hits),
+        ("get hit", cache.get, hits),
+        ("get miss", cache.get, misses),
+        ("put comprimido", lambda key: cache.put(key, large), large_keys),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--sample-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    modes = ('off', 'on', 'sampled')
+    results = {}
+    for mode in modes:
+        for threads in (1, args.threads):
+            metrics = {'off': False, 'on': True, 'sampled': CacheMetrics(sample_rate=args.sample_rate)}[mode]
+            cache = AdaptiveCache(max_memory_mb=256, compression_threshold_kb=1, start_monitor=False,
+                                  metrics=metrics)
+            for name, operation, keys in _workloads(cache, args):
+                results[name, threads, mode] = _run(cache, operation, keys, threads)
+            if mode == 'on' and threads == args.threads:
+                stats = cache.stats()
+            cache.close()
+
+    sampled = f"amostra {args.sample_rate:.0%}"
+    print(f"{'operação':<16} {'threads':>7} {'sem métricas':>14} {'com métricas':>14} {'custo':>7} "
+          f"{sampled:>14} {'custo':>7}")
+    for name, threads, mode in results:
+        if mode != 'off':
+            continue
+        off, on, part = (results[name, threads, mode] for mode in modes)
+        print(f"{name:<16} {threads:>7} {off:>12.0f}/s {on:>12.0f}/s {(off - on) / off:>6.1%} "
+              f"{part:>12.0f}/s {(off - part) / off:>6.1%}")
+    print()
+    print(f"hit ratio {stats['hit_ratio']:.2f}, compressões {stats['compressions']}, "
+          f"economia {stats['compression_bytes_saved'] / 2**20:.1f} MB")
+    for name in ('get', 'put', 'lock_wait', 'lock_hold'):
+        latency = stats['latency'][name]
+        print(f"{name:<10} p50 {latency['p50'] * 1e6:>7.0f}µs  p99 {latency['p99'] * 1e6:>7.0f}µs")
+
+
+if __name__ == '__main__':
+    main()
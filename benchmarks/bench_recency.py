@@ -0,0 +1,70 @@
+"""
+Benchmark do índice de recência (LRU) do AdaptiveCache.
+
+Mede a latência por operação de get (hit) e put (sobrescrita) com 1k até 1M
+chaves no cache. Com o RecencyIndex a latência deve ficar plana; para
+comparação, mede também o custo de touch no deque antigo (remove + append).
+
+Uso:
+    python -m benchmarks.bench_recency [--ops 20000] [--sizes 1000,10000,100000,1000000]
+"""
+import argparse
+import random
+import time
+from collections import deque
+
+from new_adaptive_cache import AdaptiveCache
+
+
+def _fill_cache(n_keys: int) -> AdaptiveCache:
+    cache = AdaptiveCache(max_memory_mb=10_000, compression_threshold_kb=1024)
+    cache.monitor_thread.cancel()
+    for i in range(n_keys):
+        cache.put(f"key:{i}", "v")
+    return cache
+
+
+def _ns_per_op(fn, keys) -> float:
+    start = time.perf_counter_ns()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter_ns() - start) / len(keys)
+
+
+def bench_cache(n_keys: int, ops: int) -> dict:
+    cache = _fill_cache(n_keys)
+    keys = [f"key:{random.randrange(n_keys)}" for _ in range(ops)]
+    get_ns = _ns_per_op(cache.get, keys)
+    put_ns = _ns_per_op(lambda k: cache.put(k, "v"), keys)
+    return {'keys': n_keys, 'get_ns': get_ns, 'put_ns': put_ns}
+
+
+def bench_legacy_deque(n_keys: int, ops: int) -> float:
+    """Custo de um touch no deque antigo (remove O(n) + append)."""
+    queue = deque(f"key:{i}" for i in range(n_keys))
+    keys = [f"key:{random.randrange(n_keys)}" for _ in range(ops)]
+
+    def touch(key):
+        queue.remove(key)
+        queue.append(key)
+
+    return _ns_per_op(touch, keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=20_000)
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    args = parser.parse_args()
+
+    print(f"{'chaves':>10} {'get ns/op':>12} {'put ns/op':>12} {'deque touch ns/op':>20}")
+    for n_keys in (int(s) for s in args.sizes.split(',')):
+        result = bench_cache(n_keys, args.ops)
+        # O deque antigo é O(n): limita as operações para o benchmark terminar.
+        legacy_ops = max(10, min(args.ops, 2_000_000_000 // (n_keys * 50)))
+        legacy_ns = bench_legacy_deque(n_keys, legacy_ops)
+        print(f"{n_keys:>10} {result['get_ns']:>12.0f} {result['put_ns']:>12.0f} {legacy_ns:>20.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark de recarga de hot keys: uma chave com TTL curto sob 64 leitores.
+
+Compara três políticas sobre o mesmo backend (que leva `--backend-ms`):
+- `ttl`: TTL puro com `get_or_load`; quando a chave expira, um leitor paga o
+  miss e os outros esperam o mesmo carregamento.
+- `swr`: TTL com `with_stale_while_revalidate`; o valor vencido continua sendo
+  servido enquanto o loader registrado recarrega em background.
+- `xfetch`: TTL com `with_early_refresh`; a recarga começa antes do TTL, com
+  probabilidade que cresce perto do fim.
+
+Cada leitor pausa `--think-ms` entre leituras, como um servidor real, para que
+a disputa pelo GIL não mascare a espera pelo backend. Reporta chamadas ao
+backend, leituras que levaram pelo menos o tempo do backend (isto é, que
+esperaram uma recarga) e a latência de leitura (p50/p99/máx).
+
+Uso:
+    python -m benchmarks.bench_refresh [--readers 64] [--seconds 3] [--ttl-ms 250] [--backend-ms 50] [--think-ms 1]
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from new_adaptive_cache import AdaptiveCache, CachePolicy
+
+KEY = "product:1"
+
+
+def _policy(mode: str, ttl_ms: float) -> CachePolicy:
+    policy = CachePolicy().with_ttl(timedelta(milliseconds=ttl_ms))
+    if mode == 'swr':
+        policy.with_stale_while_revalidate(timedelta(seconds=60))
+    elif mode == 'xfetch':
+        policy.with_early_refresh(beta=1.0)
+    return policy
+
+
+def _run(mode: str, readers: int, seconds: float, ttl_ms: float, backend_ms: float, think_ms: float) -> dict:
+    cache = AdaptiveCache(max_memory_mb=16, compression_threshold_kb=1024)
+    cache.monitor_thread.cancel()
+    policy = _policy(mode, ttl_ms)
+    calls = 0
+    calls_lock = threading.Lock()
+
+    def backend(key):
+        nonlocal calls
+        with calls_lock:
+            calls += 1
+        time.sleep(backend_ms / 1000)
+        return f"valor de {key}"
+
+    if mode != 'ttl':
+        cache.register_loader(backend)
+    cache.get_or_load(KEY, backend, policy)
+
+    barrier = threading.Barrier(readers + 1)
+    latencies = [[] for _ in range(readers)]
+    deadline = [0.0]
+
+    def worker(index):
+        samples = latencies[index]
+        barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            start = time.perf_counter()
+            cache.get_or_load(KEY, backend, policy)
+            samples.append(time.perf_counter() - start)
+            time.sleep(think_ms / 1000)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(readers)]
+    for thread in workers:
+        thread.start()
+    deadline[0] = time.perf_counter() + seconds
+    barrier.wait()
+    for thread in workers:
+        thread.join()
+    cache.close()
+
+    merged = sorted(sample for samples in latencies for sample in samples)
+    return {
+        'calls': calls,
+        'reads': len(merged),
+        'waited': sum(1 for sample in merged if sample >= backend_ms / 1000),
+        'p50_ms': statistics.median(merged) * 1000,
+        'p99_ms': merged[int(len(merged) * 0.99)] * 1000,
+        'max_ms': merged[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--ttl-ms', type=float, default=250)
+    parser.add_argument('--backend-ms', type=float, default=50)
+    parser.add_argument('--think-ms', type=float, default=1)
+    args = parser.parse_args()
+
+    print(f"{'modo':<8} {'chamadas':>9} {'leituras':>10} {'esperaram':>10} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    for mode in ('ttl', 'swr', 'xfetch'):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            r = _run(mode, args.readers, args.seconds, args.ttl_ms, args.backend_ms, args.think_ms)
+        print(f"{mode:<8} {r['calls']:>9} {r['reads']:>10} {r['waited']:>10} "
+              f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
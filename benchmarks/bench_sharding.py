@@ -0,0 +1,67 @@
+"""
+Benchmark de escalabilidade com threads: AdaptiveCache vs ShardedAdaptiveCache.
+
+Cada thread executa uma carga 90% get / 10% put sobre um conjunto fixo de
+chaves; o benchmark reporta a vazão agregada (ops/s) de 1 a 32 threads.
+
+Uso:
+    python -m benchmarks.bench_sharding [--keys 10000] [--ops 20000] [--shards 16]
+"""
+import argparse
+import random
+import threading
+import time
+
+from new_adaptive_cache import AdaptiveCache
+from sharded_cache import ShardedAdaptiveCache
+
+
+def _run(cache, keys, threads: int, ops_per_thread: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        plan = [(rng.random() < 0.9, rng.choice(keys)) for _ in range(ops_per_thread)]
+        barrier.wait()
+        for is_read, key in plan:
+            if is_read:
+                cache.get(key)
+            else:
+                cache.put(key, "v")
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return threads * ops_per_thread / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=10_000)
+    parser.add_argument('--ops', type=int, default=20_000, help='operações por thread')
+    parser.add_argument('--shards', type=int, default=16)
+    args = parser.parse_args()
+
+    keys = [f"key:{i}" for i in range(args.keys)]
+    single = AdaptiveCache(max_memory_mb=1024, compression_threshold_kb=1024)
+    sharded = ShardedAdaptiveCache(max_memory_mb=1024, compression_threshold_kb=1024, shards=args.shards)
+    for key in keys:
+        single.put(key, "v")
+        sharded.put(key, "v")
+
+    print(f"{'threads':>8} {'AdaptiveCache ops/s':>22} {'Sharded ops/s':>16}")
+    for threads in (1, 2, 4, 8, 16, 32):
+        single_ops = _run(single, keys, threads, args.ops)
+        sharded_ops = _run(sharded, keys, threads, args.ops)
+        print(f"{threads:>8} {single_ops:>22,.0f} {sharded_ops:>16,.0f}")
+
+    single.monitor_thread.cancel()
+    sharded.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark do cache em memória compartilhada com vários processos.
+
+Simula workers de um servidor pre-fork: de 1 a 16 processos leem chaves de
+uma distribuição Zipf por `--duration` segundos e, no miss, "carregam" o valor
+do backend (`--backend-ms`) e gravam no cache. Compara um `AdaptiveCache` por
+processo (memória duplicada, cada um aquece sozinho) com um
+`SharedMemoryCache` criado antes do fork. Reporta a vazão agregada, a taxa de
+acerto e a memória total (soma do PSS de todos os processos, que conta uma vez
+as páginas compartilhadas).
+
+Uso:
+    python -m benchmarks.bench_shared_memory [--processes 1 2 4 8 16] [--duration 3] [--keys 20000]
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import random
+import time
+
+from new_adaptive_cache import AdaptiveCache
+from shared_memory_cache import SharedMemoryCache
+
+
+def _pss_mb() -> float:
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _worker(args, shared, seed, done, measured, results):
+    cache = shared if shared is not None else AdaptiveCache(max_memory_mb=args.memory_mb,
+                                                            compression_threshold_kb=args.value_kb * 2,
+                                                            start_monitor=False)
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.keys)]
+    trace = rng.choices(range(args.keys), weights=weights, k=200_000)
+    value = os.urandom(args.value_kb * 1024)
+    ops = hits = 0
+    deadline = time.perf_counter() + args.duration
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        while time.perf_counter() < deadline:
+            key = f"item:{trace[ops % len(trace)]}"
+            if cache.get(key) is None:
+                time.sleep(args.backend_ms / 1000)
+                cache.put(key, value)
+            else:
+                hits += 1
+            ops += 1
+    done.wait()
+    results.put((ops, hits, _pss_mb()))
+    measured.wait()
+
+
+def _run(args, processes: int, shared_mode: bool):
+    context = multiprocessing.get_context('fork')
+    shared = SharedMemoryCache(args.memory_mb, args.value_kb * 2, start_monitor=False) if shared_mode else None
+    done = context.Barrier(processes + 1)
+    measured = context.Barrier(processes + 1)
+    results = context.Queue()
+    workers = [context.Process(target=_worker, args=(args, shared, seed, done, measured, results))
+               for seed in range(processes)]
+    for worker in workers:
+        worker.start()
+    done.wait()
+    parent_pss = _pss_mb()
+    reports = [results.get() for _ in workers]
+    measured.wait()
+    for worker in workers:
+        worker.join()
+    if shared is not None:
+        shared.unlink()
+    ops = sum(report[0] for report in reports)
+    hits = sum(report[1] for report in reports)
+    memory = parent_pss + sum(report[2] for report in reports)
+    return ops / args.duration, hits / max(ops, 1), memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--keys', type=int, default=20000)
+    parser.add_argument('--value-kb', type=int, default=2)
+    parser.add_argument('--memory-mb', type=float, default=64)
+    parser.add_argument('--backend-ms', type=float, default=0.5)
+    parser.add_argument('--zipf', type=float, default=0.9)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.keys} chaves de {args.value_kb} KB, cache de {args.memory_mb:.0f} MB")
+    print(f"{'processos':>9} {'modo':<10} {'ops/s':>10} {'acerto':>8} {'PSS total (MB)':>15}")
+    for processes in args.processes:
+        for label, shared_mode in (('local', False), ('shared', True)):
+            throughput, hit_ratio, memory = _run(args, processes, shared_mode)
+            print(f"{processes:>9} {label:<10} {throughput:>10.0f} {hit_ratio:>8.1%} {memory:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
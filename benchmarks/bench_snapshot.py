@@ -0,0 +1,80 @@
+"""
+Benchmark de restart-to-warm com snapshot.
+
+Enche um cache com `--gb` GB de valores de `--value-kb` KB (incompressíveis,
+para que o uso de memória seja o tamanho dos dados), grava o snapshot e mede,
+num cache novo: o tempo de `load_snapshot` (só o índice), o primeiro `get`, e
+o tempo até ler todas as chaves (cache quente). Para comparar, reenche um
+cache vazio pelo backend (`--backend-ms` por chave, `--concurrency` leitores).
+
+Uso:
+    python -m benchmarks.bench_snapshot [--gb 1] [--value-kb 64] [--backend-ms 10] [--concurrency 32]
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from new_adaptive_cache import AdaptiveCache
+
+
+def _new_cache(gb: float) -> AdaptiveCache:
+    return AdaptiveCache(max_memory_mb=gb * 1024 * 1.1, compression_threshold_kb=16, start_monitor=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gb', type=float, default=1.0)
+    parser.add_argument('--value-kb', type=int, default=64)
+    parser.add_argument('--backend-ms', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    n_keys = int(args.gb * 1024 * 1024 // args.value_kb)
+    values = {f"key:{i}": os.urandom(args.value_kb * 1024) for i in range(n_keys)}
+    cache = _new_cache(args.gb)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        cache.put_many(values)
+    path = os.path.join(tempfile.mkdtemp(), "cache.snap")
+
+    start = time.perf_counter()
+    cache.save_snapshot(path)
+    save_s = time.perf_counter() - start
+    print(f"{n_keys} chaves, {cache.current_memory_usage / 2**30:.2f} GB no cache, "
+          f"snapshot de {os.path.getsize(path) / 2**30:.2f} GB gravado em {save_s:.2f}s")
+    del cache
+
+    start = time.perf_counter()
+    restored = _new_cache(args.gb)
+    restored.load_snapshot(path)
+    load_s = time.perf_counter() - start
+    restored.get("key:0")
+    first_s = time.perf_counter() - start
+    for key in values:
+        restored.get(key)
+    warm_s = time.perf_counter() - start
+    del restored
+
+    def backend(key):
+        time.sleep(args.backend_ms / 1000)
+        return values[key]
+
+    cold = _new_cache(args.gb)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+            ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda key: cold.get_or_load(key, backend), values))
+    cold_s = time.perf_counter() - start
+
+    print(f"{'etapa':<34} {'segundos':>9}")
+    print(f"{'load_snapshot (índice)':<34} {load_s:>9.3f}")
+    print(f"{'primeiro get':<34} {first_s:>9.3f}")
+    print(f"{'todas as chaves lidas (quente)':<34} {warm_s:>9.3f}")
+    print(f"{'reenchimento pelo backend':<34} {cold_s:>9.3f}")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark de cache stampede: uma hot key expira por TTL sob 64 leitores.
+
+Cada leitor lê a mesma chave em laço. No modo ingênuo, todo miss chama o
+backend (que leva `--backend-ms`) e grava com `put`; no modo `get_or_load`,
+os misses concorrentes são agrupados numa única chamada. O benchmark reporta
+as chamadas ao backend e a latência de leitura (p50/p99/máx).
+
+Uso:
+    python -m benchmarks.bench_stampede [--readers 64] [--seconds 3] [--ttl-ms 250] [--backend-ms 20]
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from new_adaptive_cache import AdaptiveCache, CachePolicy
+
+KEY = "product:1"
+
+
+def _run(mode: str, readers: int, seconds: float, ttl_ms: float, backend_ms: float) -> dict:
+    cache = AdaptiveCache(max_memory_mb=16, compression_threshold_kb=1024)
+    cache.monitor_thread.cancel()
+    policy = CachePolicy().with_ttl(timedelta(milliseconds=ttl_ms))
+    calls = 0
+    calls_lock = threading.Lock()
+
+    def backend(key):
+        nonlocal calls
+        with calls_lock:
+            calls += 1
+        time.sleep(backend_ms / 1000)
+        return f"valor de {key}"
+
+    def read():
+        if mode == 'get_or_load':
+            return cache.get_or_load(KEY, backend, policy)
+        value = cache.get(KEY)
+        if value is None:
+            value = backend(KEY)
+            cache.put(KEY, value, policy)
+        return value
+
+    barrier = threading.Barrier(readers + 1)
+    latencies = [[] for _ in range(readers)]
+    deadline = [0.0]
+
+    def worker(index):
+        samples = latencies[index]
+        barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            start = time.perf_counter()
+            read()
+            samples.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(readers)]
+    for thread in workers:
+        thread.start()
+    deadline[0] = time.perf_counter() + seconds
+    barrier.wait()
+    for thread in workers:
+        thread.join()
+
+    merged = sorted(sample for samples in latencies for sample in samples)
+    return {
+        'calls': calls,
+        'reads': len(merged),
+        'p50_ms': statistics.median(merged) * 1000,
+        'p99_ms': merged[int(len(merged) * 0.99)] * 1000,
+        'max_ms': merged[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--ttl-ms', type=float, default=250)
+    parser.add_argument('--backend-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"{'modo':<12} {'chamadas':>9} {'leituras':>10} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    for mode in ('ingênuo', 'get_or_load'):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            r = _run(mode, args.readers, args.seconds, args.ttl_ms, args.backend_ms)
+        print(f"{mode:<12} {r['calls']:>9} {r['reads']:>10} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Teste de estresse da contabilidade de memória.
+
+Executa milhões de operações misturadas (put com sobrescrita, valores
+comprimíveis e incomprimíveis, get, refresh_policy, expiração e despejo sob
+orçamento apertado) e no fim confere o contador incremental contra o total
+recalculado com `verify_memory_accounting`.
+
+Uso:
+    python -m benchmarks.stress_accounting [--ops 2000000] [--keys 5000] [--check-every 100000]
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+from datetime import timedelta
+
+from new_adaptive_cache import AdaptiveCache, CachePolicy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=2_000_000)
+    parser.add_argument('--keys', type=int, default=5_000)
+    parser.add_argument('--check-every', type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    cache = AdaptiveCache(max_memory_mb=2, compression_threshold_kb=1)
+    cache.monitor_thread.cancel()
+    values = ["v", "x" * 3000, os.urandom(1500).hex(), "{'sku': 1, 'nome': 'tenis'}" * 60]
+    policies = [None, CachePolicy().with_ttl(timedelta(seconds=1)),
+                CachePolicy().with_tti(timedelta(seconds=1)), CachePolicy().with_max_access(5)]
+    clock = time.time()
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for step in range(1, args.ops + 1):
+            key = f"k{rng.randrange(args.keys)}"
+            op = rng.random()
+            if op < 0.4:
+                cache.put(key, rng.choice(values), policy=rng.choice(policies))
+            elif op < 0.9:
+                cache.get(key)
+            elif op < 0.99:
+                cache.refresh_policy(key, rng.choice(policies[1:]))
+            else:
+                clock += 0.5
+                with cache.lock:
+                    cache._expire_due_entries(clock)
+            if step % args.check_every == 0:
+                cache.verify_memory_accounting()
+
+    total = cache.verify_memory_accounting()
+    elapsed = time.perf_counter() - start
+    print(f"{args.ops} operações em {elapsed:.1f}s; {len(cache.cache_data)} entradas, "
+          f"{total} bytes contabilizados (orçamento {cache.max_memory_mb}). Contador consistente.")
+
+
+if __name__ == '__main__':
+    main()
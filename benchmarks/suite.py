@@ -0,0 +1,278 @@
+"""
+Suíte de benchmarks reproduzíveis do cache.
+
+Reproduz cargas sintéticas (`benchmarks.workloads`: zipf, scan, flash_sale,
+mixed_sizes) ou um trace gravado com `benchmarks.trace.TraceRecorder` contra as
+configurações escolhidas e reporta, por carga e configuração: vazão, latência
+p50/p99/p999 de get e put, taxa de acerto por requisição e por byte, memória
+contabilizada pelo cache e pausas do monitor. As cargas sintéticas são lidas
+em modo read-through (no miss, put). O monitor não roda em thread: o runner
+chama o tick de manutenção a cada `--tick-every` operações e mede a duração,
+para que duas execuções façam o mesmo trabalho. Cada combinação roda
+`--repeat` vezes e fica a execução de vazão mediana.
+
+`--output` grava o relatório em JSON (com o commit e a versão do Python);
+`--compare` compara com um relatório anterior e termina com status 1 se a
+vazão cair mais que `--tolerance`, se a mediana dos p99 do get entre as
+repetições subir mais que `--latency-tolerance` ou se a taxa de acerto cair.
+
+Piso de ruído: duas execuções do mesmo commit, com `--repeat 3` numa VM de
+1 CPU compartilhada, diferiram em até ~35% de vazão e ~60% de p99 na mesma
+combinação. As tolerâncias padrão (10% de vazão, 50% de p99) só valem numa
+máquina mais quieta que isso; antes de confiar no `--compare`, meça o piso
+rodando o mesmo commit duas vezes com `--tolerance 0 --latency-tolerance 0`
+e, se preciso, aumente `--repeat` e as tolerâncias. `throughput_runs` no
+relatório traz a vazão de cada repetição.
+
+Uso:
+    python -m benchmarks.suite [--workloads zipf scan flash_sale mixed_sizes] [--configs lru wtinylfu arc sharded]
+                               [--keys 20000] [--accesses 100000] [--memory-mb 4] [--threshold-kb 1]
+                               [--tick-every 10000] [--repeat 3] [--trace trace.jsonl]
+                               [--output atual.json] [--compare base.json] [--tolerance 0.1]
+                               [--latency-tolerance 0.5]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from new_adaptive_cache import AdaptiveCache
+from sharded_cache import ShardedAdaptiveCache
+from benchmarks.trace import load_trace
+from benchmarks.workloads import WORKLOADS, Op, payload
+
+CONFIGS: Dict[str, Callable[[float, float], Any]] = {
+    'lru': lambda memory_mb, threshold_kb: AdaptiveCache(memory_mb, threshold_kb, start_monitor=False),
+    'wtinylfu': lambda memory_mb, threshold_kb: AdaptiveCache(memory_mb, threshold_kb, start_monitor=False,
+                                                              eviction_policy='wtinylfu'),
+    'arc': lambda memory_mb, threshold_kb: AdaptiveCache(memory_mb, threshold_kb, start_monitor=False,
+                                                         eviction_policy='arc'),
+    'sharded': lambda memory_mb, threshold_kb: ShardedAdaptiveCache(memory_mb, threshold_kb, shards=4,
+                                                                    start_monitor=False),
+}
+
+# Tolerância padrão de alta do p99 do get no --compare (ver o docstring do módulo).
+LATENCY_TOLERANCE = 0.5
+
+
+def _tick(cache):
+    """O trabalho de um tick do monitor, feito na thread do runner."""
+    now = time.time()
+    for shard in getattr(cache, 'shards', [cache]):
+        shard._run_maintenance(now)
+
+
+def _percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p99/p999 e máximo, em µs."""
+    if not samples:
+        return {'p50': None, 'p99': None, 'p999': None, 'max': None}
+    ordered = sorted(samples)
+    at = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6, 2)
+    return {'p50': at(0.5), 'p99': at(0.99), 'p999': at(0.999), 'max': round(ordered[-1] * 1e6, 2)}
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def replay(cache, ops: List[Op], read_through: bool = True, tick_every: int = 10000) -> Dict[str, Any]:
+    """
+    Executa `ops` em `cache` e devolve as medidas. Os valores são fatias de um
+    mesmo texto (`payload`), preparadas fora do trecho cronometrado.
+    """
+    base = payload(max((op.size for op in ops), default=0))
+    latencies: Dict[str, List[float]] = {'get': [], 'put': [], 'delete': []}
+    pauses: List[float] = []
+    gets = hits = requested_bytes = hit_bytes = 0
+    clock = time.perf_counter
+    started = clock()
+    for n, (op, key, size) in enumerate(ops, 1):
+        if op == 'get':
+            before = clock()
+            value = cache.get(key)
+            latencies['get'].append(clock() - before)
+            gets += 1
+            requested_bytes += size
+            if value is not None:
+                hits += 1
+                hit_bytes += size
+            elif read_through and size:
+                value = base[:size]
+                before = clock()
+                cache.put(key, value)
+                latencies['put'].append(clock() - before)
+        elif op == 'put':
+            value = base[:size]
+            before = clock()
+            cache.put(key, value)
+            latencies['put'].append(clock() - before)
+        else:
+            before = clock()
+            cache.delete(key)
+            latencies['delete'].append(clock() - before)
+        if tick_every and n % tick_every == 0:
+            before = clock()
+            _tick(cache)
+            pauses.append(clock() - before)
+    elapsed = clock() - started
+    stats = cache.stats()
+    return {
+        'operations': len(ops),
+        'seconds': round(elapsed, 4),
+        'throughput': round(len(ops) / elapsed, 1),
+        'latency_us': {op: _percentiles(samples) for op, samples in latencies.items() if samples},
+        'hit_ratio': round(hits / gets, 4) if gets else None,
+        'byte_hit_ratio': round(hit_bytes / requested_bytes, 4) if requested_bytes else None,
+        'memory_bytes': stats['memory_bytes'],
+        'entries': stats['entries'],
+        'rss_mb': _rss_mb(),
+        'monitor_pause_us': _percentiles(pauses),
+    }
+
+
+def run(config: str, ops: List[Op], args, read_through: bool) -> Dict[str, Any]:
+    reports = []
+    for _ in range(args.repeat):
+        cache = CONFIGS[config](args.memory_mb, args.threshold_kb)
+        try:
+            reports.append(replay(cache, ops, read_through, args.tick_every))
+        finally:
+            cache.close()
+    reports.sort(key=lambda report: report['throughput'])
+    median = reports[len(reports) // 2]
+    # O p99 de uma execução varia demais para servir de referência: a comparação
+    # usa a mediana dos p99 das repetições.
+    p99s = sorted(report['latency_us']['get']['p99'] for report in reports if 'get' in report['latency_us'])
+    median['get_p99_median_us'] = p99s[len(p99s) // 2] if p99s else None
+    median['throughput_runs'] = [report['throughput'] for report in reports]
+    return median
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _get_p99(report: Dict[str, Any]) -> Optional[float]:
+    # Relatórios anteriores à mediana entre repetições só têm o p99 da execução mediana.
+    if report.get('get_p99_median_us') is not None:
+        return report['get_p99_median_us']
+    return report['latency_us'].get('get', {}).get('p99')
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float,
+            latency_tolerance: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Compara dois relatórios nas combinações presentes em ambos. Cada linha traz
+    os valores de vazão, p99 do get (mediana das repetições) e taxa de acerto e
+    se houve regressão: vazão caiu mais que `tolerance`, p99 subiu mais que
+    `latency_tolerance` (por padrão, `tolerance`) ou a taxa de acerto caiu.
+    """
+    if latency_tolerance is None:
+        latency_tolerance = tolerance
+    rows = []
+    for workload, configs in current['results'].items():
+        for config, new in configs.items():
+            old = baseline['results'].get(workload, {}).get(config)
+            if old is None:
+                continue
+            old_p99 = _get_p99(old)
+            new_p99 = _get_p99(new)
+            throughput_change = new['throughput'] / old['throughput'] - 1
+            p99_change = new_p99 / old_p99 - 1 if old_p99 and new_p99 else 0.0
+            hit_change = (new['hit_ratio'] or 0) - (old['hit_ratio'] or 0)
+            rows.append({
+                'workload': workload, 'config': config,
+                'throughput': (old['throughput'], new['throughput'], throughput_change),
+                'get_p99_us': (old_p99, new_p99, p99_change),
+                'hit_ratio': (old['hit_ratio'], new['hit_ratio'], hit_change),
+                'regression': throughput_change < -tolerance or p99_change > latency_tolerance or hit_change < -0.001,
+            })
+    return rows
+
+
+def _print_results(results: Dict[str, Dict[str, Any]]):
+    print(f"{'carga':<12} {'config':<9} {'ops/s':>9} {'get p50':>8} {'p99':>7} {'p999':>7} {'put p99':>8} "
+          f"{'acerto':>7} {'byte':>7} {'MB':>6} {'pausa p99':>10} {'máx':>8}")
+    for workload, configs in results.items():
+        for config, report in configs.items():
+            get = report['latency_us'].get('get') or _percentiles([])
+            put = report['latency_us'].get('put', {}).get('p99')
+            pause = report['monitor_pause_us']
+            print(f"{workload:<12} {config:<9} {report['throughput']:>9.0f} {get['p50'] or 0:>8.1f} {get['p99'] or 0:>7.1f} "
+                  f"{get['p999'] or 0:>7.1f} {put or 0:>8.1f} {report['hit_ratio'] or 0:>7.1%} "
+                  f"{report['byte_hit_ratio'] or 0:>7.1%} {report['memory_bytes'] / 2**20:>6.1f} "
+                  f"{(pause['p99'] or 0) / 1000:>8.2f}ms {(pause['max'] or 0) / 1000:>6.2f}ms")
+
+
+def _print_comparison(rows: List[Dict[str, Any]], baseline: Dict[str, Any]):
+    print(f"\ncomparado com {baseline['meta'].get('commit') or 'a base'}:")
+    print(f"{'carga':<12} {'config':<9} {'ops/s':>8} {'get p99':>8} {'acerto':>8}")
+    for row in rows:
+        print(f"{row['workload']:<12} {row['config']:<9} {row['throughput'][2]:>+8.1%} "
+              f"{row['get_p99_us'][2]:>+8.1%} {row['hit_ratio'][2]:>+8.2%}"
+              f"{'  REGRESSÃO' if row['regression'] else ''}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument('--configs', nargs='+', choices=sorted(CONFIGS), default=list(CONFIGS))
+    parser.add_argument('--keys', type=int, default=20000)
+    parser.add_argument('--accesses', type=int, default=100000)
+    parser.add_argument('--memory-mb', type=float, default=4)
+    parser.add_argument('--threshold-kb', type=float, default=1)
+    parser.add_argument('--tick-every', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--trace', help="trace gravado com TraceRecorder (substitui --workloads)")
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    parser.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        workloads = {os.path.basename(args.trace): (load_trace(args.trace), False)}
+    else:
+        workloads = {}
+        for name in args.workloads:
+            options = {'keys': args.keys, 'accesses': args.accesses, 'seed': args.seed}
+            if name == 'mixed_sizes':
+                options['threshold_kb'] = args.threshold_kb
+            workloads[name] = (WORKLOADS[name](**options), True)
+
+    results = {name: {config: run(config, ops, args, read_through) for config in args.configs}
+               for name, (ops, read_through) in workloads.items()}
+    report = {
+        'meta': {'commit': _commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+                 'cpus': os.cpu_count(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'args': vars(args)},
+        'results': results,
+    }
+    _print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as source:
+            baseline = json.load(source)
+        rows = compare(baseline, report, args.tolerance, args.latency_tolerance)
+        _print_comparison(rows, baseline)
+        if any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Gravação e leitura de traces de acesso ao cache.
+
+`TraceRecorder` intercepta `get`, `put` e `delete` de um cache em produção
+(sem mudar quem o chama) e grava uma linha JSON por operação:
+
+    {"t": 0.0123, "op": "get", "key": "product:42", "size": 2048, "hit": true}
+
+`t` é o tempo desde o início da gravação e `size` o tamanho do valor (do valor
+lido, nos hits, e do gravado, nos puts). Os valores em si não são gravados;
+com `hash_keys=True` as chaves também não. `load_trace` devolve as operações
+como `Op` para o runner (`python -m benchmarks.suite --trace arquivo.jsonl`).
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Any, List, Optional
+
+from benchmarks.workloads import Op
+
+
+def value_size(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return len(json.dumps(value, default=str))
+
+
+class TraceRecorder:
+    """
+    Grava as operações de `cache` em `path` enquanto estiver ativo:
+
+        with TraceRecorder(cache, 'trace.jsonl'):
+            app.run()
+    """
+
+    def __init__(self, cache, path: str, hash_keys: bool = False):
+        self.cache = cache
+        self.path = path
+        self.hash_keys = hash_keys
+        self.operations = 0
+        self._file = None
+        self._started = 0.0
+        self._lock = threading.Lock()
+
+    def start(self) -> 'TraceRecorder':
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._started = time.perf_counter()
+        get, put, delete = self.cache.get, self.cache.put, self.cache.delete
+
+        # Atributos da instância escondem os métodos da classe até stop().
+        def recorded_get(key):
+            value = get(key)
+            self._write('get', key, value_size(value), hit=value is not None)
+            return value
+
+        def recorded_put(key, value, policy=None, tags=None):
+            put(key, value, policy, tags)
+            self._write('put', key, value_size(value))
+
+        def recorded_delete(key):
+            removed = delete(key)
+            self._write('delete', key, 0)
+            return removed
+
+        self.cache.get, self.cache.put, self.cache.delete = recorded_get, recorded_put, recorded_delete
+        return self
+
+    def stop(self):
+        for name in ('get', 'put', 'delete'):
+            self.cache.__dict__.pop(name, None)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write(self, op: str, key: str, size: int, hit: Optional[bool] = None):
+        if self.hash_keys:
+            key = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+        event = {'t': round(time.perf_counter() - self._started, 6), 'op': op, 'key': key, 'size': size}
+        if hit is not None:
+            event['hit'] = hit
+        line = json.dumps(event) + '\n'
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+                self.operations += 1
+
+    def __enter__(self) -> 'TraceRecorder':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def load_trace(path: str) -> List[Op]:
+    """
+    Lê um trace gravado. O tamanho de um get em miss é desconhecido na gravação;
+    ele fica com o tamanho da próxima operação da mesma chave que o conheça
+    (normalmente o put do read-through).
+    """
+    with open(path, encoding='utf-8') as trace:
+        events = [json.loads(line) for line in trace if line.strip()]
+    sizes = {}
+    for event in reversed(events):
+        if event['size']:
+            sizes[event['key']] = event['size']
+        elif event['op'] == 'get':
+            event['size'] = sizes.get(event['key'], 0)
+    return [Op(event['op'], event['key'], event['size']) for event in events]
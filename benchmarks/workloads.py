@@ -0,0 +1,100 @@
+"""
+Geradores de cargas sintéticas para a suíte de benchmarks (`benchmarks.suite`).
+
+Cada gerador devolve uma lista de `Op` determinística para a mesma semente.
+As leituras (`get`) são reproduzidas em modo read-through: no miss o runner
+grava um valor de `size` bytes. Os `put` explícitos representam escritas da
+aplicação (ex.: atualização de preço durante uma promoção).
+"""
+import itertools
+import random
+from typing import Callable, Dict, List, NamedTuple
+
+
+class Op(NamedTuple):
+    op: str      # 'get', 'put' ou 'delete'
+    key: str
+    size: int    # bytes do valor (0 quando desconhecido)
+
+
+def _zipf_sampler(universe: int, s: float, rng: random.Random) -> Callable[[], int]:
+    cumulative = list(itertools.accumulate(1 / rank ** s for rank in range(1, universe + 1)))
+    population = range(universe)
+    return lambda: rng.choices(population, cum_weights=cumulative)[0]
+
+
+def zipf(keys: int = 20000, accesses: int = 100000, s: float = 0.99, size: int = 512, seed: int = 1) -> List[Op]:
+    """Popularidade Zipf sobre `keys` chaves, todas com valores de `size` bytes."""
+    sample = _zipf_sampler(keys, s, random.Random(seed))
+    return [Op('get', f"key:{sample()}", size) for _ in range(accesses)]
+
+
+def scan(keys: int = 20000, accesses: int = 100000, scan_length: int = 2000, size: int = 512,
+         seed: int = 1) -> List[Op]:
+    """Zipf intercalado com varreduras de chaves nunca repetidas (importação em lote, crawler)."""
+    sample = _zipf_sampler(keys, 0.99, random.Random(seed))
+    ops, scanned = [], itertools.count()
+    while len(ops) < accesses:
+        ops.extend(Op('get', f"key:{sample()}", size) for _ in range(scan_length))
+        ops.extend(Op('get', f"scan:{next(scanned)}", size) for _ in range(scan_length))
+    return ops[:accesses]
+
+
+def flash_sale(keys: int = 20000, accesses: int = 100000, hot_products: int = 20, bursts: int = 3,
+               burst_share: float = 0.8, size: int = 2048, seed: int = 1) -> List[Op]:
+    """
+    Cenário de Black Friday: tráfego Zipf normal sobre produtos e usuários e, em
+    `bursts` janelas, `burst_share` das leituras vai para `hot_products` ofertas
+    que antes eram frias, com atualizações de preço (put) nelas durante o pico.
+    """
+    rng = random.Random(seed)
+    sample = _zipf_sampler(keys, 0.99, rng)
+    window = accesses // (2 * bursts + 1)
+    ops = []
+    for n in range(accesses):
+        in_burst = (n // window) % 2 == 1 and n // window < 2 * bursts
+        if in_burst and rng.random() < burst_share:
+            key = f"promo:{n // (2 * window)}:{rng.randrange(hot_products)}"
+            ops.append(Op('put' if rng.random() < 0.05 else 'get', key, size))
+        else:
+            rank = sample()
+            if rank % 3 == 0:
+                ops.append(Op('get', f"user:{rank}", size // 4))
+            else:
+                ops.append(Op('get', f"product:{rank}", size))
+    return ops
+
+
+def mixed_sizes(keys: int = 20000, accesses: int = 100000, threshold_kb: float = 1.0, seed: int = 1) -> List[Op]:
+    """Zipf com tamanhos espalhados em torno de `compression_threshold_kb` (de 1/4 a 8 vezes)."""
+    factors = (0.25, 0.5, 0.9, 1.1, 2, 8)
+    rng = random.Random(seed + 1)
+    sizes = [int(threshold_kb * 1024 * rng.choice(factors)) for _ in range(keys)]
+    sample = _zipf_sampler(keys, 0.99, random.Random(seed))
+    ops = []
+    for _ in range(accesses):
+        rank = sample()
+        ops.append(Op('get', f"key:{rank}", sizes[rank]))
+    return ops
+
+
+WORKLOADS: Dict[str, Callable[..., List[Op]]] = {
+    'zipf': zipf,
+    'scan': scan,
+    'flash_sale': flash_sale,
+    'mixed_sizes': mixed_sizes,
+}
+
+_WORDS = ("produto tenis promo preco estoque categoria marca desconto frete cliente "
+          "pedido carrinho avaliacao cor tamanho modelo entrega").split()
+
+
+def payload(size: int, seed: int = 0) -> str:
+    """Texto de `size` caracteres com compressibilidade parecida com JSON de catálogo."""
+    rng = random.Random(seed)
+    parts, length = [], 0
+    while length < size:
+        word = f'"{rng.choice(_WORDS)}":{rng.randrange(100000)},'
+        parts.append(word)
+        length += len(word)
+    return ''.join(parts)[:size]
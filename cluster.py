@@ -0,0 +1,646 @@
+from typing import Optional, List, Dict, Any, Iterable, Set, Tuple, Union
+from bisect import bisect
+import contextlib
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from new_adaptive_cache import AdaptiveCache, CachePolicy
+from snapshot import SnapshotRecord, KIND_PICKLE, encode_value, decode_value
+
+logger = logging.getLogger(__name__)
+
+# Endereço de um nó: (host, porta) para TCP ou o caminho de um socket Unix.
+Address = Union[Tuple[str, int], str]
+
+# Quadro de requisição: operação, tamanho da chave, tamanho do corpo; depois a chave e o corpo.
+_REQUEST = struct.Struct('!BHI')
+# Quadro de resposta: status, tamanho do corpo; depois o corpo.
+_RESPONSE = struct.Struct('!BI')
+# Corpo do PUT: ttl, tti, stale, beta (NaN = sem), max_access (-1 = sem), kind do valor, tamanho das tags.
+_PUT = struct.Struct('!ddddqBH')
+# Entrada exportada (DUMP/LOAD): kind, hot, binary, criação, último acesso, custo do load,
+# ttl, tti, stale, beta, max_access, tamanhos do codec e das tags.
+_ENTRY = struct.Struct('!B??dddddddqHH')
+_COUNT = struct.Struct('!I')
+_KEY_LENGTH = struct.Struct('!H')
+
+OP_GET = 1
+OP_PUT = 2
+OP_DELETE = 3
+OP_HOT_KEYS = 4
+OP_DUMP = 5
+OP_LOAD = 6
+OP_STATS = 7
+OP_INVALIDATE_TAG = 8
+OP_INVALIDATE_PREFIX = 9
+
+STATUS_OK = 0
+STATUS_MISS = 1
+STATUS_ERROR = 2
+
+_TAG_SEPARATOR = '\x00'
+_MAX_KEY_BYTES = 0xFFFF
+_MAX_BODY_BYTES = 0xFFFFFFFF
+
+
+def _nan(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def _policy(ttl: float, tti: float, stale: float, beta: float, max_access: int) -> Optional[CachePolicy]:
+    fields = {name: value for name, value in (('ttl', _optional(ttl)), ('tti', _optional(tti)),
+                                              ('stale_while_revalidate', _optional(stale)),
+                                              ('early_refresh_beta', _optional(beta)))
+              if value is not None}
+    if max_access >= 0:
+        fields['max_access'] = max_access
+    return CachePolicy(**fields) if fields else None
+
+
+def _pack_tags(tags: Optional[Iterable[str]]) -> bytes:
+    if not tags:
+        return b''
+    return _TAG_SEPARATOR.join((tags,) if isinstance(tags, str) else tags).encode('utf-8')
+
+
+def _unpack_tags(raw: bytes) -> Optional[Tuple[str, ...]]:
+    return tuple(raw.decode('utf-8').split(_TAG_SEPARATOR)) if raw else None
+
+
+def _frame(op: int, key: str = '', body: bytes = b'') -> bytes:
+    encoded = key.encode('utf-8')
+    if len(encoded) > _MAX_KEY_BYTES:
+        raise ValueError(f"chave com {len(encoded)} bytes; o protocolo aceita até {_MAX_KEY_BYTES}")
+    if len(body) > _MAX_BODY_BYTES:
+        raise ValueError(f"valor com {len(body)} bytes; o protocolo aceita até {_MAX_BODY_BYTES}")
+    return _REQUEST.pack(op, len(encoded), len(body)) + encoded + body
+
+
+def _put_frame(key: str, value: Any, policy: Optional[CachePolicy], tags: Optional[Iterable[str]],
+               allow_pickle: bool = False) -> bytes:
+    kind, payload = encode_value(value, False)
+    if kind == KIND_PICKLE and not allow_pickle:
+        raise TypeError(f"valor {type(value).__name__} exige pickle; use str/bytes ou allow_pickle=True")
+    policy = policy or CachePolicy()
+    tags = _pack_tags(tags)
+    header = _PUT.pack(_nan(policy.ttl_seconds), _nan(policy.tti_seconds), _nan(policy.stale_seconds),
+                       _nan(policy.early_refresh_beta), -1 if policy.max_access is None else policy.max_access,
+                       kind, len(tags))
+    return _frame(OP_PUT, key, header + tags + payload)
+
+
+def _node_name(address: Address) -> str:
+    return address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+
+
+class HashRing:
+    """
+    Anel de hash consistente com `vnodes` pontos virtuais por nó. Acrescentar
+    ou tirar um nó move só as chaves dos arcos dele (~1/N do total), e os
+    pontos virtuais deixam a carga de cada nó perto da média.
+    """
+
+    def __init__(self, nodes: Iterable[Address] = (), vnodes: int = 160):
+        if vnodes < 1:
+            raise ValueError("vnodes deve ser pelo menos 1")
+        self.vnodes = vnodes
+        self.nodes: List[Address] = []
+        self._points: List[int] = []
+        self._owners: List[Address] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(text: str) -> int:
+        return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def add(self, node: Address):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        name = _node_name(node)
+        ring = list(zip(self._points, self._owners))
+        ring += [(self._hash(f"{name}#{replica}"), node) for replica in range(self.vnodes)]
+        ring.sort(key=lambda point: point[0])
+        self._points = [point for point, _ in ring]
+        self._owners = [owner for _, owner in ring]
+
+    def remove(self, node: Address):
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        ring = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in ring]
+        self._owners = [owner for _, owner in ring]
+
+    def node_for(self, key: str) -> Address:
+        if not self._points:
+            raise LookupError("anel sem nós")
+        return self._owners[bisect(self._points, self._hash(key)) % len(self._points)]
+
+    def nodes_for(self, key: str, count: int) -> List[Address]:
+        """Os `count` primeiros nós distintos no sentido horário a partir da chave (o dono primeiro)."""
+        if not self._points:
+            raise LookupError("anel sem nós")
+        count = min(count, len(self.nodes))
+        found: List[Address] = []
+        index = bisect(self._points, self._hash(key))
+        for step in range(len(self._points)):
+            owner = self._owners[(index + step) % len(self._points)]
+            if owner not in found:
+                found.append(owner)
+                if len(found) == count:
+                    break
+        return found
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """
+    Uma conexão de cliente. Processa todos os quadros completos recebidos de
+    uma vez e devolve as respostas num único envio, então um lote em pipeline
+    custa poucas chamadas de sistema dos dois lados.
+    """
+
+    def setup(self):
+        if self.request.family != socket.AF_UNIX:
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        node: 'CacheNode' = self.server.node
+        buffer = bytearray()
+        while True:
+            try:
+                chunk = self.request.recv(1 << 16)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buffer += chunk
+            responses = bytearray()
+            offset = 0
+            while len(buffer) - offset >= _REQUEST.size:
+                op, key_length, body_length = _REQUEST.unpack_from(buffer, offset)
+                start = offset + _REQUEST.size
+                end = start + key_length + body_length
+                if end > len(buffer):
+                    break
+                key = bytes(buffer[start:start + key_length]).decode('utf-8')
+                status, body = node.handle(op, key, bytes(buffer[start + key_length:end]))
+                responses += _RESPONSE.pack(status, len(body))
+                responses += body
+                offset = end
+            del buffer[:offset]
+            if responses:
+                self.request.sendall(responses)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class CacheNode:
+    """
+    Servidor de um nó do cluster: um AdaptiveCache atrás de um protocolo
+    binário em TCP ou socket Unix (`address` como (host, porta) ou caminho).
+    Cada conexão é atendida por uma thread; com porta 0 o sistema escolhe a
+    porta, disponível em `address` depois de criado. O protocolo não tem
+    autenticação: use só em rede confiável (localhost, rede interna).
+
+    Por padrão o nó só aceita e devolve str/bytes. Valores em pickle (outros
+    tipos) só passam com `allow_pickle=True`, porque desserializar pickle de
+    quem conecta no socket permite executar código como o usuário do nó.
+    """
+
+    def __init__(self, address: Address = ('127.0.0.1', 0), cache: Optional[AdaptiveCache] = None,
+                 max_memory_mb: float = 64, compression_threshold_kb: float = 1, allow_pickle: bool = False,
+                 **cache_options: Any):
+        self.allow_pickle = allow_pickle
+        self.cache = cache if cache is not None else AdaptiveCache(max_memory_mb, compression_threshold_kb,
+                                                                   **cache_options)
+        server_class = _UnixServer if isinstance(address, str) else _TCPServer
+        self._server = server_class(address, _RequestHandler)
+        self._server.node = self
+        self.address: Address = self._server.server_address
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'CacheNode':
+        # Intervalo curto de polling: close() espera o laço notar o shutdown.
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+                                        name=f"cache-node-{_node_name(self.address)}", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Atende na thread atual até `close()` (para processos dedicados a um nó)."""
+        self._server.serve_forever()
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        if isinstance(self.address, str):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.address)
+        self.cache.close()
+
+    def __enter__(self) -> 'CacheNode':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def handle(self, op: int, key: str, body: bytes) -> Tuple[int, bytes]:
+        """Executa uma operação e devolve (status, corpo da resposta)."""
+        try:
+            if op == OP_GET:
+                value = self.cache.get(key)
+                if value is None:
+                    return STATUS_MISS, b''
+                kind, payload = encode_value(value, False)
+                self._check_kind(kind)
+                return STATUS_OK, bytes((kind,)) + payload
+            if op == OP_PUT:
+                ttl, tti, stale, beta, max_access, kind, tags_length = _PUT.unpack_from(body)
+                self._check_kind(kind)
+                start = _PUT.size + tags_length
+                self.cache.put(key, decode_value(kind, body[start:], self.allow_pickle),
+                               _policy(ttl, tti, stale, beta, max_access), tags=_unpack_tags(body[_PUT.size:start]))
+                return STATUS_OK, b''
+            if op == OP_DELETE:
+                return (STATUS_OK if self.cache.delete(key) else STATUS_MISS), b''
+            if op == OP_HOT_KEYS:
+                return STATUS_OK, b''.join(_KEY_LENGTH.pack(len(encoded)) + encoded
+                                           for encoded in (hot.encode('utf-8') for hot in self.hot_keys()))
+            if op == OP_DUMP:
+                return self._dump(key)
+            if op == OP_LOAD:
+                self._load(key, body)
+                return STATUS_OK, b''
+            if op == OP_STATS:
+                return STATUS_OK, json.dumps(self.cache.stats(), default=str).encode('utf-8')
+            if op == OP_INVALIDATE_TAG:
+                return STATUS_OK, _COUNT.pack(self.cache.invalidate_tag(key))
+            if op == OP_INVALIDATE_PREFIX:
+                return STATUS_OK, _COUNT.pack(self.cache.invalidate_prefix(key))
+            return STATUS_ERROR, f"operação desconhecida: {op}".encode('utf-8')
+        except Exception as exc:
+            logger.exception("Erro na operação %s da chave '%s'.", op, key)
+            return STATUS_ERROR, f"{type(exc).__name__}: {exc}".encode('utf-8')
+
+    def _check_kind(self, kind: int):
+        if kind == KIND_PICKLE and not self.allow_pickle:
+            raise ValueError("valores em pickle desativados neste nó (allow_pickle=False)")
+
+    def hot_keys(self) -> List[str]:
+        """Hot keys presentes no nó que continuam acima do limiar."""
+        cache = self.cache
+        now = time.time()
+        with cache.lock:
+            return [key for key in cache.hot_keys if key in cache.cache_data
+                    and cache.frequency_estimator.estimate(key, now) >= cache.hot_key_threshold]
+
+    def _dump(self, key: str) -> Tuple[int, bytes]:
+        # A entrada sai como está (comprimida continua comprimida), com os prazos originais.
+        cache = self.cache
+        with cache.lock:
+            data_info = cache.cache_data.get(key)
+            if data_info is None or cache._expiry_reason(key, data_info, time.time()) is not None:
+                return STATUS_MISS, b''
+            record, payload = cache._entry_record(key, data_info, key in cache.hot_keys)
+            tags = _pack_tags(cache.tag_index.tags(key))
+        self._check_kind(record.kind)
+        codec = (record.codec or '').encode('utf-8')
+        header = _ENTRY.pack(record.kind, record.hot, record.binary, record.creation_time, record.last_access,
+                             record.load_time, _nan(record.ttl), _nan(record.tti),
+                             _nan(record.stale_while_revalidate), _nan(record.early_refresh_beta),
+                             -1 if record.max_access is None else record.max_access, len(codec), len(tags))
+        return STATUS_OK, header + codec + tags + payload
+
+    def _load(self, key: str, body: bytes):
+        (kind, hot, binary, creation_time, last_access, load_time, ttl, tti, stale, beta, max_access,
+         codec_length, tags_length) = _ENTRY.unpack_from(body)
+        self._check_kind(kind)
+        start = _ENTRY.size
+        codec = body[start:start + codec_length].decode('utf-8') or None
+        tags = _unpack_tags(body[start + codec_length:start + codec_length + tags_length])
+        record = SnapshotRecord(key, kind, codec, hot, binary, creation_time, last_access, load_time,
+                                _optional(ttl), _optional(tti), _optional(stale), _optional(beta),
+                                None if max_access < 0 else max_access, 0, 0)
+        with self.cache.lock:
+            self.cache._store_record(key, record, body[start + codec_length + tags_length:], tags, self.allow_pickle)
+        self.cache._write_behind()
+
+
+class _Connection:
+    __slots__ = ('sock', 'reader')
+
+    def __init__(self, address: Address, timeout: float):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(address)
+        else:
+            self.sock = socket.create_connection(address, timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb', buffering=1 << 16)
+
+    def send(self, frames: List[bytes]):
+        self.sock.sendall(b''.join(frames))
+
+    def receive(self, count: int) -> List[Tuple[int, bytes]]:
+        responses = []
+        for _ in range(count):
+            header = self.reader.read(_RESPONSE.size)
+            if len(header) < _RESPONSE.size:
+                raise ConnectionError("o nó fechou a conexão")
+            status, length = _RESPONSE.unpack(header)
+            body = self.reader.read(length) if length else b''
+            if len(body) < length:
+                raise ConnectionError("o nó fechou a conexão")
+            responses.append((status, body))
+        return responses
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class _ConnectionPool:
+    """
+    Conexões ociosas com um nó, reaproveitadas entre chamadas. `size` limita
+    as guardadas, não as abertas: com mais threads que isso, as excedentes
+    abrem conexões que são fechadas ao serem devolvidas.
+    """
+
+    def __init__(self, address: Address, size: int, timeout: float):
+        self.address = address
+        self.size = size
+        self.timeout = timeout
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self):
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = _Connection(self.address, self.timeout)
+        try:
+            yield connection
+        except BaseException:
+            # Uma conexão interrompida no meio de uma troca pode ter respostas pendentes.
+            connection.close()
+            raise
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class ClusterClient:
+    """
+    Cliente de um cluster de CacheNodes: cada chave vai para o nó dono no anel
+    de hash consistente, por conexões reaproveitadas de um pool por nó.
+    `get_many`/`put_many` agrupam as chaves por nó e mandam cada grupo em
+    pipeline (janelas de `pipeline_depth` quadros), com todos os nós
+    trabalhando ao mesmo tempo.
+
+    Com `replicate_hot=True` as hot keys detectadas pelos nós são copiadas
+    para os `replicas` nós seguintes no anel: leituras se espalham entre as
+    cópias e escritas vão para todas, para uma chave de promoção não
+    sobrecarregar um nó só. A lista de hot keys é atualizada pelo monitor a
+    cada `hot_refresh_interval` segundos (ou por `refresh_hot_keys()`); quando
+    a chave esfria, as cópias fora do dono são apagadas. A replicação é de
+    melhor esforço, por cliente: escritas de outro cliente que ainda não sabe
+    que a chave é hot só chegam ao dono até a próxima cópia.
+
+    Como no nó, valores que não são str/bytes (pickle) só são enviados e lidos
+    com `allow_pickle=True`, e o nó também precisa permitir.
+    """
+
+    def __init__(self, nodes: Iterable[Address], vnodes: int = 160, pool_size: int = 8, timeout: float = 5.0,
+                 replicate_hot: bool = False, replicas: int = 2, hot_refresh_interval: float = 1.0,
+                 pipeline_depth: int = 256, start_monitor: bool = True, allow_pickle: bool = False):
+        self.allow_pickle = allow_pickle
+        self.ring = HashRing(nodes, vnodes)
+        self.pools: Dict[Address, _ConnectionPool] = {node: _ConnectionPool(node, pool_size, timeout)
+                                                      for node in self.ring.nodes}
+        self.replicate_hot = replicate_hot
+        self.replicas = replicas
+        self.hot_refresh_interval = hot_refresh_interval
+        self.pipeline_depth = pipeline_depth
+        # Chaves replicadas por este cliente.
+        self.hot_keys: Set[str] = set()
+        self._hot_lock = threading.Lock()
+
+        self.monitor_thread: Optional[threading.Timer] = None
+        self._closed = False
+        if replicate_hot and start_monitor:
+            self._start_hot_monitor()
+
+    def _start_hot_monitor(self):
+        self.monitor_thread = threading.Timer(self.hot_refresh_interval, self._monitor_hot_keys)
+        self.monitor_thread.daemon = True
+        self.monitor_thread.start()
+
+    def _monitor_hot_keys(self):
+        try:
+            self.refresh_hot_keys()
+        except OSError:
+            logger.warning("Falha ao atualizar as hot keys do cluster.", exc_info=True)
+        if not self._closed:
+            self._start_hot_monitor()
+
+    def close(self):
+        self._closed = True
+        if self.monitor_thread is not None:
+            self.monitor_thread.cancel()
+        for pool in self.pools.values():
+            pool.close()
+
+    def __enter__(self) -> 'ClusterClient':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _call(self, node: Address, frames: List[bytes]) -> List[Tuple[int, bytes]]:
+        with self.pools[node].connection() as connection:
+            responses = []
+            for start in range(0, len(frames), self.pipeline_depth):
+                window = frames[start:start + self.pipeline_depth]
+                connection.send(window)
+                responses += connection.receive(len(window))
+        return self._checked(node, responses)
+
+    def _call_all(self, frames_by_node: Dict[Address, List[bytes]]) -> Dict[Address, List[Tuple[int, bytes]]]:
+        """Pipeline em vários nós ao mesmo tempo: envia uma janela a cada nó antes de ler as respostas."""
+        responses: Dict[Address, List[Tuple[int, bytes]]] = {node: [] for node in frames_by_node}
+        with contextlib.ExitStack() as stack:
+            connections = {node: stack.enter_context(self.pools[node].connection()) for node in frames_by_node}
+            longest = max((len(frames) for frames in frames_by_node.values()), default=0)
+            for start in range(0, longest, self.pipeline_depth):
+                windows = {node: frames[start:start + self.pipeline_depth]
+                           for node, frames in frames_by_node.items() if start < len(frames)}
+                for node, window in windows.items():
+                    connections[node].send(window)
+                for node, window in windows.items():
+                    responses[node] += connections[node].receive(len(window))
+        return {node: self._checked(node, node_responses) for node, node_responses in responses.items()}
+
+    @staticmethod
+    def _checked(node: Address, responses: List[Tuple[int, bytes]]) -> List[Tuple[int, bytes]]:
+        for status, body in responses:
+            if status == STATUS_ERROR:
+                raise RuntimeError(f"nó {_node_name(node)}: {body.decode('utf-8', 'replace')}")
+        return responses
+
+    def _value(self, status: int, body: bytes) -> Any:
+        if status != STATUS_OK:
+            return None
+        if body[0] == KIND_PICKLE and not self.allow_pickle:
+            raise ValueError("o nó respondeu com pickle e o cliente não aceita (allow_pickle=False)")
+        return decode_value(body[0], body[1:], self.allow_pickle)
+
+    def _read_node(self, key: str) -> Address:
+        if key in self.hot_keys:
+            return random.choice(self.ring.nodes_for(key, self.replicas))
+        return self.ring.node_for(key)
+
+    def _write_nodes(self, key: str) -> List[Address]:
+        if key in self.hot_keys:
+            return self.ring.nodes_for(key, self.replicas)
+        return [self.ring.node_for(key)]
+
+    def get(self, key: str) -> Any:
+        node = self._read_node(key)
+        value = self._value(*self._call(node, [_frame(OP_GET, key)])[0])
+        if value is None and key in self.hot_keys:
+            # A cópia pode ter sido despejada da réplica; o dono ainda pode ter a chave.
+            owner = self.ring.node_for(key)
+            if owner != node:
+                value = self._value(*self._call(owner, [_frame(OP_GET, key)])[0])
+        return value
+
+    def put(self, key: str, value: Any, policy: Optional[CachePolicy] = None, tags: Optional[Iterable[str]] = None):
+        frame = _put_frame(key, value, policy, tags, self.allow_pickle)
+        for node in self._write_nodes(key):
+            self._call(node, [frame])
+
+    def delete(self, key: str) -> bool:
+        """Remove a chave do dono e, com replicação, das cópias. True se ela existia em algum nó."""
+        nodes = self.ring.nodes_for(key, self.replicas) if self.replicate_hot else [self.ring.node_for(key)]
+        removed = False
+        for node in nodes:
+            removed = self._call(node, [_frame(OP_DELETE, key)])[0][0] == STATUS_OK or removed
+        with self._hot_lock:
+            self.hot_keys.discard(key)
+        return removed
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys_by_node: Dict[Address, List[str]] = {}
+        for key in dict.fromkeys(keys):
+            keys_by_node.setdefault(self._read_node(key), []).append(key)
+        responses = self._call_all({node: [_frame(OP_GET, key) for key in node_keys]
+                                    for node, node_keys in keys_by_node.items()})
+        found = {}
+        for node, node_keys in keys_by_node.items():
+            for key, (status, body) in zip(node_keys, responses[node]):
+                if status == STATUS_OK:
+                    found[key] = self._value(status, body)
+        return found
+
+    def put_many(self, items: Union[Dict[str, Any], Iterable[Tuple[str, Any]]], policy: Optional[CachePolicy] = None,
+                 tags: Optional[Iterable[str]] = None):
+        pairs = items.items() if isinstance(items, dict) else items
+        tags = None if tags is None else tuple(tags) if not isinstance(tags, str) else (tags,)
+        frames_by_node: Dict[Address, List[bytes]] = {}
+        for key, value in pairs:
+            frame = _put_frame(key, value, policy, tags, self.allow_pickle)
+            for node in self._write_nodes(key):
+                frames_by_node.setdefault(node, []).append(frame)
+        self._call_all(frames_by_node)
+
+    def _broadcast(self, op: int, key: str) -> int:
+        responses = self._call_all({node: [_frame(op, key)] for node in self.ring.nodes})
+        return sum(_COUNT.unpack(node_responses[0][1])[0] for node_responses in responses.values())
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Invalida a tag em todos os nós (as cópias de hot keys contam uma vez por nó)."""
+        return self._broadcast(OP_INVALIDATE_TAG, tag)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        return self._broadcast(OP_INVALIDATE_PREFIX, prefix)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """`stats()` de cada nó, por nome do nó."""
+        responses = self._call_all({node: [_frame(OP_STATS)] for node in self.ring.nodes})
+        return {_node_name(node): json.loads(node_responses[0][1]) for node, node_responses in responses.items()}
+
+    def refresh_hot_keys(self) -> Set[str]:
+        """
+        Pergunta as hot keys a todos os nós, copia as novas para as réplicas e
+        apaga as cópias das que esfriaram. Retorna as chaves replicadas agora.
+        """
+        if not self.replicate_hot or self.replicas < 2 or len(self.ring.nodes) < 2:
+            return set()
+        responses = self._call_all({node: [_frame(OP_HOT_KEYS)] for node in self.ring.nodes})
+        reported: Set[str] = set()
+        for node_responses in responses.values():
+            body = node_responses[0][1]
+            offset = 0
+            while offset < len(body):
+                (length,) = _KEY_LENGTH.unpack_from(body, offset)
+                offset += _KEY_LENGTH.size
+                reported.add(body[offset:offset + length].decode('utf-8'))
+                offset += length
+
+        with self._hot_lock:
+            added = reported - self.hot_keys
+            cooled = self.hot_keys - reported
+        replicated = {key for key in added if self._replicate(key)}
+        for key in cooled:
+            for node in self.ring.nodes_for(key, self.replicas)[1:]:
+                self._call(node, [_frame(OP_DELETE, key)])
+        with self._hot_lock:
+            self.hot_keys = (self.hot_keys | replicated) - cooled
+        if replicated or cooled:
+            logger.debug("Hot keys replicadas: +%d, -%d.", len(replicated), len(cooled))
+        return replicated
+
+    def _replicate(self, key: str) -> bool:
+        owner, *copies = self.ring.nodes_for(key, self.replicas)
+        status, entry = self._call(owner, [_frame(OP_DUMP, key)])[0]
+        if status != STATUS_OK:
+            return False
+        for node in copies:
+            self._call(node, [_frame(OP_LOAD, key, entry)])
+        return True
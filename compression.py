@@ -0,0 +1,162 @@
+from typing import Optional, Dict, List, Callable, Tuple
+import bz2
+import lzma
+import random
+import zlib
+
+
+class Codec:
+    """Codec de compressão registrado pelo nome (ex.: 'zlib-6', 'lzma')."""
+
+    __slots__ = ('name', 'compress', 'decompress')
+
+    def __init__(self, name: str, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+    def __repr__(self) -> str:
+        return f"Codec({self.name!r})"
+
+
+CODECS: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec):
+    CODECS[codec.name] = codec
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Codec desconhecido: '{name}'. Disponíveis: {sorted(CODECS)}") from None
+
+
+for _level in (1, 6, 9):
+    register_codec(Codec(f'zlib-{_level}', lambda data, level=_level: zlib.compress(data, level), zlib.decompress))
+register_codec(Codec('lzma', lambda data: lzma.compress(data, preset=1), lzma.decompress))
+register_codec(Codec('bz2', lambda data: bz2.compress(data, 9), bz2.decompress))
+
+try:
+    import lz4.frame
+    register_codec(Codec('lz4', lz4.frame.compress, lz4.frame.decompress))
+except ImportError:
+    pass
+
+try:
+    import zstandard
+    register_codec(Codec('zstd',
+                         lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+                         lambda data: zstandard.ZstdDecompressor().decompress(data)))
+except ImportError:
+    pass
+
+
+def default_codecs() -> List[str]:
+    """Codecs candidatos padrão: zlib rápido e padrão, mais lz4/zstd se instalados."""
+    return [name for name in ('lz4', 'zstd', 'zlib-1', 'zlib-6') if name in CODECS]
+
+
+def probe_compressibility(data: bytes, sample_size: int = 1024, samples: int = 3) -> float:
+    """
+    Estima a razão de compressão comprimindo poucas amostras (início, meio e fim)
+    com zlib nível 1. Custa O(sample_size * samples), independente do tamanho do valor.
+    """
+    if len(data) <= sample_size * samples:
+        sample = data
+    else:
+        step = (len(data) - sample_size) // (samples - 1)
+        sample = b''.join(data[i * step:i * step + sample_size] for i in range(samples))
+    if not sample:
+        return 1.0
+    return len(zlib.compress(sample, 1)) / len(sample)
+
+
+def key_prefix(key: str) -> str:
+    """Prefixo usado para agrupar estatísticas: 'user:123' -> 'user', 'key_tenis' -> 'key'."""
+    if ':' in key:
+        return key.split(':', 1)[0]
+    return key.rsplit('_', 1)[0]
+
+
+class _CodecStats:
+    __slots__ = ('samples', 'bytes_in', 'bytes_out', 'seconds')
+
+    def __init__(self):
+        self.samples = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+    @property
+    def saved_per_us(self) -> float:
+        """Bytes economizados por microssegundo de CPU gasto comprimindo."""
+        return (self.bytes_in - self.bytes_out) / max(self.seconds * 1e6, 1e-3)
+
+
+class CodecSelector:
+    """
+    Escolhe o codec por prefixo de chave aprendendo com as compressões já feitas.
+
+    Cada codec candidato é experimentado `warmup` vezes por prefixo; depois o
+    selecionado é o que mais economiza bytes por microssegundo de CPU entre os
+    que atingem a razão alvo. Com probabilidade `explore` outro codec é
+    experimentado, para acompanhar mudanças no perfil dos dados.
+    """
+
+    def __init__(self, codecs: Optional[List[str]] = None, warmup: int = 3, explore: float = 0.05,
+                 prefix_fn: Callable[[str], str] = key_prefix, max_prefixes: int = 1024):
+        self.codecs = list(codecs) if codecs else default_codecs()
+        for name in self.codecs:
+            get_codec(name)
+        self.warmup = warmup
+        self.explore = explore
+        self.prefix_fn = prefix_fn
+        self.max_prefixes = max_prefixes
+        self._stats: Dict[str, Dict[str, _CodecStats]] = {}
+        self._rng = random.Random()
+
+    def _prefix_stats(self, key: str) -> Dict[str, _CodecStats]:
+        prefix = self.prefix_fn(key)
+        stats = self._stats.get(prefix)
+        if stats is None:
+            if len(self._stats) >= self.max_prefixes:
+                # Limita a memória: prefixos além do limite compartilham as estatísticas.
+                prefix = '*'
+                stats = self._stats.get(prefix)
+            if stats is None:
+                stats = self._stats[prefix] = {name: _CodecStats() for name in self.codecs}
+        return stats
+
+    def choose(self, key: str, ratio_target: float) -> str:
+        stats = self._prefix_stats(key)
+        for name in self.codecs:
+            if stats[name].samples < self.warmup:
+                return name
+        if len(self.codecs) > 1 and self._rng.random() < self.explore:
+            return self._rng.choice(self.codecs)
+        meeting_target = [name for name in self.codecs if stats[name].ratio <= ratio_target]
+        if meeting_target:
+            return max(meeting_target, key=lambda name: stats[name].saved_per_us)
+        return min(self.codecs, key=lambda name: stats[name].ratio)
+
+    def record(self, key: str, codec: str, bytes_in: int, bytes_out: int, seconds: float):
+        stats = self._prefix_stats(key).get(codec)
+        if stats is None:
+            return
+        stats.samples += 1
+        stats.bytes_in += bytes_in
+        stats.bytes_out += bytes_out
+        stats.seconds += seconds
+
+    def report(self) -> Dict[str, Dict[str, Tuple[int, float, float]]]:
+        """Por prefixo e codec: (amostras, razão média, bytes economizados por µs)."""
+        return {
+            prefix: {name: (s.samples, s.ratio, s.saved_per_us) for name, s in stats.items() if s.samples}
+            for prefix, stats in self._stats.items()
+        }
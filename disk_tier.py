@@ -0,0 +1,295 @@
+from typing import Callable, Optional, Dict, List, Tuple
+from collections import OrderedDict
+import os
+import shutil
+import tempfile
+import threading
+
+from snapshot import SnapshotRecord, KIND_PICKLE
+
+
+class _Segment:
+    __slots__ = ('id', 'path', 'fd', 'size', 'live', 'keys', 'buffer', 'written')
+
+    def __init__(self, segment_id: int, path: str):
+        self.id = segment_id
+        self.path = path
+        # Aberto na primeira escrita, por quem segura o lock de I/O.
+        self.fd: Optional[int] = None
+        self.size = 0
+        self.live = 0
+        # Chaves com a versão atual neste segmento: descartá-lo só toca nelas.
+        self.keys: set = set()
+        # Bytes de `written` em diante, ainda não gravados no arquivo.
+        self.buffer = bytearray()
+        self.written = 0
+
+
+class DiskTier:
+    """
+    Segundo nível do cache em disco local: log append-only em segmentos, com
+    índice de offsets em memória mantido em ordem LRU.
+
+    Guarda os payloads exatamente como estavam no cache (comprimidos continuam
+    comprimidos) e os metadados da entrada num SnapshotRecord. As escritas são
+    acumuladas num buffer por segmento e vão para o disco em blocos de
+    `write_buffer_kb`; leituras de entradas ainda no buffer não tocam o disco.
+    Quando os bytes vivos passam de `max_disk_mb` as entradas menos usadas saem
+    do índice, e um segmento sem entradas vivas é apagado. Se o espaço morto
+    nos segmentos (entradas promovidas ou sobrescritas) fizer o total em disco
+    passar de duas vezes o orçamento, o segmento mais antigo é descartado inteiro.
+
+    `put` e `discard` com `write=False` só mexem no índice e nos buffers: a
+    gravação e a remoção de arquivos ficam para `write_pending`, que roda fora
+    do lock do tier. O AdaptiveCache usa isso para não fazer I/O sob o seu lock.
+
+    Valores em pickle (nem str nem bytes) só vão para o disco com
+    `allow_pickle=True`, porque voltam com `pickle.loads`: quem puder escrever
+    em `directory` executaria código no processo. Sem isso eles são
+    descartados no despejo, como se não houvesse L2.
+
+    O conteúdo não sobrevive ao processo; para isso use os snapshots.
+    """
+
+    def __init__(self, max_disk_mb: float = 1024, directory: Optional[str] = None,
+                 segment_mb: float = 64, write_buffer_kb: int = 1024, allow_pickle: bool = False):
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix='adaptive-cache-l2-')
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.segment_bytes = int(segment_mb * 1024 * 1024)
+        self.write_buffer_bytes = write_buffer_kb * 1024
+        self.allow_pickle = allow_pickle
+        # chave -> (segmento, offset, tamanho, registro), da menos para a mais recente.
+        self._index: 'OrderedDict[str, Tuple[_Segment, int, int, SnapshotRecord]]' = OrderedDict()
+        self._segments: Dict[int, _Segment] = {}
+        self._next_segment = 0
+        self._active: Optional[_Segment] = None
+        # Segmentos descartados cujo arquivo ainda não foi fechado e apagado.
+        self._dead: List[_Segment] = []
+        # Há buffer cheio, segmento fechado com buffer ou arquivo para apagar.
+        self._due = False
+        self.live_bytes = 0
+        self.disk_bytes = 0
+        self._lock = threading.Lock()
+        # Serializa as gravações, que rodam sem o _lock; só quem o segura fecha descritores.
+        self._io_lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'demoted': 0, 'dropped': 0, 'flushes': 0}
+        # Avisado (fora do lock) de cada chave descartada por falta de espaço.
+        self.on_drop: Optional[Callable[[str], None]] = None
+        self._roll_segment()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _roll_segment(self):
+        previous = self._active
+        if previous is not None:
+            if previous.live == 0:
+                # Tudo o que o segmento ativo recebeu já foi promovido ou sobrescrito:
+                # _discard não apaga o ativo, então ele sai aqui.
+                self._remove_segment(previous)
+            elif previous.buffer:
+                self._due = True
+        segment = _Segment(self._next_segment, os.path.join(self.directory, f"{self._next_segment:08d}.seg"))
+        self._next_segment += 1
+        self._segments[segment.id] = segment
+        self._active = segment
+
+    def put(self, record: SnapshotRecord, payload: bytes, write: bool = True):
+        """
+        Grava a entrada rebaixada do L1 (substitui a versão anterior da chave).
+        Com `write=False` a gravação no arquivo fica para `write_pending`.
+        """
+        with self._lock:
+            dropped = self._store(record, payload)
+        if self.on_drop is not None:
+            for key in dropped:
+                self.on_drop(key)
+        if write:
+            self.write_pending()
+
+    def _store(self, record: SnapshotRecord, payload: bytes) -> List[str]:
+        self._discard(record.key)
+        if len(payload) > self.max_disk_bytes or (record.kind == KIND_PICKLE and not self.allow_pickle):
+            return [record.key]
+        if self._active.size + len(payload) > self.segment_bytes and self._active.size:
+            self._roll_segment()
+        segment = self._active
+        offset = segment.size
+        segment.buffer += payload
+        segment.size += len(payload)
+        segment.live += len(payload)
+        segment.keys.add(record.key)
+        self.live_bytes += len(payload)
+        self.disk_bytes += len(payload)
+        self._index[record.key] = (segment, offset, len(payload), record)
+        self._metrics['demoted'] += 1
+        if len(segment.buffer) >= self.write_buffer_bytes:
+            self._due = True
+        return self._enforce_budget()
+
+    def _read(self, entry: Tuple[_Segment, int, int, SnapshotRecord]) -> bytes:
+        segment, offset, length, _ = entry
+        if offset >= segment.written:
+            start = offset - segment.written
+            return bytes(segment.buffer[start:start + length])
+        return os.pread(segment.fd, length, offset)
+
+    def read(self, key: str) -> Optional[Tuple[SnapshotRecord, bytes]]:
+        """
+        Lê a entrada sem tirá-la do L2 e retorna (registro, payload). O cache lê
+        fora do seu lock e depois confirma a promoção com `take`.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self._metrics['misses'] += 1
+                return None
+            return entry[3], self._read(entry)
+
+    def take(self, key: str, record: SnapshotRecord) -> bool:
+        """
+        Tira a chave do L2 se ela ainda está na versão de `record` (lida por
+        `read`). Retorna False se ela foi removida ou regravada nesse meio tempo.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or entry[3] is not record:
+                return False
+            self._metrics['hits'] += 1
+            self._discard(key)
+            return True
+
+    def pop(self, key: str) -> Optional[Tuple[SnapshotRecord, bytes]]:
+        """Tira a entrada do L2 (promoção de volta ao L1) e retorna (registro, payload)."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self._metrics['misses'] += 1
+                return None
+            payload = self._read(entry)
+            self._metrics['hits'] += 1
+            self._discard(key)
+        self.write_pending()
+        return entry[3], payload
+
+    def discard(self, key: str, write: bool = True):
+        with self._lock:
+            self._discard(key)
+        if write:
+            self.write_pending()
+
+    def _discard(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return
+        segment, _, length, _ = entry
+        segment.live -= length
+        segment.keys.discard(key)
+        self.live_bytes -= length
+        if segment.live == 0 and segment is not self._active:
+            self._remove_segment(segment)
+
+    def _remove_segment(self, segment: _Segment):
+        # O arquivo é fechado e apagado em write_pending: uma gravação nele pode estar em curso.
+        segment.buffer.clear()
+        self.disk_bytes -= segment.size
+        del self._segments[segment.id]
+        self._dead.append(segment)
+        self._due = True
+
+    def _enforce_budget(self) -> List[str]:
+        """Descarta o que passa do orçamento e retorna as chaves descartadas."""
+        dropped = []
+        while self.live_bytes > self.max_disk_bytes and self._index:
+            key = next(iter(self._index))
+            self._discard(key)
+            dropped.append(key)
+        while self.disk_bytes > 2 * self.max_disk_bytes and len(self._segments) > 1:
+            # Os segmentos entram no dicionário em ordem de id: o primeiro é o mais antigo.
+            oldest = next(iter(self._segments.values()))
+            victims = list(oldest.keys)
+            for key in victims:
+                self._discard(key)
+            dropped += victims
+            if oldest.id in self._segments:
+                self._remove_segment(oldest)
+        self._metrics['dropped'] += len(dropped)
+        return dropped
+
+    def _next_write(self, force: bool) -> Optional[Tuple[_Segment, bytes]]:
+        for segment in self._segments.values():
+            if segment.buffer and (segment is not self._active or force or
+                                   len(segment.buffer) >= self.write_buffer_bytes):
+                return segment, bytes(segment.buffer)
+        return None
+
+    @staticmethod
+    def _delete_files(segments: List[_Segment]):
+        for segment in segments:
+            if segment.fd is not None:
+                os.close(segment.fd)
+            try:
+                os.remove(segment.path)
+            except FileNotFoundError:
+                pass
+
+    def write_pending(self, force: bool = False):
+        """
+        Grava os buffers cheios e os de segmentos já fechados, e apaga os arquivos
+        dos segmentos descartados. Roda sem o lock do tier: leituras e rebaixamentos
+        continuam enquanto o disco escreve. Com `force` grava também o buffer ativo.
+        """
+        if not (self._due or force):
+            return
+        with self._io_lock:
+            while True:
+                with self._lock:
+                    dead, self._dead = self._dead, []
+                    job = self._next_write(force)
+                    if job is None:
+                        self._due = False
+                self._delete_files(dead)
+                if job is None:
+                    return
+                segment, chunk = job
+                if segment.fd is None:
+                    segment.fd = os.open(segment.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+                written = os.write(segment.fd, chunk)
+                with self._lock:
+                    # Antes de avançar `written`, as leituras desse trecho ainda vêm do buffer.
+                    del segment.buffer[:written]
+                    segment.written += written
+                    self._metrics['flushes'] += 1
+
+    def flush(self):
+        """Grava no disco o que ainda está nos buffers."""
+        self.write_pending(force=True)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._index)
+
+    def stats(self) -> Dict[str, int]:
+        """Hits, misses, entradas rebaixadas e descartadas, flushes, entradas e bytes."""
+        with self._lock:
+            return dict(self._metrics, entries=len(self._index), live_bytes=self.live_bytes,
+                        disk_bytes=self.disk_bytes, segments=len(self._segments))
+
+    def close(self):
+        """Fecha e apaga os segmentos (e o diretório, se foi criado pelo tier)."""
+        with self._io_lock:
+            with self._lock:
+                for segment in list(self._segments.values()):
+                    self._remove_segment(segment)
+                self._index.clear()
+                self.live_bytes = 0
+                dead, self._dead = self._dead, []
+                self._due = False
+            self._delete_files(dead)
+            if self._owns_directory:
+                shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,260 @@
+from typing import Optional, Dict, Union
+from collections import OrderedDict, deque
+
+from frequency import CountMinSketch
+
+
+class EvictionPolicy:
+    """
+    Interface das políticas de admissão/despejo plugáveis do AdaptiveCache.
+
+    A política acompanha as chaves residentes com o tamanho cobrado de cada
+    uma e escolhe a próxima vítima quando o orçamento estoura. Todas as
+    chamadas acontecem sob o lock do cache. A política 'lru' (LRU com hot keys
+    protegidas) fica no próprio cache e não usa esta interface.
+    """
+
+    def bind(self, capacity: int):
+        """Associa a política a um cache com `capacity` bytes de orçamento."""
+        if getattr(self, 'capacity', None) is not None:
+            raise ValueError("Esta política de despejo já está em uso por outro cache.")
+        self.capacity = capacity
+
+    def on_insert(self, key: str, size: int, now: float):
+        """
+        Chave inserida com `size` bytes. Numa sobrescrita o cache chama
+        `on_remove` antes, para a chave não ser a vítima do próprio put.
+        """
+        raise NotImplementedError
+
+    def on_access(self, key: str, now: float):
+        """Hit na chave (o mesmo ponto em que o cache conta acessos)."""
+        raise NotImplementedError
+
+    def on_miss(self, key: str, now: float):
+        """Leitura de uma chave que não está no cache."""
+
+    def on_remove(self, key: str):
+        """A chave saiu do cache (remoção, expiração ou despejo)."""
+        raise NotImplementedError
+
+    def victim(self) -> Optional[str]:
+        """Escolhe a próxima chave a despejar e a tira da política (None se vazia)."""
+        raise NotImplementedError
+
+
+class _Segment:
+    """Fila LRU de chaves com o total de bytes, para os segmentos das políticas."""
+
+    __slots__ = ('keys', 'bytes')
+
+    def __init__(self):
+        self.keys: 'OrderedDict[str, int]' = OrderedDict()
+        self.bytes = 0
+
+    def add(self, key: str, size: int):
+        self.keys[key] = size
+        self.bytes += size
+
+    def pop(self, key: str) -> Optional[int]:
+        size = self.keys.pop(key, None)
+        if size is not None:
+            self.bytes -= size
+        return size
+
+    def pop_oldest(self) -> Optional[str]:
+        if not self.keys:
+            return None
+        key, size = self.keys.popitem(last=False)
+        self.bytes -= size
+        return key
+
+    def oldest(self) -> Optional[str]:
+        return next(iter(self.keys), None)
+
+    def touch(self, key: str):
+        self.keys.move_to_end(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class WTinyLFU(EvictionPolicy):
+    """
+    W-TinyLFU: janela de admissão LRU pequena na frente de um espaço principal
+    SLRU (probation + protected), com um Count-Min Sketch de frequência.
+
+    Toda chave nova entra na janela. Quem transborda da janela vira candidata
+    em probation e, na hora de despejar, disputa com a vítima LRU de probation:
+    fica a mais frequente no sketch. Um hit em probation promove a chave para
+    protected. Assim uma varredura (chaves vistas uma vez) não expulsa as
+    chaves mornas. O sketch conta hits, misses e inserções e envelhece por
+    janela de tempo, sem memória por chave.
+    """
+
+    def __init__(self, window_fraction: float = 0.01, protected_fraction: float = 0.8,
+                 sketch: Optional[CountMinSketch] = None):
+        self.window_fraction = window_fraction
+        self.protected_fraction = protected_fraction
+        self.sketch = sketch or CountMinSketch(top_k=0)
+        self.capacity: Optional[int] = None
+        self.window = _Segment()
+        self.probation = _Segment()
+        self.protected = _Segment()
+        # Chaves que acabaram de sair da janela e ainda disputam a admissão.
+        self._candidates: 'deque[str]' = deque()
+        self._now = 0.0
+
+    def bind(self, capacity: int):
+        super().bind(capacity)
+        self.window_budget = max(1, int(capacity * self.window_fraction))
+        self.protected_budget = int((capacity - self.window_budget) * self.protected_fraction)
+
+    def _frequency(self, key: str) -> int:
+        return self.sketch.estimate(key, self._now)
+
+    def on_insert(self, key: str, size: int, now: float):
+        self._now = now
+        self.sketch.record(key, now)
+        for segment in (self.window, self.probation, self.protected):
+            if segment.pop(key) is not None:
+                # Sobrescrita: mantém o segmento, com o novo tamanho.
+                segment.add(key, size)
+                self._rebalance()
+                return
+        self.window.add(key, size)
+        self._candidates.clear()
+        while self.window.bytes > self.window_budget and len(self.window) > 1:
+            candidate = self.window.oldest()
+            self.probation.add(candidate, self.window.pop(candidate))
+            self._candidates.append(candidate)
+
+    def on_access(self, key: str, now: float):
+        self._now = now
+        self.sketch.record(key, now)
+        if key in self.window:
+            self.window.touch(key)
+        elif key in self.protected:
+            self.protected.touch(key)
+        elif key in self.probation:
+            self.protected.add(key, self.probation.pop(key))
+            self._rebalance()
+
+    def on_miss(self, key: str, now: float):
+        self._now = now
+        self.sketch.record(key, now)
+
+    def _rebalance(self):
+        # Protected acima do orçamento devolve as mais antigas para probation.
+        while self.protected.bytes > self.protected_budget and len(self.protected) > 1:
+            key = self.protected.oldest()
+            self.probation.add(key, self.protected.pop(key))
+
+    def on_remove(self, key: str):
+        for segment in (self.window, self.probation, self.protected):
+            if segment.pop(key) is not None:
+                return
+
+    def victim(self) -> Optional[str]:
+        candidate = None
+        while self._candidates and candidate is None:
+            key = self._candidates.popleft()
+            if key in self.probation:
+                candidate = key
+        victim = self.probation.oldest()
+        if candidate is not None and victim != candidate:
+            # Admissão TinyLFU: despeja a menos frequente; no empate, a candidata.
+            if self._frequency(candidate) > self._frequency(victim):
+                self._candidates.appendleft(candidate)
+            else:
+                victim = candidate
+        for segment in (self.probation, self.protected, self.window):
+            if victim is None:
+                victim = segment.oldest()
+            if victim is not None and segment.pop(victim) is not None:
+                return victim
+        return None
+
+
+class ARC(EvictionPolicy):
+    """
+    Adaptive Replacement Cache em bytes: T1 (vistas uma vez) e T2 (vistas de
+    novo) residentes, mais as listas fantasmas B1 e B2 com as chaves despejadas
+    de cada uma. Um put de chave que está em B1 aumenta o alvo `p` de T1; em
+    B2, diminui. O despejo sai de T1 enquanto ela estiver acima de `p`.
+    """
+
+    def __init__(self):
+        self.capacity: Optional[int] = None
+        self.p = 0
+        self.t1 = _Segment()
+        self.t2 = _Segment()
+        self.b1 = _Segment()
+        self.b2 = _Segment()
+
+    def on_insert(self, key: str, size: int, now: float):
+        for segment in (self.t1, self.t2):
+            if segment.pop(key) is not None:
+                self.t2.add(key, size)
+                return
+        if self.b1.pop(key) is not None:
+            self.p = min(self.capacity, self.p + max(size, size * self.b2.bytes // max(self.b1.bytes, 1)))
+            self.t2.add(key, size)
+        elif self.b2.pop(key) is not None:
+            self.p = max(0, self.p - max(size, size * self.b1.bytes // max(self.b2.bytes, 1)))
+            self.t2.add(key, size)
+        else:
+            self.t1.add(key, size)
+        self._trim_ghosts()
+
+    def on_access(self, key: str, now: float):
+        size = self.t1.pop(key)
+        if size is not None:
+            self.t2.add(key, size)
+        elif key in self.t2:
+            self.t2.touch(key)
+
+    def on_remove(self, key: str):
+        if self.t1.pop(key) is None:
+            self.t2.pop(key)
+
+    def _trim_ghosts(self):
+        while self.b1.bytes and self.t1.bytes + self.b1.bytes > self.capacity:
+            self.b1.pop_oldest()
+        while self.b2.bytes and self.t1.bytes + self.t2.bytes + self.b1.bytes + self.b2.bytes > 2 * self.capacity:
+            self.b2.pop_oldest()
+
+    def victim(self) -> Optional[str]:
+        if self.t1 and (self.t1.bytes > self.p or not self.t2):
+            source, ghosts = self.t1, self.b1
+        elif self.t2:
+            source, ghosts = self.t2, self.b2
+        else:
+            return None
+        key = source.oldest()
+        ghosts.add(key, source.pop(key))
+        self._trim_ghosts()
+        return key
+
+
+EVICTION_POLICIES: Dict[str, type] = {'wtinylfu': WTinyLFU, 'arc': ARC}
+
+
+def make_eviction_policy(spec: Union[str, EvictionPolicy, None]) -> Optional[EvictionPolicy]:
+    """
+    Resolve `eviction_policy` do cache: 'lru' (ou None) mantém o LRU com hot keys
+    do próprio cache; 'wtinylfu' e 'arc' criam a política; uma instância de
+    EvictionPolicy é usada como está.
+    """
+    if spec is None or spec == 'lru':
+        return None
+    if isinstance(spec, EvictionPolicy):
+        return spec
+    try:
+        return EVICTION_POLICIES[spec]()
+    except KeyError:
+        raise ValueError(f"Política de despejo desconhecida: '{spec}'. "
+                         f"Disponíveis: {['lru'] + sorted(EVICTION_POLICIES)}") from None
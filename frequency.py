@@ -0,0 +1,193 @@
+from typing import Optional, Dict, List, Tuple
+from array import array
+import heapq
+import random
+import sys
+
+
+class FrequencyEstimator:
+    """
+    Interface dos estimadores de frequência de acesso usados pelo AdaptiveCache.
+
+    Todos estimam quantos acessos a chave recebeu na janela deslizante
+    (60 segundos por padrão), que é a unidade de `hot_key_threshold` e de
+    `max_access`. As chamadas acontecem sob o lock do cache.
+    """
+
+    def record(self, key: str, now: float) -> int:
+        """Registra um acesso e retorna a contagem estimada na janela."""
+        raise NotImplementedError
+
+    def estimate(self, key: str, now: float) -> int:
+        """Retorna a contagem estimada na janela sem registrar acesso."""
+        raise NotImplementedError
+
+    def forget(self, key: str):
+        """Descarta o estado da chave (chamado quando ela sai do cache)."""
+
+    def is_hot(self, key: str, count: int, threshold: int) -> bool:
+        return count >= threshold
+
+    def memory_usage(self) -> int:
+        """Estimativa em bytes da memória usada pelo estimador."""
+        raise NotImplementedError
+
+
+class _Window:
+    __slots__ = ('counts', 'epoch', 'total')
+
+    def __init__(self, buckets: int, epoch: int):
+        self.counts = array('I', bytes(4 * buckets))
+        self.epoch = epoch
+        self.total = 0
+
+
+class SlidingWindowCounter(FrequencyEstimator):
+    """
+    Contadores por chave em baldes de tempo fixos (60 baldes de 1 segundo por padrão).
+
+    A memória por chave é constante, não importa quantos acessos ela receba.
+    """
+
+    def __init__(self, window_seconds: float = 60, buckets: int = 60):
+        self.buckets = buckets
+        self.bucket_width = window_seconds / buckets
+        self._windows: Dict[str, _Window] = {}
+
+    def _advance(self, window: _Window, epoch: int):
+        """Zera os baldes que saíram da janela desde o último acesso."""
+        gap = epoch - window.epoch
+        if gap <= 0:
+            return
+        counts = window.counts
+        if gap >= self.buckets:
+            for i in range(self.buckets):
+                counts[i] = 0
+            window.total = 0
+        else:
+            for e in range(window.epoch + 1, epoch + 1):
+                i = e % self.buckets
+                window.total -= counts[i]
+                counts[i] = 0
+        window.epoch = epoch
+
+    def record(self, key: str, now: float) -> int:
+        epoch = int(now / self.bucket_width)
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = _Window(self.buckets, epoch)
+        else:
+            self._advance(window, epoch)
+        window.counts[epoch % self.buckets] += 1
+        window.total += 1
+        return window.total
+
+    def estimate(self, key: str, now: float) -> int:
+        window = self._windows.get(key)
+        if window is None:
+            return 0
+        self._advance(window, int(now / self.bucket_width))
+        return window.total
+
+    def forget(self, key: str):
+        self._windows.pop(key, None)
+
+    def memory_usage(self) -> int:
+        per_window = sys.getsizeof(_Window(self.buckets, 0)) + sys.getsizeof(array('I', bytes(4 * self.buckets)))
+        return sys.getsizeof(self._windows) + len(self._windows) * per_window
+
+
+class CountMinSketch(FrequencyEstimator):
+    """
+    Count-Min Sketch global com envelhecimento periódico e heap top-k.
+
+    A cada janela o sketch atual vira o anterior e um novo começa zerado; a
+    estimativa soma o atual com a fração do anterior que ainda cai na janela
+    deslizante. A memória é fixa (`depth * width` contadores, duas gerações).
+    Só as `top_k` chaves mais frequentes podem virar hot keys, o que limita o
+    efeito das superestimativas do sketch.
+    """
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4, window_seconds: float = 60, top_k: int = 256):
+        self.width = width
+        self.depth = depth
+        self.window_seconds = window_seconds
+        self.top_k = top_k
+        self._current = self._new_table()
+        self._previous = self._new_table()
+        self._window_start: Optional[float] = None
+        self._salt = random.getrandbits(32)
+        self._top: Dict[str, int] = {}
+        self._top_heap: List[Tuple[int, str]] = []
+
+    def _new_table(self) -> List[array]:
+        return [array('I', bytes(4 * self.width)) for _ in range(self.depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        # Double hashing (Kirsch-Mitzenmacher): depth índices a partir de dois hashes.
+        h1 = hash(key)
+        h2 = hash((key, self._salt)) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def _age(self, now: float) -> float:
+        """Roda as gerações se a janela acabou. Retorna a fração decorrida da janela atual."""
+        if self._window_start is None:
+            self._window_start = now
+        elapsed = now - self._window_start
+        if elapsed >= self.window_seconds:
+            windows = int(elapsed // self.window_seconds)
+            self._previous = self._current if windows == 1 else self._new_table()
+            self._current = self._new_table()
+            self._window_start += windows * self.window_seconds
+            elapsed -= windows * self.window_seconds
+        return elapsed / self.window_seconds
+
+    def _estimate(self, indexes: List[int], fraction: float) -> int:
+        weight = 1.0 - fraction
+        current, previous = self._current, self._previous
+        return min(
+            int(current[row][i] + previous[row][i] * weight + 0.5)
+            for row, i in enumerate(indexes)
+        )
+
+    def record(self, key: str, now: float) -> int:
+        fraction = self._age(now)
+        indexes = self._indexes(key)
+        for row, i in enumerate(indexes):
+            self._current[row][i] += 1
+        count = self._estimate(indexes, fraction)
+        self._offer(key, count)
+        return count
+
+    def estimate(self, key: str, now: float) -> int:
+        return self._estimate(self._indexes(key), self._age(now))
+
+    def _offer(self, key: str, count: int):
+        """Atualiza o heap top-k (com invalidação preguiçosa das entradas antigas)."""
+        top, heap = self._top, self._top_heap
+        if key not in top and len(top) >= self.top_k:
+            while heap and top.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            if not heap or count <= heap[0][0]:
+                return
+            _, evicted = heapq.heappop(heap)
+            del top[evicted]
+        top[key] = count
+        heapq.heappush(heap, (count, key))
+        if len(heap) > 4 * self.top_k:
+            self._top_heap = [(c, k) for k, c in top.items()]
+            heapq.heapify(self._top_heap)
+
+    def top_keys(self) -> List[Tuple[str, int]]:
+        """Chaves mais frequentes com a última contagem estimada, da maior para a menor."""
+        return sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+
+    def is_hot(self, key: str, count: int, threshold: int) -> bool:
+        return count >= threshold and key in self._top
+
+    def forget(self, key: str):
+        self._top.pop(key, None)
+
+    def memory_usage(self) -> int:
+        table = sum(sys.getsizeof(row) for row in self._current + self._previous)
+        return table + sys.getsizeof(self._top) + sys.getsizeof(self._top_heap)
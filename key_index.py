@@ -0,0 +1,128 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+
+class PrefixIndex:
+    """
+    Chaves em ordem lexicográfica para achar todas as que começam com um prefixo
+    em O(log n + encontradas).
+
+    As chaves ficam em blocos ordenados de até 2 * `load` chaves (com o maior de
+    cada bloco em `_maxes`), então inserir e remover movem só um bloco, em vez
+    da lista inteira como um insort numa lista única.
+    """
+
+    def __init__(self, keys: Iterable[str] = (), load: int = 512):
+        self._load = load
+        ordered = sorted(set(keys))
+        self._chunks: List[List[str]] = [ordered[start:start + load] for start in range(0, len(ordered), load)]
+        self._maxes: List[str] = [chunk[-1] for chunk in self._chunks]
+        self._len = len(ordered)
+
+    def add(self, key: str):
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+        index = bisect_left(self._maxes, key)
+        if index == len(self._chunks):
+            # Maior que todas: vai para o fim do último bloco.
+            index -= 1
+            chunk = self._chunks[index]
+            chunk.append(key)
+            self._maxes[index] = key
+        else:
+            chunk = self._chunks[index]
+            position = bisect_left(chunk, key)
+            if chunk[position] == key:
+                return
+            chunk.insert(position, key)
+        self._len += 1
+        if len(chunk) > 2 * self._load:
+            half = len(chunk) // 2
+            self._chunks[index:index + 1] = [chunk[:half], chunk[half:]]
+            self._maxes[index:index + 1] = [chunk[half - 1], chunk[-1]]
+
+    def discard(self, key: str):
+        index = bisect_left(self._maxes, key)
+        if index == len(self._chunks):
+            return
+        chunk = self._chunks[index]
+        position = bisect_left(chunk, key)
+        if chunk[position] != key:
+            return
+        del chunk[position]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[index]
+            del self._maxes[index]
+        elif position == len(chunk):
+            self._maxes[index] = chunk[-1]
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        """Chaves que começam com `prefix`, em ordem."""
+        found = []
+        index = bisect_left(self._maxes, prefix)
+        position = bisect_left(self._chunks[index], prefix) if index < len(self._chunks) else 0
+        while index < len(self._chunks):
+            chunk = self._chunks[index]
+            for key in chunk[position:] if position else chunk:
+                if not key.startswith(prefix):
+                    return found
+                found.append(key)
+            index += 1
+            position = 0
+        return found
+
+    def __contains__(self, key: object) -> bool:
+        index = bisect_left(self._maxes, key)
+        if index == len(self._chunks):
+            return False
+        chunk = self._chunks[index]
+        return chunk[bisect_left(chunk, key)] == key
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+
+class TagIndex:
+    """Tags de cada chave e chaves de cada tag. Chaves sem tags não ocupam nada."""
+
+    def __init__(self):
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        self._tags_by_key: Dict[str, Tuple[str, ...]] = {}
+
+    def set(self, key: str, tags: Union[str, Iterable[str]]):
+        """Troca as tags da chave (uma string é uma tag só; vazio remove as tags)."""
+        if self._tags_by_key:
+            self.discard(key)
+        if not tags:
+            return
+        tags = (tags,) if isinstance(tags, str) else tuple(dict.fromkeys(tags))
+        self._tags_by_key[key] = tags
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+
+    def discard(self, key: str):
+        tags = self._tags_by_key.pop(key, None)
+        if tags is None:
+            return
+        for tag in tags:
+            keys = self._keys_by_tag[tag]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_tag[tag]
+
+    def keys(self, tag: str) -> List[str]:
+        return list(self._keys_by_tag.get(tag, ()))
+
+    def tags(self, key: str) -> Tuple[str, ...]:
+        return self._tags_by_key.get(key, ())
+
+    def __len__(self) -> int:
+        return len(self._tags_by_key)
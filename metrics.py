@@ -0,0 +1,290 @@
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+from bisect import bisect_left
+from random import random
+import threading
+import weakref
+from time import perf_counter
+
+# Limites superiores dos baldes dos histogramas: potências de 2 de 1µs a ~16s.
+LATENCY_BOUNDS: Tuple[float, ...] = tuple(2 ** exponent / 1e6 for exponent in range(25))
+
+# Contadores: nome -> (descrição, nome do rótulo ou None).
+COUNTERS: Dict[str, Tuple[str, Optional[str]]] = {
+    'hits': ("Leituras que encontraram a chave", None),
+    'misses': ("Leituras de chaves ausentes ou expiradas", None),
+    'evictions': ("Entradas despejadas por falta de espaço", 'reason'),
+    'expirations': ("Entradas removidas por expiração", 'reason'),
+    'invalidations': ("Entradas removidas por invalidate_tag/invalidate_prefix", 'reason'),
+    'compression_attempts': ("Valores passados por um codec", None),
+    'compressions': ("Valores guardados comprimidos", None),
+    'compression_bytes_saved': ("Bytes economizados pela compressão", None),
+    'predictive_loads': ("Chaves pré-carregadas", None),
+    'predictive_hits': ("Chaves pré-carregadas lidas depois", None),
+    'predictive_unused': ("Chaves pré-carregadas removidas sem serem lidas", None),
+}
+
+HISTOGRAMS: Dict[str, str] = {
+    'get': "Latência do get",
+    'put': "Latência do put",
+    'lock_wait': "Espera pelo lock do cache",
+    'lock_hold': "Tempo com o lock do cache",
+    'monitor_tick': "Duração de um tick do monitor",
+}
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências com baldes exponenciais fixos (LATENCY_BOUNDS).
+    Os quantis são o limite superior do balde em que caem.
+    """
+
+    __slots__ = ('counts', 'count', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other: 'LatencyHistogram'):
+        counts = other.counts[:]
+        for index, count in enumerate(counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BOUNDS[index] if index < len(LATENCY_BOUNDS) else float('inf')
+        return float('inf')
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'count': self.count, 'sum': self.total,
+                'mean': self.total / self.count if self.count else None,
+                'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99)}
+
+
+class _ThreadMetrics:
+    __slots__ = ('counters', 'histograms', 'thread')
+
+    def __init__(self, thread: Optional[threading.Thread] = None):
+        self.counters: Dict[Tuple[str, Optional[str]], int] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {name: LatencyHistogram() for name in HISTOGRAMS}
+        self.thread = weakref.ref(thread) if thread is not None else None
+
+    def alive(self) -> bool:
+        thread = self.thread() if self.thread is not None else None
+        return thread is not None and thread.is_alive()
+
+    def absorb(self, other: '_ThreadMetrics'):
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for name, histogram in other.histograms.items():
+            self.histograms[name].merge(histogram)
+
+
+class CacheMetrics:
+    """
+    Contadores e histogramas de um cache. Só existe com `metrics=True`: com ele
+    desligado o cache não paga nada além de um teste de None em cada gancho.
+
+    Cada thread grava no seu próprio conjunto de contadores (sem lock no caminho
+    quente); `snapshot` e `prometheus_lines` somam os conjuntos de todas as threads.
+    Os conjuntos de threads que terminaram (como as do monitor, uma por tick)
+    são somados num acumulado único e saem da lista.
+    Os contadores são exatos; as latências de get/put e do lock podem ser
+    amostradas com `sample_rate` (fração das operações cronometradas).
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        if not 0.0 < sample_rate <= 1.0:
+            raise ValueError("sample_rate deve estar em (0, 1]")
+        self.sample_rate = sample_rate
+        self._local = threading.local()
+        self._threads: List[_ThreadMetrics] = []
+        self._retired = _ThreadMetrics()
+        self._prune_at = 64
+        self._lock = threading.Lock()
+
+    def _mine(self) -> _ThreadMetrics:
+        try:
+            return self._local.metrics
+        except AttributeError:
+            metrics = self._local.metrics = _ThreadMetrics(threading.current_thread())
+            with self._lock:
+                self._threads.append(metrics)
+                if len(self._threads) >= self._prune_at:
+                    self._prune()
+                    self._prune_at = max(64, 2 * len(self._threads))
+            return metrics
+
+    def _prune(self):
+        """Soma no acumulado as threads que terminaram (chamado sob `_lock`)."""
+        alive = []
+        for metrics in self._threads:
+            if metrics.alive():
+                alive.append(metrics)
+            else:
+                # A thread terminou: ninguém mais grava nesses contadores.
+                self._retired.absorb(metrics)
+        self._threads = alive
+
+    def incr(self, name: str, amount: int = 1, label: Optional[str] = None):
+        counters = self._mine().counters
+        counters[name, label] = counters.get((name, label), 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        self._mine().histograms[name].observe(seconds)
+
+    def sampled(self) -> bool:
+        """Se esta operação deve ser cronometrada."""
+        return self.sample_rate >= 1.0 or random() < self.sample_rate
+
+    def _totals(self) -> Tuple[Dict[Tuple[str, Optional[str]], int], Dict[str, LatencyHistogram]]:
+        counters: Dict[Tuple[str, Optional[str]], int] = {}
+        histograms = {name: LatencyHistogram() for name in HISTOGRAMS}
+        with self._lock:
+            self._prune()
+            threads = list(self._threads)
+            counters.update(self._retired.counters)
+            for name, histogram in self._retired.histograms.items():
+                histograms[name].merge(histogram)
+        for metrics in threads:
+            # Cópias feitas de uma vez (sob o GIL) enquanto a thread dona continua gravando.
+            for key, value in dict(metrics.counters).items():
+                counters[key] = counters.get(key, 0) + value
+            for name, histogram in metrics.histograms.items():
+                histograms[name].merge(histogram)
+        return counters, histograms
+
+    def merge(self, other: 'CacheMetrics'):
+        """Soma as métricas de `other` nestas (ex.: os shards de um ShardedAdaptiveCache)."""
+        counters, histograms = other._totals()
+        mine = self._mine()
+        for key, value in counters.items():
+            mine.counters[key] = mine.counters.get(key, 0) + value
+        for name, histogram in histograms.items():
+            mine.histograms[name].merge(histogram)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Contadores (os rotulados viram dicionários por rótulo), taxa de acerto e histogramas."""
+        counters, totals = self._totals()
+        histograms = {name: histogram.snapshot() for name, histogram in totals.items()}
+        report: Dict[str, Any] = {}
+        for name, (_, label) in COUNTERS.items():
+            if label is None:
+                report[name] = counters.get((name, None), 0)
+            else:
+                report[name] = {key[1]: value for key, value in counters.items() if key[0] == name}
+        lookups = report['hits'] + report['misses']
+        report['hit_ratio'] = report['hits'] / lookups if lookups else 0.0
+        report['predictive_hit_ratio'] = (report['predictive_hits'] / report['predictive_loads']
+                                          if report['predictive_loads'] else 0.0)
+        report['latency'] = histograms
+        return report
+
+    def prometheus_lines(self, prefix: str) -> List[str]:
+        counters, totals = self._totals()
+        histograms = {name: (histogram.counts[:], histogram.count, histogram.total)
+                      for name, histogram in totals.items()}
+        lines = []
+        for name, (description, label) in COUNTERS.items():
+            metric = f"{prefix}_{name}_total"
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+            if label is None:
+                lines.append(f"{metric} {counters.get((name, None), 0)}")
+            for (counter, value_label), value in sorted(counters.items(), key=lambda item: str(item[0])):
+                if counter == name and label is not None:
+                    lines.append(f'{metric}{{{label}="{value_label}"}} {value}')
+        for name, (counts, count, total) in histograms.items():
+            metric = f"{prefix}_{name}_seconds"
+            lines += [f"# HELP {metric} {HISTOGRAMS[name]}", f"# TYPE {metric} histogram"]
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BOUNDS, counts):
+                cumulative += bucket
+                lines.append(f'{metric}_bucket{{le="{bound:.6g}"}} {cumulative}')
+            lines += [f'{metric}_bucket{{le="+Inf"}} {count}', f"{metric}_sum {total:.9f}", f"{metric}_count {count}"]
+        return lines
+
+
+def prometheus_text(gauges: Dict[str, Tuple[str, float]], metrics: Optional[CacheMetrics],
+                    prefix: str = 'adaptive_cache') -> str:
+    """
+    Formato de exposição texto do Prometheus: os gauges (nome -> (descrição,
+    valor)) e, se houver, os contadores e histogramas de `metrics`.
+    """
+    lines = []
+    for name, (description, value) in gauges.items():
+        metric = f"{prefix}_{name}"
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} gauge", f"{metric} {value}"]
+    if metrics is not None:
+        lines += metrics.prometheus_lines(prefix)
+    return '\n'.join(lines) + '\n'
+
+
+def merged(metrics: Iterable[Optional[CacheMetrics]]) -> Optional[CacheMetrics]:
+    """
+    Um CacheMetrics com a soma de vários (None se nenhum estiver ligado). Uma
+    mesma instância compartilhada por vários caches entra uma vez só.
+    """
+    total = None
+    seen = set()
+    for item in metrics:
+        if item is not None and id(item) not in seen:
+            seen.add(id(item))
+            total = total or CacheMetrics()
+            total.merge(item)
+    return total
+
+
+class InstrumentedLock:
+    """
+    RLock que registra em `metrics` a espera para adquirir e o tempo de posse
+    (na fração `sample_rate` das aquisições). Aquisições reentrantes contam uma
+    vez só, pela mais externa.
+    """
+
+    __slots__ = ('_lock', '_metrics', '_depth', '_timed', '_acquired_at')
+
+    def __init__(self, metrics: CacheMetrics):
+        self._lock = threading.RLock()
+        self._metrics = metrics
+        self._depth = 0
+        self._timed = False
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        rate = self._metrics.sample_rate
+        timed = rate >= 1.0 or random() < rate
+        started = perf_counter() if timed else 0.0
+        if not self._lock.acquire(blocking, timeout):
+            return False
+        # Só a thread dona mexe em _depth, _timed e _acquired_at.
+        if self._depth == 0:
+            self._timed = timed
+            if timed:
+                self._acquired_at = now = perf_counter()
+                self._metrics.observe('lock_wait', now - started)
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._timed:
+            self._metrics.observe('lock_hold', perf_counter() - self._acquired_at)
+        self._lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
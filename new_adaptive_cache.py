@@ -1,59 +1,400 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, Deque
-from datetime import timedelta, datetime
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple, Callable, Awaitable, Union
+from datetime import timedelta
+import asyncio
 import sys
-from collections import deque, defaultdict
+from collections import OrderedDict, deque
 import threading
 import time
-import json
-import zlib
+import weakref
+import heapq
+import itertools
+import logging
+import math
+import random
+from concurrent.futures import Executor, ThreadPoolExecutor
 
-class CachePolicy(BaseModel):
-    ttl:timedelta = None
-    tti:timedelta = None
-    max_access: Optional[int] = None
+from frequency import FrequencyEstimator, SlidingWindowCounter, CountMinSketch
+from compression import CodecSelector, get_codec, probe_compressibility
+from predictive import PredictiveLoader, CoAccessMiner, LOAD_FROM_LOADER
+from singleflight import SingleFlight, AsyncSingleFlight
+from eviction import EvictionPolicy, make_eviction_policy
+from snapshot import Snapshot, SnapshotRecord, SnapshotValue, encode_value, decode_value, write_snapshot
+from disk_tier import DiskTier
+from metrics import CacheMetrics, InstrumentedLock, prometheus_text
+from key_index import PrefixIndex, TagIndex
+
+logger = logging.getLogger(__name__)
+
+def _duration(name: str, value: Any) -> Optional[timedelta]:
+    if value is None or isinstance(value, timedelta):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return timedelta(seconds=value)
+    raise ValueError(f"{name} deve ser um timedelta ou segundos, não {value!r}")
+
+class CachePolicy:
+    """
+    Política de expiração de uma entrada. É imutável e compartilhada: políticas
+    com os mesmos campos são o mesmo objeto, então milhões de chaves com a mesma
+    política guardam só uma referência. Os `with_*` devolvem a política com o
+    campo trocado, o que mantém o encadeamento
+    `CachePolicy().with_ttl(...).with_tti(...)`. Durações aceitam timedelta ou segundos.
+    """
+
+    __slots__ = ('ttl', 'tti', 'max_access', 'stale_while_revalidate', 'early_refresh_beta',
+                 'ttl_seconds', 'tti_seconds', 'stale_seconds', '__weakref__')
+    _FIELDS = ('ttl', 'tti', 'max_access', 'stale_while_revalidate', 'early_refresh_beta')
+    _interned: 'weakref.WeakValueDictionary[tuple, CachePolicy]' = weakref.WeakValueDictionary()
+    _interned_lock = threading.Lock()
+
+    def __new__(cls, ttl: Optional[timedelta] = None, tti: Optional[timedelta] = None,
+                max_access: Optional[int] = None, stale_while_revalidate: Optional[timedelta] = None,
+                early_refresh_beta: Optional[float] = None) -> 'CachePolicy':
+        if max_access is not None and (not isinstance(max_access, int) or isinstance(max_access, bool)):
+            raise ValueError(f"max_access deve ser um inteiro, não {max_access!r}")
+        if early_refresh_beta is not None:
+            early_refresh_beta = float(early_refresh_beta)
+        fields = (_duration('ttl', ttl), _duration('tti', tti), max_access,
+                  _duration('stale_while_revalidate', stale_while_revalidate), early_refresh_beta)
+        with cls._interned_lock:
+            policy = cls._interned.get((cls, fields))
+            if policy is None:
+                policy = object.__new__(cls)
+                for name, value in zip(cls._FIELDS, fields):
+                    object.__setattr__(policy, name, value)
+                # Prazos em segundos, pré-calculados para o caminho quente.
+                for name, value in (('ttl_seconds', fields[0]), ('tti_seconds', fields[1]), ('stale_seconds', fields[3])):
+                    object.__setattr__(policy, name, value.total_seconds() if value else None)
+                cls._interned[cls, fields] = policy
+        return policy
+
+    def _replace(self, **changes: Any) -> 'CachePolicy':
+        fields = {name: getattr(self, name) for name in self._FIELDS}
+        fields.update(changes)
+        return type(self)(**fields)
 
     def with_ttl(self, ttl: timedelta) -> 'CachePolicy':
-        self.ttl = ttl
-        return self
-    
+        return self._replace(ttl=ttl)
+
     def with_tti(self, tti: timedelta) -> 'CachePolicy':
-        self.tti = tti
-        return self
-    
+        return self._replace(tti=tti)
+
     def with_max_access(self, max_access: int) -> 'CachePolicy':
-        self.max_access = max_access
-        return self
+        return self._replace(max_access=max_access)
+
+    def with_stale_while_revalidate(self, window: timedelta) -> 'CachePolicy':
+        return self._replace(stale_while_revalidate=window)
+
+    def with_early_refresh(self, beta: float = 1.0) -> 'CachePolicy':
+        return self._replace(early_refresh_beta=beta)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("CachePolicy é imutável; use os métodos with_*")
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, name) for name in self._FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self._FIELDS if getattr(self, name) is not None)
+        return f"CachePolicy({fields})"
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> Any:
+        # Só quem usa CachePolicy como campo de um modelo pydantic paga o import.
+        from pydantic_core import core_schema
+        return core_schema.no_info_plain_validator_function(
+            lambda value: value if isinstance(value, cls) else cls(**value))
+
+class CacheEntry:
+    """
+    Metadados de uma entrada de `cache_data`. Com __slots__ e tempos em float
+    (segundos do relógio do cache, `time.time()`), ocupa uma fração do dict com
+    datetime que cada entrada tinha.
+    """
+
+    __slots__ = ('data', 'policy', 'size', 'creation_time', 'last_access', 'access_base', 'codec', 'binary',
+                 'load_time')
+
+    def __init__(self, data: Any, policy: Optional[CachePolicy], size: int, creation_time: float,
+                 last_access: float, access_base: int = 0, codec: Optional[str] = None, binary: bool = False,
+                 load_time: float = 0.0):
+        self.data = data
+        self.policy = policy
+        self.size = size
+        self.creation_time = creation_time
+        self.last_access = last_access
+        self.access_base = access_base
+        self.codec = codec
+        self.binary = binary
+        self.load_time = load_time
+
+    @property
+    def compressed(self) -> bool:
+        return self.codec is not None
+
+    def copy(self) -> 'CacheEntry':
+        return CacheEntry(self.data, self.policy, self.size, self.creation_time, self.last_access,
+                          self.access_base, self.codec, self.binary, self.load_time)
+
+class RecencyIndex:
+    """
+    Índice de recência com touch, inserção, remoção e remoção do mais antigo em O(1).
+
+    As chaves ficam ordenadas da menos para a mais recentemente usada, sobre um
+    OrderedDict (hash + lista duplamente ligada), em vez de um deque com remove() O(n).
+    """
+
+    __slots__ = ('_order',)
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self._order: 'OrderedDict[str, None]' = OrderedDict.fromkeys(keys)
+
+    def touch(self, key: str):
+        """Insere a chave ou a move para a posição mais recente."""
+        if key in self._order:
+            self._order.move_to_end(key)
+        else:
+            self._order[key] = None
+
+    def discard(self, key: str) -> bool:
+        """Remove a chave se existir. Retorna True se ela estava no índice."""
+        return self._order.pop(key, _MISSING) is not _MISSING
+
+    def oldest(self) -> Optional[str]:
+        """Retorna a chave menos recentemente usada sem removê-la."""
+        return next(iter(self._order), None)
+
+    def pop_oldest(self) -> str:
+        """Remove e retorna a chave menos recentemente usada."""
+        return self._order.popitem(last=False)[0]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._order
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._order)
+
+    def __repr__(self) -> str:
+        return f"RecencyIndex({list(self._order)!r})"
+
+_MISSING = object()
+
+class ExpirationQueue:
+    """
+    Fila de expiração (min-heap) ordenada pelo próximo deadline de cada chave.
+
+    Reagendar uma chave não remove a entrada antiga do heap: ela fica obsoleta e é
+    descartada quando chega ao topo. Assim o custo de cada tick do monitor é
+    proporcional apenas ao número de deadlines vencidos.
+    """
+
+    __slots__ = ('_heap', '_deadlines', '_counter')
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._counter = itertools.count()
+
+    def schedule(self, key: str, deadline: Optional[float]):
+        """Agenda (ou reagenda) a chave. Um deadline None cancela o agendamento."""
+        if deadline is None:
+            self._deadlines.pop(key, None)
+            return
+        if self._deadlines.get(key) == deadline:
+            return
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), key))
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._compact()
+
+    def discard(self, key: str):
+        self._deadlines.pop(key, None)
+
+    def deadline(self, key: str) -> Optional[float]:
+        return self._deadlines.get(key)
+
+    def pop_due(self, now: float) -> List[str]:
+        """Remove e retorna as chaves cujo deadline já passou."""
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    def _compact(self):
+        """Reconstrói o heap sem as entradas obsoletas."""
+        self._heap = [entry for entry in self._heap if self._deadlines.get(entry[2]) == entry[0]]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+def deep_getsizeof(value: Any) -> int:
+    """
+    Tamanho aproximado em bytes de um objeto e de tudo que ele referencia
+    (containers, __dict__ e __slots__). Objetos compartilhados são contados uma vez.
+    """
+    seen = set()
+    pending = [value]
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        if isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            pending.extend(obj)
+        if hasattr(obj, '__dict__'):
+            pending.append(obj.__dict__)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                pending.append(getattr(obj, slot))
+    return total
+
+# Chaves copiadas por aquisição do lock ao gravar um snapshot.
+_SNAPSHOT_CHUNK = 1000
+
+# Custo fixo de cada entrada além da chave e do valor: o CacheEntry, os floats de
+# criação e de acesso e os nós nos índices de recência/expiração.
+_ENTRY_OVERHEAD = (
+    sys.getsizeof(CacheEntry(None, None, 0, 0.0, 0.0))
+    + 2 * sys.getsizeof(0.0)
+    + 2 * 8 * 4
+)
 
 class AdaptiveCache:
-    def __init__(self, max_memory_mb: int, compression_threshold_kb: int):
-        self.cache_data: Dict[str, Any] = {}
-        self.lru_queue: Deque[str] = deque()
+    def __init__(self, max_memory_mb: int, compression_threshold_kb: int,
+                 frequency_estimator: Optional[FrequencyEstimator] = None, start_monitor: bool = True,
+                 size_estimator: Callable[[Any], int] = sys.getsizeof, debug_accounting: bool = False,
+                 codecs: Optional[List[str]] = None, compression_probe: bool = True,
+                 hot_tier_mb: float = 8, compression_workers: int = 0,
+                 background_compression_threshold_kb: int = 1024,
+                 predictive_file: str = 'teste_monitor.json', max_prefetch_per_tick: int = 100,
+                 refresh_workers: int = 2, eviction_policy: Union[str, EvictionPolicy, None] = 'lru',
+                 disk_tier: Optional[DiskTier] = None, metrics: Union[bool, CacheMetrics] = False,
+                 namespace_quotas: Optional[Dict[str, float]] = None, namespace_separator: str = ':'):
+        self.cache_data: Dict[str, CacheEntry] = {}
+        self.lru_queue = RecencyIndex()
 
         self.max_memory_mb = max_memory_mb * 1024 * 1024 
         self.compression_threshold_kb = compression_threshold_kb * 1024  
         self.compression_ratio_target = 0.7
         self.current_memory_usage = 0 
+        # Escolhe o codec por prefixo de chave; a sonda por amostragem evita
+        # comprimir inteiro um valor que não comprime.
+        self.codec_selector = CodecSelector(codecs)
+        self.compression_probe = compression_probe
+        self._codec_lock = threading.Lock()
+        # Com workers, valores grandes são guardados crus e comprimidos em background.
+        self.compression_pool: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=compression_workers, thread_name_prefix='cache-compress')
+            if compression_workers > 0 else None
+        )
+        self.background_compression_threshold_kb = background_compression_threshold_kb * 1024
+        self._compression_metrics = {'submitted': 0, 'pending': 0, 'peak_pending': 0, 'completed': 0, 'discarded': 0}
+        self._compression_metrics_lock = threading.Lock()
+        # Mede valores que não são str/bytes (ex.: deep_getsizeof para containers).
+        self.size_estimator = size_estimator
+        # Recalcula o total após cada mutação e falha se divergir do contador.
+        self.debug_accounting = debug_accounting
 
-        self.access_counts: Dict[str, int] = defaultdict(int)
-        self.access_timestamps: Dict[str, Deque[datetime]] = defaultdict(deque)
+        # Contagem de acessos na janela de 60s (hot keys e max_access).
+        self.frequency_estimator = frequency_estimator or SlidingWindowCounter()
+        # 'lru' usa o LRU com hot keys protegidas abaixo; as outras políticas
+        # (eviction.py) escolhem as vítimas e recebem os mesmos eventos de acesso.
+        self.eviction_policy = make_eviction_policy(eviction_policy)
+        if self.eviction_policy is not None:
+            self.eviction_policy.bind(self.max_memory_mb)
+        # L2 em disco: recebe as entradas despejadas e devolve no get.
+        self.disk_tier = disk_tier
+        if disk_tier is not None:
+            disk_tier.on_drop = self._forget_dropped
+        # Índices secundários da invalidação em lote. Cobrem as chaves no L1 e no L2.
+        # O de prefixos só é montado (e mantido) a partir da primeira invalidate_prefix.
+        self.prefix_index: Optional[PrefixIndex] = None
+        self.tag_index = TagIndex()
+        # Cotas em MB por namespace (o trecho da chave antes do primeiro separador;
+        # '' para chaves sem separador). Cada namespace com cota tem o próprio LRU.
+        self.namespace_separator = namespace_separator
+        self.namespace_quotas: Dict[str, int] = {namespace: int(mb * 1024 * 1024)
+                                                 for namespace, mb in (namespace_quotas or {}).items()}
+        self.namespace_usage: Dict[str, int] = dict.fromkeys(self.namespace_quotas, 0)
+        self._namespace_lru: Dict[str, RecencyIndex] = {namespace: RecencyIndex() for namespace in self.namespace_quotas}
 
-        self.hot_keys: Deque[str] = deque()
+        self.hot_keys = RecencyIndex()
+        # Valores já descomprimidos das hot keys comprimidas, com orçamento próprio.
+        self.hot_tier: 'OrderedDict[str, Any]' = OrderedDict()
+        self.hot_tier_budget = hot_tier_mb * 1024 * 1024
+        self.hot_tier_usage = 0
+        self._hot_tier_candidates: set = set()
+        self.expiration_queue = ExpirationQueue()
         self.hot_key_threshold: int = 100
         self.enable_predictive_loading: bool = False
+        # Associações gatilho -> chaves relacionadas e hot keys novas ainda não processadas.
+        self.predictive_loader = PredictiveLoader(predictive_file, max_prefetch_per_tick)
+        self._newly_hot: List[str] = []
+        # Mineração de co-acesso (desligada até enable_association_mining).
+        self.association_miner: Optional[CoAccessMiner] = None
+        self.prefetch_loader: Optional[Callable[[str], Any]] = None
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
+        self._prefetch_scheduled = False
+        # Misses concorrentes da mesma chave em get_or_load compartilham um só carregamento.
+        self._load_flights = SingleFlight()
+        self._async_load_flights = AsyncSingleFlight()
+        # Recarga em background de entradas stale ou perto do TTL (ver register_loader).
+        self.refresh_loader: Optional[Callable[[str], Any]] = None
+        self.refresh_workers = refresh_workers
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._refreshing: set = set()
+        self._refresh_metrics = {'started': 0, 'completed': 0, 'failed': 0}
+        self._warned_refresh_loader = False
 
         self.monitor_thread: Optional[threading.Timer] = None
-        self.lock = threading.RLock()
+        self.snapshot_thread: Optional[threading.Timer] = None
+        self._closed = False
+        # Contadores e histogramas (ver stats()); desligados, cada gancho é só um teste de None.
+        # Uma instância de CacheMetrics permite amostrar as latências (sample_rate).
+        self.metrics: Optional[CacheMetrics] = (metrics if isinstance(metrics, CacheMetrics)
+                                                else CacheMetrics() if metrics else None)
+        # Chaves pré-carregadas ainda não lidas (só acompanhadas com métricas ligadas).
+        self._prefetched: set = set()
+        self.lock = InstrumentedLock(self.metrics) if self.metrics is not None else threading.RLock()
 
-        self._start_access_monitor()
+        if start_monitor:
+            self._start_access_monitor()
 
-    def _compress_data(self, data: str) -> bytes:
-        if type(data) is bytes:
-            data = data.decode('utf-8')
-        return zlib.compress(data.encode('utf-8'))
+    def _compress_data(self, key: str, data: Any) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Comprime str ou bytes com o codec escolhido para o prefixo da chave.
+        Retorna (None, None) se a sonda indicar que o valor não comprime.
+        """
+        raw = data.encode('utf-8') if isinstance(data, str) else data
+        if self.compression_probe and probe_compressibility(raw) > self.compression_ratio_target:
+            return None, None
+        with self._codec_lock:
+            codec = self.codec_selector.choose(key, self.compression_ratio_target)
+        started = time.perf_counter()
+        compressed = get_codec(codec).compress(raw)
+        elapsed = time.perf_counter() - started
+        with self._codec_lock:
+            self.codec_selector.record(key, codec, len(raw), len(compressed), elapsed)
+        return compressed, codec
         
-    def _decompress_data(self, data: bytes) -> str:
-        return zlib.decompress(data).decode('utf-8')
+    def _decompress_data(self, data: bytes, codec: str = 'zlib-6', binary: bool = False) -> Any:
+        raw = get_codec(codec).decompress(data)
+        return raw if binary else raw.decode('utf-8')
 
     def _start_access_monitor(self):
         self.monitor_thread = threading.Timer(1.0, self._monitor_access_counts)
@@ -61,175 +402,1229 @@ class AdaptiveCache:
         self.monitor_thread.start()
 
     def _monitor_access_counts(self):
+        started = time.perf_counter()
+        self._run_maintenance(time.time())
+
+        self.predictive_load()
+        if self.metrics is not None:
+            self.metrics.observe('monitor_tick', time.perf_counter() - started)
+        if not self._closed:
+            self._start_access_monitor()
+
+    def _run_maintenance(self, now: float):
+        """Trabalho de cada tick do monitor. Adquire o lock só nas trocas de metadados."""
+        with self.lock:
+            self._expire_due_entries(now)
+        self._write_behind()
+        self._refresh_hot_tier(now)
+
+    def _refresh_hot_tier(self, now: float):
+        """
+        Rebaixa da camada descomprimida as chaves que esfriaram e promove as
+        hot keys comprimidas detectadas desde o último tick. A descompressão das
+        promovidas acontece fora do lock.
+        """
         with self.lock:
-            now = datetime.now()
-            current_time = time.time()
-            window_start_time = current_time - 60
+            for key in [key for key in self.hot_tier
+                        if self.frequency_estimator.estimate(key, now) < self.hot_key_threshold]:
+                self._demote_from_hot_tier(key)
 
-            keys_to_remove = []
-            for key, timestamps in self.access_timestamps.items(): 
+            candidates, self._hot_tier_candidates = self._hot_tier_candidates, set()
+            promotions = []
+            for key in candidates:
                 data_info = self.cache_data.get(key)
-                last_access_time = datetime.fromtimestamp(timestamps[-1]) if timestamps else None   
-                current_access_count = len(timestamps)
-
-                if data_info and data_info.get('policy'):
-                    policy: CachePolicy = data_info['policy']
-                    if policy.ttl and (data_info['creation_time'] + policy.ttl < now):
-                        print(f"Chave '{key}' expirou por TTL.")
-                        keys_to_remove.append(key)
-                        self.lru_queue.remove(key)
-                        self.cache_data.pop(key, None)
-                        self.current_memory_usage -= sys.getsizeof(data_info['data'])
-                
-                    if policy.tti and (last_access_time + policy.tti < now):
-                        print(f"Chave '{key}' expirou por TTI.")
-                        keys_to_remove.append(key)
-                        self.lru_queue.remove(key)
-                        self.cache_data.pop(key, None)
-                        self.current_memory_usage -= sys.getsizeof(data_info['data'])
-                    
-                    if policy.max_access and (current_access_count >= policy.max_access):
-                        print(f"Chave '{key}' expirou por MAX_ACCESS.")
-                        keys_to_remove.append(key)
-                        self.lru_queue.remove(key)
-                        self.cache_data.pop(key, None)
-                        self.current_memory_usage -= sys.getsizeof(data_info['data'])
-
-                while timestamps and timestamps[0] < window_start_time:
-                    timestamps.popleft()
-
-                access_count = len(timestamps)
-                self.access_counts[key] = access_count
-
-                if access_count >= self.hot_key_threshold:
-                    if key not in self.hot_keys:
-                        self.hot_keys.append(key)
-                
-                if not timestamps:
-                    keys_to_remove.append(key)
-                
-            for key in keys_to_remove:
-                del self.access_timestamps[key]
+                if data_info is None or not data_info.compressed or key not in self.hot_keys or key in self.hot_tier:
+                    continue
+                if data_info.data.__class__ is SnapshotValue:
+                    continue
+                promotions.append((key, data_info, data_info.data))
 
-        self.predictive_load()
-        self._start_access_monitor()
+        for key, data_info, payload in promotions:
+            value = self._decompress_data(payload, data_info.codec, data_info.binary)
+            size = sys.getsizeof(value)
+            if size > self.hot_tier_budget:
+                continue
+            with self.lock:
+                if self.cache_data.get(key) is not data_info or data_info.data is not payload or key in self.hot_tier:
+                    continue
+                while self.hot_tier_usage + size > self.hot_tier_budget:
+                    self._demote_from_hot_tier(next(iter(self.hot_tier)))
+                self.hot_tier[key] = value
+                self.hot_tier_usage += size
+
+    def _demote_from_hot_tier(self, key: str):
+        value = self.hot_tier.pop(key, _MISSING)
+        if value is not _MISSING:
+            self.hot_tier_usage -= sys.getsizeof(value)
+
+    def _expire_due_entries(self, now: float) -> int:
+        """
+        Remove as entradas cujo deadline de TTL/TTI venceu. Entradas com TTI que
+        foram acessadas desde o agendamento são reagendadas. Retorna quantas expiraram.
+        """
+        expired = 0
+        for key in self.expiration_queue.pop_due(now):
+            data_info = self.cache_data.get(key)
+            if data_info is None:
+                continue
+            reason = self._expiry_reason(key, data_info, now)
+            if reason is None:
+                self._schedule_expiration(key, data_info)
+                continue
+            self._expire_entry(key, reason)
+            expired += 1
+        return expired
+
+    def _expiry_reason(self, key: str, data_info: CacheEntry, now: float) -> Optional[str]:
+        """Retorna 'TTL', 'TTI' ou 'MAX_ACCESS' se a entrada morreu, senão None."""
+        policy: Optional[CachePolicy] = data_info.policy
+        if not policy:
+            return None
+        if policy.ttl and self._dead_deadline(data_info, policy) < now:
+            return 'TTL'
+        if policy.tti and data_info.last_access + policy.tti_seconds < now:
+            return 'TTI'
+        if policy.max_access and self._accesses_since_put(key, data_info, now) >= policy.max_access:
+            return 'MAX_ACCESS'
+        return None
+
+    def _fresh_deadline(self, data_info: CacheEntry, policy: CachePolicy) -> float:
+        return data_info.creation_time + policy.ttl_seconds
+
+    def _dead_deadline(self, data_info: CacheEntry, policy: CachePolicy) -> float:
+        deadline = self._fresh_deadline(data_info, policy)
+        # Sem loader de recarga ninguém renovaria a entrada: a janela stale não vale.
+        if policy.stale_seconds and self.refresh_loader is not None:
+            deadline += policy.stale_seconds
+        return deadline
+
+    def _check_refresh_loader(self, policy: Optional[CachePolicy]):
+        """Avisa (uma vez por cache) de política com recarga sem `register_loader`."""
+        if (policy and (policy.stale_while_revalidate or policy.early_refresh_beta)
+                and self.refresh_loader is None and not self._warned_refresh_loader):
+            self._warned_refresh_loader = True
+            logger.warning("Política com stale-while-revalidate ou recarga antecipada sem loader registrado "
+                           "(register_loader): as entradas expiram no fim do TTL.")
+
+    def entry_state(self, key: str) -> Optional[str]:
+        """
+        Estado da entrada: 'fresh' (dentro do TTL), 'stale' (TTL vencido, mas ainda
+        servida na janela de stale-while-revalidate), 'dead' (será removida) ou
+        None se a chave não está no cache.
+        """
+        with self.lock:
+            data_info = self.cache_data.get(key)
+            if data_info is None:
+                return None
+            now = time.time()
+            if self._expiry_reason(key, data_info, now) is not None:
+                return 'dead'
+            policy = data_info.policy
+            if policy and policy.ttl and self._fresh_deadline(data_info, policy) < now:
+                return 'stale'
+            return 'fresh'
+
+    def _schedule_expiration(self, key: str, data_info: CacheEntry):
+        """Agenda o próximo deadline da entrada (o menor entre o fim da janela stale do TTL e o TTI)."""
+        policy: Optional[CachePolicy] = data_info.policy
+        deadline = None
+        if policy and policy.ttl:
+            deadline = self._dead_deadline(data_info, policy)
+        if policy and policy.tti:
+            tti_deadline = data_info.last_access + policy.tti_seconds
+            deadline = tti_deadline if deadline is None else min(deadline, tti_deadline)
+        self.expiration_queue.schedule(key, deadline)
+
+    def _record_access(self, key: str, now: float):
+        """Registra o acesso no estimador e promove a chave a hot key se necessário."""
+        access_count = self.frequency_estimator.record(key, now)
+        if self.eviction_policy is not None:
+            self.eviction_policy.on_access(key, now)
+        if key not in self.hot_keys and self.frequency_estimator.is_hot(key, access_count, self.hot_key_threshold):
+            self.hot_keys.touch(key)
+            self._hot_tier_candidates.add(key)
+            if self.enable_predictive_loading:
+                self._newly_hot.append(key)
+
+    def _accesses_since_put(self, key: str, data_info: CacheEntry, now: float) -> int:
+        # Estimadores globais (Count-Min) não esquecem uma chave; 'access_base'
+        # desconta os acessos que ela já tinha quando foi inserida.
+        return self.frequency_estimator.estimate(key, now) - data_info.access_base
+
+    def access_count(self, key: str) -> int:
+        """Número estimado de acessos à chave na janela de 60s."""
+        with self.lock:
+            return self.frequency_estimator.estimate(key, time.time())
 
     def get(self, key: str) -> Optional[str]:
-        if key not in self.cache_data:
+        if self.metrics is None or not self.metrics.sampled():
+            return self._get(key)
+        started = time.perf_counter()
+        value = self._get(key)
+        self.metrics.observe('get', time.perf_counter() - started)
+        return value
+
+    def _get(self, key: str) -> Optional[str]:
+        value, payload = self._lookup(key)
+        if payload is None:
+            return value
+        # Os bytes comprimidos são imutáveis: a descompressão não precisa do lock.
+        return self._decompress_data(*payload)
+
+    def _lookup(self, key: str) -> Tuple[Any, Optional[Tuple[bytes, str, bool]]]:
+        """
+        Parte do get feita sob o lock: expiração, contagem de acessos e recência.
+        Retorna (valor, None) quando o valor já está pronto, ou (None, (bytes, codec,
+        binário)) quando ainda precisa ser descomprimido por quem chamou.
+        """
+        if self.association_miner is not None:
+            self._observe_access(key)
+
+        # Sem política de admissão nem L2 não há o que fazer num miss, então ele nem pega o lock.
+        if key not in self.cache_data and self.eviction_policy is None and \
+                (self.disk_tier is None or key not in self.disk_tier):
+            if self.metrics is not None:
+                self.metrics.incr('misses')
+            return None, None
+
+        found = self._read_disk(key)
+        with self.lock:
+            result = self._read_entry(key, time.time(), found)
+        self._write_behind()
+        return result
+
+    def _read_disk(self, key: str) -> Optional[Tuple[Any, Any]]:
+        """
+        Lê do disco, fora do lock do cache: do L2, a chave que não está na
+        memória, como (registro, payload); de uma entrada restaurada de snapshot,
+        o valor ainda não lido, como (SnapshotValue, valor). Sob o lock,
+        `_read_entry` confere se o que foi lido ainda vale.
+        """
+        data_info = self.cache_data.get(key)
+        if data_info is not None:
+            pending = data_info.data
+            if pending.__class__ is SnapshotValue:
+                return pending, pending.load()
+            return None
+        if self.disk_tier is None or key not in self.disk_tier:
             return None
+        return self.disk_tier.read(key)
+
+    def _write_behind(self):
+        """Grava no L2, já sem o lock do cache, o que os despejos deixaram no buffer."""
+        if self.disk_tier is not None:
+            self.disk_tier.write_pending()
+
+    def _read_entry(self, key: str, now: float, found: Optional[Tuple[Any, Any]] = None
+                    ) -> Tuple[Any, Optional[Tuple[bytes, str, bool]]]:
+        """
+        Leitura de uma chave sob o lock; mesmo retorno de `_lookup`. `found` é o
+        que `_read_disk` leu; se a chave mudou no L2 desde então, é um miss.
+        """
+        data_info = self.cache_data.get(key)
+        if data_info is None and found is not None and found[0].__class__ is SnapshotRecord:
+            data_info = self._promote_from_disk(key, found)
+        if data_info is None:
+            if self.eviction_policy is not None:
+                self.eviction_policy.on_miss(key, now)
+            if self.metrics is not None:
+                self.metrics.incr('misses')
+            return None, None
+
+        reason = self._expiry_reason(key, data_info, now)
+        if reason is not None:
+            self._expire_entry(key, reason)
+            if self.eviction_policy is not None:
+                self.eviction_policy.on_miss(key, now)
+            if self.metrics is not None:
+                self.metrics.incr('misses')
+            return None, None
+
+        data_info.last_access = now
+        self._record_access(key, now)
+        if self.metrics is not None:
+            self.metrics.incr('hits')
+            if key in self._prefetched:
+                self._prefetched.discard(key)
+                self.metrics.incr('predictive_hits')
+        if self.refresh_loader is not None and self._needs_refresh(key, data_info, now):
+            self._start_refresh(key, data_info)
+
+        if key in self.hot_keys:
+            self.hot_keys.touch(key)
+
+        self.lru_queue.touch(key)
+        if self.namespace_quotas:
+            namespace = self._namespace(key)
+            if namespace is not None:
+                self._namespace_lru[namespace].touch(key)
+        if data_info.data.__class__ is SnapshotValue:
+            self._materialize(key, data_info, found)
+        if not data_info.compressed:
+            return data_info.data, None
+        value = self.hot_tier.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hot_tier.move_to_end(key)
+            return value, None
+        return None, (data_info.data, data_info.codec, data_info.binary)
         
+    def put(self, key: str, value: str, policy: Optional[CachePolicy] = None,
+            tags: Optional[Iterable[str]] = None):
+        """Grava o valor. `tags` substitui as tags da chave (ver invalidate_tag)."""
+        if self.metrics is None or not self.metrics.sampled():
+            self._put(key, value, policy, tags=tags)
+            return
+        started = time.perf_counter()
+        self._put(key, value, policy, tags=tags)
+        self.metrics.observe('put', time.perf_counter() - started)
+
+    def _put(self, key: str, value: Any, policy: Optional[CachePolicy], load_time: float = 0.0,
+             tags: Optional[Iterable[str]] = None):
+        # A compressão roda fora do lock; só a troca de metadados é feita dentro dele.
+        self._put_encoded(key, value, self._encode(key, value), policy, load_time, tags)
+
+    def _put_encoded(self, key: str, value: Any, encoded: Tuple[Any, Optional[str], bool],
+                     policy: Optional[CachePolicy], load_time: float = 0.0, tags: Optional[Iterable[str]] = None):
+        stored_value, codec, deferred = encoded
+        with self.lock:
+            data_info = self._store(key, value, stored_value, codec, policy, load_time, tags=tags)
+        self._write_behind()
+        if deferred:
+            self._submit_background_compression(key, value, data_info)
+
+    def delete(self, key: str) -> bool:
+        """Remove a chave (também do L2). Retorna se ela estava no cache."""
         with self.lock:
-            self.access_timestamps[key].append(time.time())
+            found = self._is_cached(key)
+            self._remove_entry(key)
+        self._write_behind()
+        return found
 
-            if key in self.hot_keys:
-                self.hot_keys.remove(key)
-                self.hot_keys.append(key)
+    def _is_cached(self, key: str) -> bool:
+        return key in self.cache_data or (self.disk_tier is not None and key in self.disk_tier)
 
-            if key in self.cache_data:
-                self.lru_queue.remove(key)
-                self.lru_queue.append(key)
-                if not self.cache_data[key]['compressed']:
-                    return self.cache_data[key]['data']
-                return self._decompress_data(self.cache_data[key]['data'])
+    def invalidate_tag(self, tag: str) -> int:
+        """Remove todas as chaves gravadas com a tag (também do L2). Retorna quantas."""
+        with self.lock:
+            removed = self._invalidate(self.tag_index.keys(tag), 'tag')
+        self._write_behind()
+        return removed
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Remove todas as chaves que começam com `prefix` (também do L2). Retorna quantas."""
+        with self.lock:
+            if self.prefix_index is None:
+                keys = list(self.cache_data) + (self.disk_tier.keys() if self.disk_tier is not None else [])
+                self.prefix_index = PrefixIndex(key for key in keys if key.__class__ is str)
+            removed = self._invalidate(self.prefix_index.with_prefix(prefix), 'prefix')
+        self._write_behind()
+        return removed
+
+    def _invalidate(self, keys: List[str], reason: str) -> int:
+        # O custo é proporcional às chaves encontradas pelo índice, não ao tamanho do cache.
+        for key in keys:
+            self._remove_entry(key)
+        if self.metrics is not None and keys:
+            self.metrics.incr('invalidations', len(keys), label=reason)
+        return len(keys)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Lê várias chaves com uma única aquisição do lock. Retorna só as encontradas."""
+        keys = list(keys)
+        values = self._run_batch([('get', key) for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def put_many(self, items: Union[Dict[str, Any], Iterable[Tuple[str, Any]]], policy: Optional[CachePolicy] = None,
+                 tags: Optional[Iterable[str]] = None):
+        """
+        Grava vários valores com uma única aquisição do lock. Os valores grandes são
+        comprimidos antes, em paralelo no pool de compressão quando há um, e o
+        despejo roda uma vez contra o tamanho total do lote.
+        """
+        pairs = items.items() if isinstance(items, dict) else items
+        tags = None if tags is None else tuple(tags) if not isinstance(tags, str) else (tags,)
+        self._run_batch([('put', key, value, policy, tags) for key, value in pairs])
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove várias chaves com uma única aquisição do lock. Retorna quantas existiam."""
+        return sum(self._run_batch([('delete', key) for key in keys]))
+
+    def get_or_load(self, key: str, loader: Callable[[str], Any], policy: Optional[CachePolicy] = None) -> Any:
+        """
+        Lê a chave e, no miss, carrega com `loader(key)` e grava pelo `put` normal.
+        Misses concorrentes da mesma chave são agrupados: só uma chamada ao loader
+        roda e as outras threads esperam o resultado. Exceções do loader chegam a
+        todas as threads que esperavam. Um valor None não é gravado.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        return self._load_flights.do(key, lambda: self._load_and_put(key, loader, policy))
+
+    def _load_and_put(self, key: str, loader: Callable[[str], Any], policy: Optional[CachePolicy]) -> Any:
+        # Outra líder pode ter terminado entre o miss e a entrada no grupo.
+        if key in self.cache_data:
+            value = self.get(key)
+            if value is not None:
+                return value
+        start = time.perf_counter()
+        value = loader(key)
+        if value is not None:
+            self._put(key, value, policy, time.perf_counter() - start)
+        return value
+
+    async def aget_or_load(self, key: str, loader: Callable[[str], Awaitable[Any]],
+                           policy: Optional[CachePolicy] = None) -> Any:
+        """
+        Versão asyncio de get_or_load: `loader` é uma função async. O get e o put
+        seguem o caminho do AsyncAdaptiveCache (ver `_alocked`), com o executor
+        padrão do event loop, para não travar o loop no lock nem na compressão.
+        """
+        value = await self._aget(None, key)
+        if value is not None:
+            return value
+        return await self._async_load_flights.do(key, lambda: self._aload_and_put(key, loader, policy))
+
+    async def _aload_and_put(self, key: str, loader: Callable[[str], Awaitable[Any]],
+                             policy: Optional[CachePolicy]) -> Any:
+        if key in self.cache_data:
+            value = await self._aget(None, key)
+            if value is not None:
+                return value
+        start = time.perf_counter()
+        value = await loader(key)
+        if value is not None:
+            await self._aput(None, key, value, policy, time.perf_counter() - start)
+        return value
+
+    async def _alocked(self, executor: Optional[Executor], function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Roda `function` com o lock do cache a partir do event loop: no loop se o
+        lock está livre e não há L2, senão no `executor` (None é o padrão do
+        loop), para o loop não esperar outra thread nem o disco.
+        """
+        if self.disk_tier is None and self.lock.acquire(blocking=False):
+            try:
+                return function(*args)
+            finally:
+                self.lock.release()
+
+        def locked():
+            with self.lock:
+                result = function(*args)
+            self._write_behind()
+            return result
+        return await asyncio.get_running_loop().run_in_executor(executor, locked)
+
+    async def _acall(self, executor: Optional[Executor], function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Como `_alocked`, para métodos que pegam o lock sozinhos: no executor eles
+        rodam sem o lock em volta, para que leiam e gravem o L2 fora dele.
+        """
+        if self.disk_tier is None:
+            return await self._alocked(executor, function, *args)
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+    async def _aget(self, executor: Optional[Executor], key: str) -> Optional[str]:
+        value, payload = await self._acall(executor, self._lookup, key)
+        if payload is None:
+            return value
+        return await asyncio.get_running_loop().run_in_executor(executor, self._decompress_data, *payload)
+
+    async def _aput(self, executor: Optional[Executor], key: str, value: Any, policy: Optional[CachePolicy],
+                    load_time: float = 0.0, tags: Optional[Iterable[str]] = None):
+        encoded = await self._aencode(executor, key, value)
+        await self._acall(executor, self._put_encoded, key, value, encoded, policy, load_time, tags)
+
+    async def _aencode(self, executor: Optional[Executor], key: str, value: Any) -> Tuple[Any, Optional[str], bool]:
+        # Valores abaixo do limite de compressão são gravados como estão, sem executor.
+        if not isinstance(value, (str, bytes)) or sys.getsizeof(value) <= self.compression_threshold_kb:
+            return value, None, False
+        return await asyncio.get_running_loop().run_in_executor(executor, self._encode, key, value)
+
+    def register_loader(self, loader: Callable[[str], Any]):
+        """
+        Registra o loader usado para recarregar em background as entradas com
+        stale-while-revalidate ou recarga antecipada (XFetch). Enquanto a recarga
+        roda, os leitores recebem o valor atual sem esperar.
+        """
+        with self.lock:
+            self.refresh_loader = loader
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=self.refresh_workers,
+                                                            thread_name_prefix='cache-refresh')
+
+    def _needs_refresh(self, key: str, data_info: CacheEntry, now: float) -> bool:
+        policy: Optional[CachePolicy] = data_info.policy
+        if not policy or not policy.ttl or key in self._refreshing:
+            return False
+        if not policy.stale_while_revalidate and not policy.early_refresh_beta:
+            return False
+        expiry = self._fresh_deadline(data_info, policy)
+        if now >= expiry:
+            return True
+        if policy.early_refresh_beta:
+            # XFetch: antecipa a recarga em -custo * beta * ln(u), u uniforme em (0, 1].
+            cost = data_info.load_time
+            return now - cost * policy.early_refresh_beta * math.log(1.0 - random.random()) >= expiry
+        return False
+
+    def _start_refresh(self, key: str, data_info: CacheEntry):
+        self._refreshing.add(key)
+        self._refresh_metrics['started'] += 1
+        self._refresh_executor.submit(self._refresh_entry, key, data_info)
+
+    def _refresh_entry(self, key: str, data_info: CacheEntry):
+        """Recarrega a entrada e troca o valor se ela continua a mesma no cache."""
+        try:
+            start = time.perf_counter()
+            try:
+                value = self.refresh_loader(key)
+            except Exception as exc:
+                # Mantém o valor atual até a entrada morrer; o próximo acesso tenta de novo.
+                logger.warning("Falha ao recarregar '%s': %s", key, exc)
+                with self.lock:
+                    self._refresh_metrics['failed'] += 1
+                return
+            load_time = time.perf_counter() - start
+            if value is None:
+                return
+            stored_value, codec, deferred = self._encode(key, value)
+            with self.lock:
+                # Sobrescrita, removida (delete, invalidação, despejo) ou expirada enquanto
+                # recarregava: o valor novo não pode trazer a chave de volta.
+                if self.cache_data.get(key) is not data_info:
+                    return
+                new_info = self._store(key, value, stored_value, codec, data_info.policy, load_time)
+                self._refresh_metrics['completed'] += 1
+            self._write_behind()
+            if deferred:
+                self._submit_background_compression(key, value, new_info)
+        finally:
+            with self.lock:
+                self._refreshing.discard(key)
+
+    def refresh_metrics(self) -> Dict[str, int]:
+        """Recargas em background iniciadas, concluídas e que falharam."""
+        with self.lock:
+            return dict(self._refresh_metrics, in_flight=len(self._refreshing))
+
+    def _encode(self, key: str, value: Any) -> Tuple[Any, Optional[str], bool]:
+        """
+        Decide como armazenar o valor. Retorna (valor armazenado, codec ou None,
+        adiado). Com `adiado`, o valor é guardado cru e comprimido no pool.
+        """
+        original_size = sys.getsizeof(value)
+        if not isinstance(value, (str, bytes)) or original_size <= self.compression_threshold_kb:
+            return value, None, False
+        if self.compression_pool is not None and original_size >= self.background_compression_threshold_kb:
+            return value, None, True
+
+        compressed_data, codec = self._compress_data(key, value)
+        compressed_size = sys.getsizeof(compressed_data) if compressed_data is not None else original_size
         
-    def put(self, key: str, value: str, policy: Optional[CachePolicy] = None):
-        with self.lock:
-            original_size = sys.getsizeof(value)
-            stored_value = value
-            is_compressed = False
-
-            if original_size > self.compression_threshold_kb:
-                compressed_data = self._compress_data(value)
-                compressed_size = sys.getsizeof(compressed_data)
-                
-                if compressed_size / original_size <= self.compression_ratio_target:
-                    stored_value = compressed_data
-                    is_compressed = True
-                    print(f"Comprimindo chave '{key}'. Tamanho original: {original_size} bytes. Novo tamanho: {compressed_size} bytes.")
-                else:
-                    print(f"Compressão ineficaz para '{key}'. Usando dados originais.")
-
-            if self.current_memory_usage + sys.getsizeof(stored_value) > self.max_memory_mb:
-                while self.current_memory_usage + sys.getsizeof(stored_value) > self.max_memory_mb:
-                    if not self.lru_queue:
-                        break  # Evita loop infinito se cache vazio
-                    lru_key = self.lru_queue.popleft()
-                    if lru_key not in self.hot_keys:
-                        self.current_memory_usage -= sys.getsizeof(self.cache_data[lru_key]['data'])
-                        self.cache_data.pop(lru_key, None)
-                    else:
-                        self.lru_queue.append(lru_key)
-                        if len(self.hot_keys) == len(self.lru_queue):
-                            lru_hot_key = self.lru_queue.popleft()
-                            self.hot_keys.remove(lru_hot_key)
-                            self.current_memory_usage -= sys.getsizeof(self.cache_data[lru_hot_key]['data'])
-                            self.cache_data.pop(lru_key, None)
-
-            self.cache_data[key] = {
-                'data': stored_value,
-                'policy': policy,
-                'size': sys.getsizeof(stored_value),
-                'creation_time': datetime.now(),
-                'compressed': is_compressed
-            }
-            
-            self.current_memory_usage += sys.getsizeof(value)
-            if key in self.lru_queue:
-                self.lru_queue.remove(key)
-                self.lru_queue.append(key)
+        if compressed_size / original_size <= self.compression_ratio_target:
+            logger.debug("Comprimindo chave '%s'. Tamanho original: %d bytes. Novo tamanho: %d bytes.",
+                         key, original_size, compressed_size)
+            self._count_compression(original_size, compressed_size)
+            return compressed_data, codec, False
+        logger.debug("Compressão ineficaz para '%s'. Usando dados originais.", key)
+        self._count_compression(original_size, None)
+        return value, None, False
+
+    def _count_compression(self, original_size: int, compressed_size: Optional[int]):
+        if self.metrics is None:
+            return
+        self.metrics.incr('compression_attempts')
+        if compressed_size is not None:
+            self.metrics.incr('compressions')
+            self.metrics.incr('compression_bytes_saved', original_size - compressed_size)
+
+    def _store(self, key: str, value: Any, stored_value: Any, codec: Optional[str],
+               policy: Optional[CachePolicy], load_time: float = 0.0, evict: bool = True,
+               tags: Any = _MISSING) -> CacheEntry:
+        """
+        Insere ou sobrescreve a entrada já codificada (chamado sob o lock).
+        `load_time` é quanto o loader levou para produzir o valor (custo do XFetch).
+        Com `evict=False` quem chama despeja depois (uma vez por lote). `tags`
+        substitui as tags da chave (None remove); sem ele, as atuais são mantidas.
+        """
+        now = time.time()
+        charged_size = self._charge(key, stored_value)
+        was_hot = key in self.hot_keys
+        previous = self._detach_entry(key)
+        if self.disk_tier is not None:
+            self.disk_tier.discard(key, write=False)
+        access_base = previous.access_base if previous else self.frequency_estimator.estimate(key, now)
+
+        namespace = self._namespace(key) if self.namespace_quotas else None
+        if namespace is not None:
+            self._evict_namespace_until_fits(namespace, charged_size)
+        if evict:
+            self._evict_until_fits(charged_size)
+
+        self._check_refresh_loader(policy)
+        data_info = CacheEntry(stored_value, policy, charged_size, now, now, access_base, codec,
+                               isinstance(value, bytes), load_time)
+        self.cache_data[key] = data_info
+        
+        self.current_memory_usage += charged_size
+        self.lru_queue.touch(key)
+        self._index(key, tags)
+        if namespace is not None:
+            self._charge_namespace(namespace, key, charged_size)
+        if self.eviction_policy is not None:
+            self.eviction_policy.on_insert(key, charged_size, now)
+        if was_hot:
+            self.hot_keys.touch(key)
+            self._hot_tier_candidates.add(key)
+        self._schedule_expiration(key, data_info)
+        if self.debug_accounting:
+            self.verify_memory_accounting()
+        return data_info
+
+    def _submit_background_compression(self, key: str, value: Any, data_info: CacheEntry):
+        with self._compression_metrics_lock:
+            self._compression_metrics['submitted'] += 1
+            self._compression_metrics['pending'] += 1
+            self._compression_metrics['peak_pending'] = max(self._compression_metrics['peak_pending'],
+                                                            self._compression_metrics['pending'])
+        self.compression_pool.submit(self._compress_in_background, key, value, data_info)
+
+    def _compress_in_background(self, key: str, value: Any, data_info: CacheEntry):
+        """
+        Comprime no pool e troca a entrada crua pela comprimida, desde que ela
+        não tenha sido sobrescrita, expirada ou despejada nesse meio tempo.
+        """
+        outcome = 'discarded'
+        try:
+            compressed_data, codec = self._compress_data(key, value)
+            accepted = compressed_data is not None and \
+                sys.getsizeof(compressed_data) / sys.getsizeof(value) <= self.compression_ratio_target
+            self._count_compression(sys.getsizeof(value), sys.getsizeof(compressed_data) if accepted else None)
+            if accepted:
+                with self.lock:
+                    if self.cache_data.get(key) is data_info:
+                        data_info.data = compressed_data
+                        data_info.codec = codec
+                        self._resize_entry(key, data_info, self._charge(key, compressed_data))
+                        if key in self.hot_keys:
+                            self._hot_tier_candidates.add(key)
+                        outcome = 'completed'
+        finally:
+            with self._compression_metrics_lock:
+                self._compression_metrics['pending'] -= 1
+                self._compression_metrics[outcome] += 1
+
+    def compression_queue_metrics(self) -> Dict[str, int]:
+        """
+        Métricas da compressão em background: enviadas, pendentes (profundidade
+        atual da fila), pico de pendentes, concluídas e descartadas (valor
+        incomprimível ou entrada alterada antes da troca).
+        """
+        with self._compression_metrics_lock:
+            return dict(self._compression_metrics)
+
+    def _payload_size(self, stored_value: Any) -> int:
+        if isinstance(stored_value, (str, bytes)):
+            return sys.getsizeof(stored_value)
+        if stored_value.__class__ is SnapshotValue:
+            # Ainda no arquivo: cobra como os bytes que vão ser lidos.
+            return sys.getsizeof(b'') + stored_value.length
+        return self.size_estimator(stored_value)
+
+    def _charge(self, key: str, stored_value: Any) -> int:
+        """Bytes cobrados do orçamento por uma entrada: chave, valor armazenado e metadados."""
+        return sys.getsizeof(key) + self._payload_size(stored_value) + _ENTRY_OVERHEAD
+
+    def _detach_entry(self, key: str) -> Optional[CacheEntry]:
+        """
+        Tira a versão antiga de uma chave que vai ser sobrescrita, debitando seu
+        tamanho, para que o despejo não a escolha como vítima. A contagem de
+        acessos é mantida.
+        """
+        previous = self.cache_data.pop(key, None)
+        if self._prefetched and key in self._prefetched:
+            self._prefetched.discard(key)
+            self.metrics.incr('predictive_unused')
+        if previous is not None:
+            self.lru_queue.discard(key)
+            self.hot_keys.discard(key)
+            self._demote_from_hot_tier(key)
+            if self.eviction_policy is not None:
+                self.eviction_policy.on_remove(key)
+            self.current_memory_usage -= previous.size
+            if self.namespace_quotas:
+                self._debit_namespace(key, previous.size)
+        return previous
+
+    def _evict_until_fits(self, incoming_size: int):
+        """
+        Remove entradas por LRU até caber `incoming_size` bytes.
+        Hot keys são protegidas (voltam para o fim da fila); se sobrarem apenas
+        hot keys, remove a hot key acessada há mais tempo. Com outra
+        `eviction_policy`, as vítimas são escolhidas por ela.
+        """
+        while self.current_memory_usage + incoming_size > self.max_memory_mb:
+            if not self.lru_queue:
+                break  # Evita loop infinito se cache vazio
+            if self.eviction_policy is not None:
+                victim = self.eviction_policy.victim()
+                if victim is None:
+                    break
+                self._evict(victim, 'policy')
+                continue
+            lru_key = self.lru_queue.oldest()
+            if lru_key not in self.hot_keys:
+                self._evict(lru_key, 'lru')
+            elif len(self.hot_keys) >= len(self.lru_queue):
+                self._evict(self.hot_keys.oldest(), 'hot_lru')
             else:
-                self.lru_queue.append(key)
+                self.lru_queue.touch(lru_key)
 
-    def refresh_policy(self, key: str, policy: CachePolicy):
-        if key in self.cache_data:
-            self.cache_data[key]['policy'] = policy
-            self.cache_data[key]['creation_time'] = datetime.now()
-            self.access_timestamps[key].append(time.time())
+    def _evict(self, key: str, reason: str):
+        """
+        Despeja a chave da memória, rebaixando-a para o L2 quando ele existe.
+        `reason` ('lru', 'hot_lru' ou 'policy') rotula o contador de despejos.
+        """
+        data_info = self.cache_data.get(key)
+        hot = key in self.hot_keys
+        # Rebaixada para o L2 a chave continua nos índices: invalidate_* também a alcança lá.
+        self._remove_entry(key, unindex=self.disk_tier is None)
+        if self.metrics is not None:
+            self.metrics.incr('evictions', label=reason)
+        if self.disk_tier is not None and data_info is not None:
+            # Só o buffer e o índice do L2 mudam aqui; a gravação vem depois do lock (_write_behind).
+            self.disk_tier.put(*self._entry_record(key, data_info, hot), write=False)
+
+    def _promote_from_disk(self, key: str, found: Tuple[SnapshotRecord, bytes]) -> Optional[CacheEntry]:
+        """
+        Traz de volta para a memória (chamado sob o lock), com os prazos
+        originais, a entrada lida do L2 por `_read_disk`. Retorna None se ela
+        saiu ou foi regravada no L2 depois da leitura.
+        """
+        if not self.disk_tier.take(key, found[0]):
+            return None
+        return self._store_record(key, *found, allow_pickle=self.disk_tier.allow_pickle)
+
+    def _store_record(self, key: str, record: SnapshotRecord, payload: bytes, tags: Any = _MISSING,
+                      allow_pickle: bool = False) -> CacheEntry:
+        """
+        Insere uma entrada exportada por `_entry_record` (do L2 ou de outro nó)
+        com a política e os prazos originais. Chamado sob o lock.
+        """
+        stored_value = decode_value(record.kind, payload, allow_pickle)
+        data_info = self._store(key, b'' if record.binary else '', stored_value, record.codec,
+                                self._record_policy(record), record.load_time, tags=tags)
+        data_info.creation_time = record.creation_time
+        data_info.last_access = record.last_access
+        self._schedule_expiration(key, data_info)
+        if record.hot:
+            self.hot_keys.touch(key)
+        return data_info
+
+    def _expire_entry(self, key: str, reason: str):
+        logger.debug("Chave '%s' expirou por %s.", key, reason)
+        self._remove_entry(key)
+        if self.metrics is not None:
+            self.metrics.incr('expirations', label=reason)
+
+    def _remove_entry(self, key: str, unindex: bool = True):
+        """
+        Remove a chave do cache e de todos os índices de recência. Com
+        `unindex=False` ela fica nos índices de prefixo e tags (rebaixada ao L2).
+        """
+        data_info = self.cache_data.pop(key, None)
+        if self._prefetched and key in self._prefetched:
+            self._prefetched.discard(key)
+            self.metrics.incr('predictive_unused')
+        self.lru_queue.discard(key)
+        self.hot_keys.discard(key)
+        self._demote_from_hot_tier(key)
+        self.expiration_queue.discard(key)
+        self.frequency_estimator.forget(key)
+        if self.eviction_policy is not None:
+            self.eviction_policy.on_remove(key)
+        if self.disk_tier is not None:
+            self.disk_tier.discard(key, write=False)
+        if unindex:
+            self._unindex(key)
+        if data_info is not None:
+            self.current_memory_usage -= data_info.size
+            if self.namespace_quotas:
+                self._debit_namespace(key, data_info.size)
+            if self.debug_accounting:
+                self.verify_memory_accounting()
+
+    def _index(self, key: str, tags: Any = _MISSING):
+        if self.prefix_index is not None and key.__class__ is str:
+            self.prefix_index.add(key)
+        if tags is not _MISSING:
+            self.tag_index.set(key, tags)
+
+    def _unindex(self, key: str):
+        if self.prefix_index is not None and key.__class__ is str:
+            self.prefix_index.discard(key)
+        self.tag_index.discard(key)
+
+    def _forget_dropped(self, key: str):
+        """Chamado pelo L2 quando descarta uma chave por falta de espaço."""
+        with self.lock:
+            if key not in self.cache_data:
+                self._unindex(key)
+
+    def _namespace(self, key: str) -> Optional[str]:
+        """Namespace com cota a que a chave pertence, ou None."""
+        namespace, separator, _ = key.partition(self.namespace_separator)
+        namespace = namespace if separator else ''
+        return namespace if namespace in self.namespace_quotas else None
+
+    def _charge_namespace(self, namespace: str, key: str, size: int):
+        self.namespace_usage[namespace] += size
+        self._namespace_lru[namespace].touch(key)
+
+    def _debit_namespace(self, key: str, size: int):
+        namespace = self._namespace(key)
+        if namespace is not None:
+            self.namespace_usage[namespace] -= size
+            self._namespace_lru[namespace].discard(key)
+
+    def _evict_namespace_until_fits(self, namespace: str, incoming_size: int):
+        """Despeja as entradas menos recentes do namespace até caber `incoming_size` na cota."""
+        recency = self._namespace_lru[namespace]
+        while recency and self.namespace_usage[namespace] + incoming_size > self.namespace_quotas[namespace]:
+            self._evict(recency.oldest(), 'namespace')
+
+    def _resize_entry(self, key: str, data_info: CacheEntry, new_size: int):
+        """Ajusta o tamanho cobrado de uma entrada cujo valor armazenado mudou."""
+        delta = new_size - data_info.size
+        data_info.size = new_size
+        self.current_memory_usage += delta
+        if self.namespace_quotas:
+            namespace = self._namespace(key)
+            if namespace is not None:
+                self.namespace_usage[namespace] += delta
+
+    def verify_memory_accounting(self) -> int:
+        """
+        Recalcula o uso de memória a partir das entradas e compara com o contador
+        incremental. Retorna o total e lança RuntimeError se houver divergência.
+        """
+        with self.lock:
+            recorded = 0
+            for key, data_info in self.cache_data.items():
+                actual = self._charge(key, data_info.data)
+                if data_info.size != actual:
+                    raise RuntimeError(f"Tamanho registrado de '{key}' ({data_info.size}) difere do real ({actual}).")
+                recorded += actual
+            if recorded != self.current_memory_usage:
+                raise RuntimeError(f"Uso de memória {self.current_memory_usage} difere do total recalculado {recorded}.")
+            return recorded
+
+    def refresh_policy(self, key: str, policy: CachePolicy) -> bool:
+        """Troca a política da entrada e reinicia seus prazos. Retorna se a chave existia."""
+        with self.lock:
+            return self._refresh_entry_policy(key, policy, time.time())
+
+    def _refresh_entry_policy(self, key: str, policy: CachePolicy, now: float) -> bool:
+        data_info = self.cache_data.get(key)
+        if data_info is None:
+            return False
+        self._check_refresh_loader(policy)
+        data_info.policy = policy
+        data_info.creation_time = now
+        data_info.last_access = now
+        self._record_access(key, now)
+        self._schedule_expiration(key, data_info)
+        return True
+
+    def compression_stats(self) -> Dict[str, Dict[str, Tuple[int, float, float]]]:
+        """Por prefixo de chave e codec: (amostras, razão média, bytes economizados por µs)."""
+        with self._codec_lock:
+            return self.codec_selector.report()
+
+    def _gauges(self) -> Dict[str, Tuple[str, float]]:
+        with self.lock:
+            return {
+                'memory_bytes': ("Bytes cobrados pelas entradas em memória", self.current_memory_usage),
+                'max_memory_bytes': ("Orçamento de memória", self.max_memory_mb),
+                'entries': ("Entradas em memória", len(self.cache_data)),
+                'hot_keys': ("Hot keys", len(self.hot_keys)),
+                'hot_tier_bytes': ("Bytes na camada de hot keys descomprimidas", self.hot_tier_usage),
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot do cache: uso de memória, entradas, recargas, compressão em
+        background e L2. Com `metrics=True` inclui também os contadores (hits,
+        misses, despejos e expirações por motivo, compressão, pré-carregamento)
+        e os histogramas de latência (get, put, espera e posse do lock, tick do monitor).
+        """
+        report: Dict[str, Any] = {name: value for name, (_, value) in self._gauges().items()}
+        report['refresh'] = self.refresh_metrics()
+        report['background_compression'] = self.compression_queue_metrics()
+        if self.disk_tier is not None:
+            report['disk_tier'] = self.disk_tier.stats()
+        if self.namespace_quotas:
+            report['namespaces'] = self.namespace_stats()
+        if self.metrics is not None:
+            report.update(self.metrics.snapshot())
+        return report
+
+    def namespace_stats(self) -> Dict[str, Dict[str, int]]:
+        """Uso, cota e entradas de cada namespace com cota."""
+        with self.lock:
+            return {namespace: {'memory_bytes': self.namespace_usage[namespace], 'quota_bytes': quota,
+                                'entries': len(self._namespace_lru[namespace])}
+                    for namespace, quota in self.namespace_quotas.items()}
+
+    def prometheus_text(self, prefix: str = 'adaptive_cache') -> str:
+        """Métricas no formato de exposição texto do Prometheus."""
+        return prometheus_text(self._gauges(), self.metrics, prefix)
 
     def configure_adaptive_behavior(self, hot_key_threshold: int, enable_predictive_loading: bool, compression_ratio_target: float): 
-        self.hot_key_threshold = hot_key_threshold
-        self.compression_ratio_target = compression_ratio_target
-        self.enable_predictive_loading = enable_predictive_loading
+        with self.lock:
+            self.hot_key_threshold = hot_key_threshold
+            self.compression_ratio_target = compression_ratio_target
+            if enable_predictive_loading and not self.enable_predictive_loading:
+                # Hot keys que já existiam também disparam o carregamento preditivo.
+                self._newly_hot.extend(self.hot_keys)
+            self.enable_predictive_loading = enable_predictive_loading
 
     def predictive_load(self):
-        if not self.enable_predictive_loading:
+        """
+        Pré-carrega as chaves associadas às hot keys novas desde o último tick e as
+        previstas pela mineração de co-acesso, pelo caminho normal do put
+        (compressão, contabilidade, LRU e despejo).
+        """
+        if not self.enable_predictive_loading and self.association_miner is None:
             return
-        
+
+        if self.enable_predictive_loading:
+            self.predictive_loader.enqueue(self._drain_newly_hot())
+        for key, value in self.predictive_loader.next_batch():
+            if key in self.cache_data:
+                continue
+            if value is LOAD_FROM_LOADER:
+                try:
+                    value = self.prefetch_loader(key)
+                except Exception as exc:
+                    logger.warning("Falha ao pré-carregar '%s': %s", key, exc)
+                    continue
+                if value is None:
+                    continue
+            self.put(key, value)
+            if self.metrics is not None:
+                with self.lock:
+                    if key in self.cache_data:
+                        self._prefetched.add(key)
+                self.metrics.incr('predictive_loads')
+
+    def enable_association_mining(self, loader: Callable[[str], Any], miner: Optional[CoAccessMiner] = None,
+                                  prefetch_async: bool = True):
+        """
+        Liga a mineração de co-acesso no fluxo de gets. As chaves previstas que não
+        estão no cache são buscadas com `loader(key)` (retornar None ignora a chave)
+        pelo mesmo gancho do carregamento preditivo. Com `prefetch_async`, o
+        pré-carregamento roda logo em uma thread de background; sem ele, no tick do monitor.
+        """
+        with self.lock:
+            self.prefetch_loader = loader
+            self.association_miner = miner or CoAccessMiner()
+            if prefetch_async and self._prefetch_executor is None:
+                self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cache-prefetch')
+
+    def _observe_access(self, key: str):
+        predicted = self.association_miner.record(key, time.time())
+        missing = [predicted_key for predicted_key in predicted if predicted_key not in self.cache_data]
+        if not missing:
+            return
+        self.predictive_loader.enqueue_keys(missing)
+        if self._prefetch_executor is not None and not self._prefetch_scheduled:
+            self._prefetch_scheduled = True
+            self._prefetch_executor.submit(self._run_async_prefetch)
+
+    def _run_async_prefetch(self):
+        self._prefetch_scheduled = False
+        self.predictive_load()
+
+    def _drain_newly_hot(self) -> List[str]:
+        with self.lock:
+            triggers, self._newly_hot = self._newly_hot, []
+        return triggers
+
+    def save_snapshot(self, path: str) -> int:
+        """
+        Grava as entradas vivas em `path` (ver snapshot.py): payloads como estão
+        (sem recomprimir), política, prazos e status de hot key. O lock é pego
+        por blocos de chaves, só para copiar os metadados; a escrita no disco
+        acontece fora dele. Retorna quantas entradas foram gravadas.
+        """
         with self.lock:
-            with open('teste_monitor.json', 'r') as arquivo:
-                dados_python = json.load(arquivo)
-                for key, value in dados_python.items():
-                    if key in self.hot_keys:
-                        for predict_key in value:
-                            if predict_key['key'] not in self.cache_data:
-                                self.cache_data[predict_key['key']] = {
-                                    'data': predict_key['value'],
-                                    'policy': None,
-                                    'size': sys.getsizeof(predict_key['value']),
-                                    'creation_time': datetime.now(),
-                                    'compressed': False
-                                }
-                                
-                                self.current_memory_usage += sys.getsizeof(value)
-                                if key in self.lru_queue:
-                                    self.lru_queue.remove(key)
-                                    self.lru_queue.append(key)
-                                else:
-                                    self.lru_queue.append(key)
+            keys = list(self.lru_queue)
+        written = 0
+
+        def records():
+            nonlocal written
+            for start in range(0, len(keys), _SNAPSHOT_CHUNK):
+                now = time.time()
+                with self.lock:
+                    chunk = [(key, self.cache_data.get(key), key in self.hot_keys)
+                             for key in keys[start:start + _SNAPSHOT_CHUNK]]
+                    chunk = [(key, data_info.copy(), hot) for key, data_info, hot in chunk
+                             if data_info is not None and self._expiry_reason(key, data_info, now) is None]
+                for key, data_info, hot in chunk:
+                    written += 1
+                    yield self._entry_record(key, data_info, hot)
+
+        write_snapshot(path, records())
+        return written
+
+    def _entry_record(self, key: str, data_info: CacheEntry, hot: bool) -> Tuple[SnapshotRecord, bytes]:
+        """Metadados da entrada como SnapshotRecord, mais o payload em bytes (snapshot e L2)."""
+        kind, payload = encode_value(data_info.data, data_info.compressed)
+        policy: Optional[CachePolicy] = data_info.policy or CachePolicy()
+        return SnapshotRecord(
+            key, kind, data_info.codec, hot, data_info.binary,
+            data_info.creation_time, data_info.last_access, data_info.load_time,
+            policy.ttl_seconds, policy.tti_seconds, policy.stale_seconds,
+            policy.early_refresh_beta, policy.max_access, 0, 0,
+        ), payload
+
+    @staticmethod
+    def _record_policy(record: SnapshotRecord) -> Optional[CachePolicy]:
+        fields = {name: timedelta(seconds=seconds) for name, seconds in
+                  (('ttl', record.ttl), ('tti', record.tti), ('stale_while_revalidate', record.stale_while_revalidate))
+                  if seconds is not None}
+        if record.max_access is not None:
+            fields['max_access'] = record.max_access
+        if record.early_refresh_beta is not None:
+            fields['early_refresh_beta'] = record.early_refresh_beta
+        return CachePolicy(**fields) if fields else None
+
+    def load_snapshot(self, path: str, allow_pickle: bool = False) -> int:
+        """
+        Restaura um snapshot gravado por `save_snapshot`. Só o índice é lido agora;
+        cada valor é lido do arquivo mapeado no primeiro `get`. Entradas que
+        morreram enquanto o processo estava parado são ignoradas, chaves já
+        presentes no cache são mantidas e, se o snapshot não couber, ficam as
+        mais recentes. Retorna quantas entradas foram restauradas.
+
+        Um snapshot com valores em pickle (nem str nem bytes) é recusado com
+        ValueError, sem restaurar nada, a menos que `allow_pickle=True`: só
+        use com arquivos confiáveis.
+        """
+        snapshot = Snapshot(path, allow_pickle)
+        try:
+            return self._restore(snapshot, snapshot.records())
+        except ValueError:
+            snapshot.close()
+            raise
+
+    def _restore(self, snapshot: Snapshot, records: Iterable[SnapshotRecord]) -> int:
+        now = time.time()
+        candidates = []
+        for record in records:
+            data_info = CacheEntry(SnapshotValue(snapshot, record.offset, record.length, record.kind),
+                                   self._record_policy(record), 0, record.creation_time, record.last_access,
+                                   0, record.codec, record.binary, record.load_time)
+            if self._expiry_reason(record.key, data_info, now) is None:
+                data_info.size = self._charge(record.key, data_info.data)
+                candidates.append((record.key, data_info, record.hot))
+
+        restored = 0
+        with self.lock:
+            # Os registros vêm do mais antigo para o mais recente; ficam os mais recentes que couberem.
+            budget = self.max_memory_mb - self.current_memory_usage
+            first = len(candidates)
+            while first > 0 and candidates[first - 1][1].size <= budget:
+                first -= 1
+                budget -= candidates[first][1].size
+            for key, data_info, hot in candidates[first:]:
+                if key in self.cache_data:
+                    continue
+                # Dentro de cada namespace com cota também ficam os mais recentes.
+                namespace = self._namespace(key) if self.namespace_quotas else None
+                if namespace is not None:
+                    self._evict_namespace_until_fits(namespace, data_info.size)
+                data_info.access_base = self.frequency_estimator.estimate(key, now)
+                self.cache_data[key] = data_info
+                self.current_memory_usage += data_info.size
+                self.lru_queue.touch(key)
+                self._index(key)
+                if namespace is not None:
+                    self._charge_namespace(namespace, key, data_info.size)
+                if self.eviction_policy is not None:
+                    self.eviction_policy.on_insert(key, data_info.size, now)
+                if hot:
+                    self.hot_keys.touch(key)
+                self._schedule_expiration(key, data_info)
+                restored += 1
+            if self.debug_accounting:
+                self.verify_memory_accounting()
+        self._write_behind()
+        return restored
+
+    def _materialize(self, key: str, data_info: CacheEntry, found: Optional[Tuple[Any, Any]] = None):
+        """
+        Troca o SnapshotValue de uma entrada restaurada pelo valor e ajusta o
+        tamanho cobrado. Usa o que `_read_disk` leu fora do lock se ainda for da
+        mesma entrada; senão lê do snapshot aqui.
+        """
+        if found is not None and found[0] is data_info.data:
+            data_info.data = found[1]
+        else:
+            data_info.data = data_info.data.load()
+        self._resize_entry(key, data_info, self._charge(key, data_info.data))
+
+    def start_periodic_snapshot(self, path: str, interval_seconds: float = 300):
+        """Grava um snapshot em `path` a cada `interval_seconds`, numa thread de background."""
+        def run():
+            try:
+                self.save_snapshot(path)
+            except Exception as exc:
+                logger.warning("Falha ao gravar o snapshot '%s': %s", path, exc)
+            if not self._closed:
+                self.start_periodic_snapshot(path, interval_seconds)
+
+        self.snapshot_thread = threading.Timer(interval_seconds, run)
+        self.snapshot_thread.daemon = True
+        self.snapshot_thread.start()
 
     def batch_operation(self) -> 'BatchOperation':
         return BatchOperation(self)
 
+    def close(self):
+        """Para o monitor, o snapshot periódico e os pools de compressão, pré-carregamento e recarga, e fecha o L2."""
+        self._closed = True
+        if self.monitor_thread:
+            self.monitor_thread.cancel()
+        if self.snapshot_thread:
+            self.snapshot_thread.cancel()
+        if self.compression_pool is not None:
+            self.compression_pool.shutdown(wait=True)
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=True)
+        if self._refresh_executor is not None:
+            self._refresh_executor.shutdown(wait=True)
+        if self.disk_tier is not None:
+            self.disk_tier.close()
+
+    def _run_batch(self, operations: List[tuple]) -> List[Any]:
+        """
+        Executa as operações em ordem com uma única aquisição do lock e retorna um
+        resultado por operação. A compressão dos puts acontece antes, fora do lock,
+        e a descompressão dos gets depois.
+        """
+        encoded = self._encode_many([(op[1], op[2]) for op in operations if op[0] == 'put'])
+        self._observe_batch(operations)
+        disk_reads = self._read_disk_many(operations)
+        with self.lock:
+            results, pending, deferred = self._apply_batch(operations, encoded, disk_reads)
+        self._write_behind()
+        for index, payload in pending:
+            results[index] = self._decompress_data(*payload)
+        self._submit_deferred(deferred)
+        return results
+
+    def _encode_many(self, items: List[Tuple[str, Any]]) -> List[Tuple[Any, Optional[str], bool]]:
+        """Codifica os valores de um lote; os grandes são comprimidos em paralelo no pool, se houver."""
+        large = [index for index, (_, value) in enumerate(items)
+                 if isinstance(value, (str, bytes)) and sys.getsizeof(value) > self.compression_threshold_kb]
+        if self.compression_pool is None or len(large) < 2:
+            return [self._encode(key, value) for key, value in items]
+        futures = {index: self.compression_pool.submit(self._encode, *items[index]) for index in large}
+        return [futures[index].result() if index in futures else self._encode(key, value)
+                for index, (key, value) in enumerate(items)]
+
+    def _read_disk_many(self, operations: List[tuple]) -> Dict[str, Tuple[Any, Any]]:
+        """`_read_disk` das chaves lidas no lote (só no L2 ou restauradas de snapshot)."""
+        found = {}
+        for op in operations:
+            if op[0] == 'get' and op[1] not in found:
+                record = self._read_disk(op[1])
+                if record is not None:
+                    found[op[1]] = record
+        return found
+
+    def _observe_batch(self, operations: List[tuple]):
+        if self.association_miner is not None:
+            for op in operations:
+                if op[0] == 'get':
+                    self._observe_access(op[1])
+
+    def _apply_batch(self, operations: List[tuple], encoded: List[Tuple[Any, Optional[str], bool]],
+                     disk_reads: Optional[Dict[str, Tuple[Any, Any]]] = None
+                     ) -> Tuple[List[Any], List[Tuple[int, Tuple[bytes, str, bool]]], List[tuple]]:
+        """
+        Aplica o lote sob o lock. Retorna os resultados, os gets que ainda precisam
+        ser descomprimidos (índice, payload) e as entradas para compressão em
+        background. O despejo roda uma vez, no fim, contra o total do lote.
+        `disk_reads` traz o que já foi lido do disco (`_read_disk_many`).
+        """
+        disk_reads = disk_reads or {}
+        now = time.time()
+        results: List[Any] = []
+        pending = []
+        deferred = []
+        puts = iter(encoded)
+        for index, op in enumerate(operations):
+            op_type = op[0]
+            if op_type == 'get':
+                value, payload = self._read_entry(op[1], now, disk_reads.pop(op[1], None))
+                if payload is not None:
+                    pending.append((index, payload))
+                results.append(value)
+            elif op_type == 'put':
+                _, key, value, policy, tags = op
+                stored_value, codec, defer = next(puts)
+                data_info = self._store(key, value, stored_value, codec, policy, evict=False, tags=tags)
+                if defer:
+                    deferred.append((key, value, data_info))
+                results.append(None)
+            elif op_type == 'delete':
+                found = self._is_cached(op[1])
+                self._remove_entry(op[1])
+                results.append(found)
+            elif op_type == 'refresh':
+                results.append(self._refresh_entry_policy(op[1], op[2], now))
+            else:
+                raise ValueError(f"Operação de lote desconhecida: {op_type!r}")
+        self._evict_until_fits(0)
+        return results, pending, deferred
+
+    def _submit_deferred(self, deferred: List[tuple]):
+        for key, value, data_info in deferred:
+            self._submit_background_compression(key, value, data_info)
+
 class BatchOperation:
-    """Gerenciador de contexto para operações em lote no cache."""
+    """
+    Gerenciador de contexto para operações em lote no cache. As operações são
+    executadas em ordem, numa única aquisição do lock, ao sair do bloco; depois
+    disso `results` tem um resultado por operação (valor ou None para get, None
+    para put, se a chave existia para delete e refresh).
+    """
     
     def __init__(self, cache):
         self.cache = cache
         self.operations = []
+        self.results: List[Any] = []
 
-    def put(self, key: str, value: str, policy: Optional[Any] = None):
+    def put(self, key: str, value: str, policy: Optional[Any] = None, tags: Optional[Iterable[str]] = None):
         """Adiciona uma operação de 'put' à fila de processamento."""
-        self.operations.append(('put', key, value, policy))
+        self.operations.append(('put', key, value, policy, tags))
+
+    def get(self, key: str):
+        """Adiciona uma leitura; o valor fica em `results` ao sair do bloco."""
+        self.operations.append(('get', key))
+
+    def delete(self, key: str):
+        """Adiciona uma remoção à fila de processamento."""
+        self.operations.append(('delete', key))
+
+    def refresh(self, key: str, policy: CachePolicy):
+        """Adiciona uma troca de política (como `refresh_policy`)."""
+        self.operations.append(('refresh', key, policy))
     
     def __enter__(self):
         """Método chamado ao iniciar o bloco 'with'."""
@@ -240,14 +1635,7 @@ class BatchOperation:
         Método chamado ao sair do bloco 'with'.
         Executa todas as operações em lote.
         """
-        # Garante que as operações sejam atômicas com um lock de threading
-        with self.cache.lock:
-            for op in self.operations:
-                op_type = op[0]
-                if op_type == 'put':
-                    _, key, value, policy = op
-                    # Chama um método privado para processar o put
-                    self.cache.put(key, value, policy)
+        self.results = self.cache._run_batch(self.operations)
         
         # Limpa a lista de operações para que possa ser reutilizada
-        self.operations.clear()
\ No newline at end of file
+        self.operations.clear()
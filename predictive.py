@@ -0,0 +1,182 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import deque, OrderedDict
+import json
+import os
+import re
+import threading
+
+# Valor de item enfileirado que deve ser buscado pelo loader do usuário.
+LOAD_FROM_LOADER = object()
+
+
+class PredictiveLoader:
+    """
+    Índice de associações para o carregamento preditivo (chave gatilho -> chaves relacionadas).
+
+    O arquivo JSON é lido uma vez e só é recarregado quando o mtime muda. Cada
+    gatilho que vira hot key enfileira suas chaves relacionadas, e cada tick do
+    monitor pré-carrega no máximo `max_prefetch_per_tick` delas.
+    """
+
+    def __init__(self, path: str = 'teste_monitor.json', max_prefetch_per_tick: int = 100,
+                 max_pending: int = 10_000):
+        self.path = path
+        self.max_prefetch_per_tick = max_prefetch_per_tick
+        self.max_pending = max_pending
+        self._index: Dict[str, List[Tuple[str, Any]]] = {}
+        self._mtime: Optional[float] = None
+        self._pending: deque = deque()
+        self._pending_keys: set = set()
+        self._lock = threading.Lock()
+
+    def _maybe_reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            self._index, self._mtime = {}, None
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path, 'r') as arquivo:
+            dados_python = json.load(arquivo)
+        self._index = {
+            trigger: [(item['key'], item['value']) for item in related]
+            for trigger, related in dados_python.items()
+        }
+        self._mtime = mtime
+
+    def related(self, trigger: str) -> List[Tuple[str, Any]]:
+        self._maybe_reload()
+        return self._index.get(trigger, [])
+
+    def enqueue(self, triggers: Iterable[str]):
+        """Enfileira as chaves relacionadas aos gatilhos que acabaram de virar hot keys."""
+        triggers = list(triggers)
+        if not triggers:
+            return
+        with self._lock:
+            self._maybe_reload()
+            for trigger in triggers:
+                self._push(self._index.get(trigger, ()))
+
+    def enqueue_keys(self, keys: Iterable[str]):
+        """Enfileira chaves cujo valor será buscado pelo loader (associações mineradas)."""
+        with self._lock:
+            self._push((key, LOAD_FROM_LOADER) for key in keys)
+
+    def _push(self, items: Iterable[Tuple[str, Any]]):
+        for key, value in items:
+            if key in self._pending_keys or len(self._pending) >= self.max_pending:
+                continue
+            self._pending.append((key, value))
+            self._pending_keys.add(key)
+
+    def next_batch(self) -> List[Tuple[str, Any]]:
+        """Retira da fila até `max_prefetch_per_tick` chaves para pré-carregar."""
+        batch = []
+        with self._lock:
+            while self._pending and len(batch) < self.max_prefetch_per_tick:
+                key, value = self._pending.popleft()
+                self._pending_keys.discard(key)
+                batch.append((key, value))
+        return batch
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class _Successors:
+    __slots__ = ('scores',)
+
+    def __init__(self):
+        # sucessor -> (pontuação, instante da última atualização)
+        self.scores: Dict[str, Tuple[float, float]] = {}
+
+
+class CoAccessMiner:
+    """
+    Minera associações de co-acesso a partir do fluxo de gets, com memória limitada.
+
+    - Co-acesso: quando B é lido até `window_ms` depois de A, a pontuação A -> B
+      sobe 1. As pontuações decaem pela metade a cada `half_life` segundos; cada
+      chave guarda no máximo `max_successors` sucessores e no máximo `max_keys`
+      chaves são acompanhadas (LRU).
+    - Sequência: leituras consecutivas de chaves com sufixo numérico crescente
+      (`page:1`, `page:2`) preveem as próximas `sequential_lookahead` chaves.
+    """
+
+    _NUMBERED = re.compile(r'^(.*?)(\d+)$')
+
+    def __init__(self, window_ms: float = 50, history: int = 8, max_successors: int = 8,
+                 max_keys: int = 100_000, half_life: float = 300, min_support: float = 2.0,
+                 max_predictions: int = 4, sequential_lookahead: int = 2):
+        self.window = window_ms / 1000
+        self.max_successors = max_successors
+        self.max_keys = max_keys
+        self.half_life = half_life
+        self.min_support = min_support
+        self.max_predictions = max_predictions
+        self.sequential_lookahead = sequential_lookahead
+        self._recent: deque = deque(maxlen=history)
+        self._successors: 'OrderedDict[str, _Successors]' = OrderedDict()
+        self._sequences: 'OrderedDict[str, Tuple[int, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def _bump(self, source: str, target: str, now: float):
+        successors = self._successors.get(source)
+        if successors is None:
+            successors = self._successors[source] = _Successors()
+            if len(self._successors) > self.max_keys:
+                self._successors.popitem(last=False)
+        else:
+            self._successors.move_to_end(source)
+        scores = successors.scores
+        score, updated = scores.get(target, (0.0, now))
+        scores[target] = (self._decayed(score, updated, now) + 1, now)
+        if len(scores) > self.max_successors:
+            weakest = min(scores, key=lambda k: self._decayed(*scores[k], now))
+            del scores[weakest]
+
+    def _sequential(self, key: str) -> List[str]:
+        match = self._NUMBERED.match(key)
+        if not match:
+            return []
+        prefix, digits = match.groups()
+        number = int(digits)
+        last, run = self._sequences.pop(prefix, (None, 0))
+        run = run + 1 if last is not None and number == last + 1 else 1
+        self._sequences[prefix] = (number, run)
+        if len(self._sequences) > self.max_keys:
+            self._sequences.popitem(last=False)
+        if run < 2:
+            return []
+        width = len(digits) if digits.startswith('0') else 0
+        return [f"{prefix}{number + i:0{width}d}" for i in range(1, self.sequential_lookahead + 1)]
+
+    def record(self, key: str, now: float) -> List[str]:
+        """Registra o acesso e retorna as chaves previstas para serem lidas em seguida."""
+        with self._lock:
+            for previous, at in self._recent:
+                if previous != key and now - at <= self.window:
+                    self._bump(previous, key, now)
+            self._recent.append((key, now))
+            predictions = self._sequential(key)
+            predictions.extend(self._predict(key, now))
+            return predictions
+
+    def _predict(self, key: str, now: float) -> List[str]:
+        successors = self._successors.get(key)
+        if successors is None:
+            return []
+        ranked = sorted(
+            ((self._decayed(score, updated, now), target) for target, (score, updated) in successors.scores.items()),
+            reverse=True,
+        )
+        return [target for score, target in ranked[:self.max_predictions] if score >= self.min_support]
+
+    def predict(self, key: str, now: float) -> List[str]:
+        with self._lock:
+            return self._predict(key, now)
@@ -0,0 +1,263 @@
+from typing import Optional, List, Callable, Dict, Any, Awaitable, Iterable, Tuple, Union
+import itertools
+import os
+import threading
+import time
+
+from new_adaptive_cache import AdaptiveCache, CachePolicy, BatchOperation
+from frequency import FrequencyEstimator
+from disk_tier import DiskTier
+from metrics import CacheMetrics, merged, prometheus_text
+from predictive import PredictiveLoader
+from snapshot import Snapshot, SnapshotRecord
+
+
+class ShardedAdaptiveCache:
+    """
+    AdaptiveCache particionado em N shards independentes (lock striping).
+
+    Cada chave é roteada por hash para um shard, que tem seu próprio lock, LRU,
+    fila de expiração, estimador de frequência e fatia de `max_memory_mb`.
+    Threads que acessam chaves de shards diferentes não disputam o mesmo lock.
+    Um único monitor percorre os shards, um de cada vez.
+    """
+
+    def __init__(self, max_memory_mb: int, compression_threshold_kb: int, shards: int = 16,
+                 frequency_estimator_factory: Optional[Callable[[], FrequencyEstimator]] = None,
+                 disk_tier_factory: Optional[Callable[[], DiskTier]] = None,
+                 start_monitor: bool = True, **cache_options: Any):
+        if shards < 1:
+            raise ValueError("shards deve ser pelo menos 1")
+        # Como a memória, a cota de cada namespace é dividida entre os shards.
+        namespace_quotas = cache_options.pop('namespace_quotas', None)
+        self.shards: List[AdaptiveCache] = [
+            AdaptiveCache(
+                max_memory_mb / shards,
+                compression_threshold_kb,
+                frequency_estimator=frequency_estimator_factory() if frequency_estimator_factory else None,
+                disk_tier=disk_tier_factory() if disk_tier_factory else None,
+                start_monitor=False,
+                namespace_quotas={namespace: mb / shards for namespace, mb in namespace_quotas.items()}
+                if namespace_quotas else None,
+                **cache_options,
+            )
+            for _ in range(shards)
+        ]
+        self.max_memory_mb = max_memory_mb * 1024 * 1024
+        self.enable_predictive_loading: bool = False
+        self.predictive_loader = PredictiveLoader(
+            cache_options.get('predictive_file', 'teste_monitor.json'),
+            cache_options.get('max_prefetch_per_tick', 100),
+        )
+
+        # Métricas do nível particionado (tick do monitor, pré-carregamento); stats() soma com as dos shards.
+        metrics = cache_options.get('metrics')
+        self.metrics: Optional[CacheMetrics] = (metrics if isinstance(metrics, CacheMetrics)
+                                                else CacheMetrics() if metrics else None)
+
+        self.monitor_thread: Optional[threading.Timer] = None
+        self._closed = False
+        if start_monitor:
+            self._start_access_monitor()
+
+    def _shard_for(self, key: str) -> AdaptiveCache:
+        return self.shards[hash(key) % len(self.shards)]
+
+    def _start_access_monitor(self):
+        self.monitor_thread = threading.Timer(1.0, self._monitor_access_counts)
+        self.monitor_thread.daemon = True
+        self.monitor_thread.start()
+
+    def _monitor_access_counts(self):
+        started = time.perf_counter()
+        now = time.time()
+        for shard in self.shards:
+            shard._run_maintenance(now)
+
+        self.predictive_load()
+        if self.metrics is not None:
+            self.metrics.observe('monitor_tick', time.perf_counter() - started)
+        if not self._closed:
+            self._start_access_monitor()
+
+    @property
+    def current_memory_usage(self) -> int:
+        return sum(shard.current_memory_usage for shard in self.shards)
+
+    @property
+    def hot_keys(self) -> List[str]:
+        return [key for shard in self.shards for key in shard.hot_keys]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._shard_for(key).cache_data
+
+    def __len__(self) -> int:
+        return sum(len(shard.cache_data) for shard in self.shards)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._shard_for(key).get(key)
+
+    def put(self, key: str, value: str, policy: Optional[CachePolicy] = None,
+            tags: Optional[Iterable[str]] = None):
+        self._shard_for(key).put(key, value, policy, tags)
+
+    def delete(self, key: str) -> bool:
+        return self._shard_for(key).delete(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        values = self._run_batch([('get', key) for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def put_many(self, items: Union[Dict[str, Any], Iterable[Tuple[str, Any]]], policy: Optional[CachePolicy] = None,
+                 tags: Optional[Iterable[str]] = None):
+        pairs = items.items() if isinstance(items, dict) else items
+        tags = None if tags is None else tuple(tags) if not isinstance(tags, str) else (tags,)
+        self._run_batch([('put', key, value, policy, tags) for key, value in pairs])
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        return sum(self._run_batch([('delete', key) for key in keys]))
+
+    def invalidate_tag(self, tag: str) -> int:
+        return sum(shard.invalidate_tag(tag) for shard in self.shards)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        return sum(shard.invalidate_prefix(prefix) for shard in self.shards)
+
+    def namespace_stats(self) -> Dict[str, Dict[str, int]]:
+        totals: Dict[str, Dict[str, int]] = {}
+        for shard in self.shards:
+            for namespace, usage in shard.namespace_stats().items():
+                total = totals.setdefault(namespace, dict.fromkeys(usage, 0))
+                for name, value in usage.items():
+                    total[name] += value
+        return totals
+
+    def get_or_load(self, key: str, loader: Callable[[str], Any], policy: Optional[CachePolicy] = None) -> Any:
+        return self._shard_for(key).get_or_load(key, loader, policy)
+
+    async def aget_or_load(self, key: str, loader: Callable[[str], Awaitable[Any]],
+                           policy: Optional[CachePolicy] = None) -> Any:
+        return await self._shard_for(key).aget_or_load(key, loader, policy)
+
+    def refresh_policy(self, key: str, policy: CachePolicy) -> bool:
+        return self._shard_for(key).refresh_policy(key, policy)
+
+    def register_loader(self, loader: Callable[[str], Any]):
+        for shard in self.shards:
+            shard.register_loader(loader)
+
+    def entry_state(self, key: str) -> Optional[str]:
+        return self._shard_for(key).entry_state(key)
+
+    def refresh_metrics(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for shard in self.shards:
+            for name, value in shard.refresh_metrics().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def stats(self) -> Dict[str, Any]:
+        """Como AdaptiveCache.stats, somando os shards (histogramas incluídos)."""
+        report: Dict[str, Any] = {name: value for name, (_, value) in self._gauges().items()}
+        report['shards'] = len(self.shards)
+        report['refresh'] = self.refresh_metrics()
+        if self.shards[0].namespace_quotas:
+            report['namespaces'] = self.namespace_stats()
+        metrics = self._merged_metrics()
+        if metrics is not None:
+            report.update(metrics.snapshot())
+        return report
+
+    def prometheus_text(self, prefix: str = 'adaptive_cache') -> str:
+        return prometheus_text(self._gauges(), self._merged_metrics(), prefix)
+
+    def _gauges(self) -> Dict[str, Tuple[str, float]]:
+        totals: Dict[str, Tuple[str, float]] = {}
+        for shard in self.shards:
+            for name, (description, value) in shard._gauges().items():
+                totals[name] = (description, totals.get(name, (description, 0))[1] + value)
+        return totals
+
+    def _merged_metrics(self) -> Optional[CacheMetrics]:
+        return merged([self.metrics] + [shard.metrics for shard in self.shards])
+
+    def access_count(self, key: str) -> int:
+        return self._shard_for(key).access_count(key)
+
+    def configure_adaptive_behavior(self, hot_key_threshold: int, enable_predictive_loading: bool, compression_ratio_target: float):
+        for shard in self.shards:
+            shard.configure_adaptive_behavior(hot_key_threshold, enable_predictive_loading, compression_ratio_target)
+        self.enable_predictive_loading = enable_predictive_loading
+
+    def predictive_load(self):
+        # Roda no nível do cache particionado, pois as chaves relacionadas podem
+        # pertencer a outros shards.
+        if not self.enable_predictive_loading:
+            return
+
+        for shard in self.shards:
+            self.predictive_loader.enqueue(shard._drain_newly_hot())
+        for key, value in self.predictive_loader.next_batch():
+            if key not in self:
+                self.put(key, value)
+                if self.metrics is not None:
+                    shard = self._shard_for(key)
+                    with shard.lock:
+                        if key in shard.cache_data:
+                            shard._prefetched.add(key)
+                    self.metrics.incr('predictive_loads')
+
+    def save_snapshot(self, path: str) -> int:
+        """Grava um snapshot por shard, em `path.0`, `path.1`..."""
+        for index in itertools.count(len(self.shards)):
+            if not os.path.exists(f"{path}.{index}"):
+                break
+            os.remove(f"{path}.{index}")
+        return sum(shard.save_snapshot(f"{path}.{index}") for index, shard in enumerate(self.shards))
+
+    def load_snapshot(self, path: str, allow_pickle: bool = False) -> int:
+        """
+        Restaura os arquivos gravados por `save_snapshot`. As chaves são roteadas de
+        novo, pois o hash das strings (e o número de shards) pode mudar entre processos.
+        Valores em pickle exigem `allow_pickle=True` (ver AdaptiveCache.load_snapshot).
+        """
+        restored = 0
+        for index in itertools.count():
+            if not os.path.exists(f"{path}.{index}"):
+                break
+            snapshot = Snapshot(f"{path}.{index}", allow_pickle)
+            by_shard: Dict[int, List[SnapshotRecord]] = {}
+            try:
+                for record in snapshot.records():
+                    by_shard.setdefault(hash(record.key) % len(self.shards), []).append(record)
+            except ValueError:
+                snapshot.close()
+                raise
+            for shard_index, records in by_shard.items():
+                restored += self.shards[shard_index]._restore(snapshot, records)
+        return restored
+
+    def batch_operation(self) -> BatchOperation:
+        return BatchOperation(self)
+
+    def _run_batch(self, operations: List[tuple]) -> List[Any]:
+        # Cada shard aplica sua parte do lote de forma atômica, sob o próprio lock;
+        # os resultados voltam na ordem original das operações.
+        by_shard: Dict[int, List[int]] = {}
+        for position, op in enumerate(operations):
+            by_shard.setdefault(hash(op[1]) % len(self.shards), []).append(position)
+        results: List[Any] = [None] * len(operations)
+        for index, positions in by_shard.items():
+            shard_results = self.shards[index]._run_batch([operations[position] for position in positions])
+            for position, result in zip(positions, shard_results):
+                results[position] = result
+        return results
+
+    def close(self):
+        """Para o monitor e os pools de compressão e recarga dos shards, e fecha os L2."""
+        self._closed = True
+        if self.monitor_thread:
+            self.monitor_thread.cancel()
+        for shard in self.shards:
+            shard.close()
@@ -0,0 +1,757 @@
+from typing import Optional, List, Dict, Any, Tuple
+from multiprocessing import shared_memory, resource_tracker
+import fcntl
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+import weakref
+import zlib
+
+from new_adaptive_cache import CachePolicy
+from compression import get_codec
+from snapshot import encode_value, decode_value
+
+# Layout do segmento de memória compartilhada (little-endian):
+#   configuração | estado | totais | slots de processo | buckets | arena de slabs
+# A configuração é gravada uma vez por quem cria o segmento. O estado do
+# alocador (lista livre, ponteiro do clock, contadores) e os totais só mudam
+# sob o lock do alocador. Cada bucket guarda o índice do primeiro slab de uma
+# lista encadeada de entradas e é protegido pelo lock da sua faixa.
+MAGIC = b'ACSHM\x00\x00\x00'
+VERSION = 1
+_CONFIG = struct.Struct('<8sHxxIIIII16sQ')
+_STATE = struct.Struct('<iIIIIiI')
+_TOTALS = struct.Struct('<QQQQQ')
+_PROCESS = struct.Struct('<iIQQQQ')
+_BUCKET = struct.Struct('<i')
+# Cada slab começa com (próximo slab da entrada, flags). O primeiro slab da
+# entrada traz também os metadados; os bytes da chave e do valor vêm em seguida
+# e continuam nos próximos slabs da cadeia.
+_SLAB = struct.Struct('<iB3x')
+_ENTRY = struct.Struct('<iIIIBBxxdddi')
+
+_STATE_OFFSET = _CONFIG.size
+_TOTALS_OFFSET = _STATE_OFFSET + _STATE.size
+_PROCESSES_OFFSET = _TOTALS_OFFSET + _TOTALS.size
+
+FLAG_HEAD = 1
+FLAG_REFERENCED = 2
+NO_SLAB = -1
+
+# Entradas de um processo encerrado são somadas aos totais pelo líder.
+_COUNTERS = ('hits', 'misses', 'puts', 'evictions')
+_HITS, _MISSES, _PUTS, _EVICTIONS = range(len(_COUNTERS))
+
+_live_caches: 'weakref.WeakSet[SharedMemoryCache]' = weakref.WeakSet()
+
+
+class _SegmentLocks:
+    """
+    Estado por processo de um segmento, compartilhado por todas as instâncias
+    que o abrem neste processo: o descritor do arquivo de lock, os
+    `threading.Lock` das faixas, os contadores e o slot de processo. Locks
+    `fcntl` são do processo, não do descritor, e caem em qualquer `close` do
+    arquivo; com um registro só, duas instâncias se excluem pelos mesmos
+    locks e o descritor só é fechado quando a última delas fecha.
+    """
+
+    def __init__(self, name: str, lock_stripes: int):
+        self.fd = os.open(_lock_path(name), os.O_RDWR | os.O_CREAT, 0o600)
+        self.thread_locks = [threading.Lock() for _ in range(lock_stripes + 2)]
+        # Uma linha de contadores por faixa, alterada só sob o lock da faixa.
+        self.counters = [[0] * len(_COUNTERS) for _ in range(lock_stripes)]
+        self.users = 0
+        self.reset()
+
+    def reset(self):
+        # Depois de um fork o filho não herda os locks fcntl nem as threads do
+        # pai; as listas são trocadas no lugar porque as instâncias as referenciam.
+        self.thread_locks[:] = [threading.Lock() for _ in self.thread_locks]
+        for row in self.counters:
+            row[:] = [0] * len(_COUNTERS)
+        self.slot: Optional[int] = None
+        self.leader: Optional['SharedMemoryCache'] = None
+
+
+_segments: Dict[str, _SegmentLocks] = {}
+_segments_lock = threading.Lock()
+
+
+def _open_segment_locks(name: str, lock_stripes: int) -> _SegmentLocks:
+    with _segments_lock:
+        segment = _segments.get(name)
+        if segment is None:
+            segment = _segments[name] = _SegmentLocks(name, lock_stripes)
+        segment.users += 1
+        return segment
+
+
+def _after_fork_in_child():
+    global _segments_lock
+    _segments_lock = threading.Lock()
+    for segment in _segments.values():
+        segment.reset()
+    for cache in list(_live_caches):
+        cache._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _lock_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"{name.lstrip('/')}.lock")
+
+
+class SharedMemoryCache:
+    """
+    Cache compartilhado entre processos do mesmo host (ex.: workers do gunicorn).
+
+    Os dados ficam num segmento `multiprocessing.shared_memory`: uma arena de
+    slabs de tamanho fixo e um índice hash com listas encadeadas por bucket.
+    Cada faixa de buckets tem um lock entre processos (lock de registro `fcntl`
+    num arquivo ao lado do segmento, mais um `threading.Lock` para as threads
+    do mesmo processo); o alocador de slabs tem o seu. Instâncias abertas no
+    mesmo processo sobre o mesmo segmento compartilham esses locks. Entradas maiores que um
+    slab ocupam uma cadeia de slabs. Quando a arena enche, um clock (segunda
+    chance) despeja as entradas não lidas desde a última passada.
+
+    Quem cria passa `max_memory_mb` e recebe um nome (`cache.name`); os outros
+    processos usam `SharedMemoryCache.attach(name)`, ou herdam o objeto num
+    fork (o caso do gunicorn com `preload_app`). Um processo é eleito líder por
+    um lock não bloqueante: ele varre a expiração e recolhe os contadores de
+    processos encerrados. Se o líder morre, o lock é liberado pelo SO e outro
+    processo assume no próximo tick.
+
+    Valores str/bytes acima de `compression_threshold_kb` são comprimidos com
+    `codec`; outros tipos são serializados com pickle. A política aceita TTL,
+    TTI e max_access. Lê-se o valor sempre como uma cópia: não há referência ao
+    objeto original entre processos.
+    """
+
+    def __init__(self, max_memory_mb: float, compression_threshold_kb: int, name: Optional[str] = None,
+                 slab_size: int = 512, buckets: Optional[int] = None, lock_stripes: int = 256,
+                 max_processes: int = 64, codec: str = 'zlib-1', start_monitor: bool = True,
+                 monitor_interval: float = 1.0, _attach: bool = False):
+        self.monitor_interval = monitor_interval
+        self.monitor_thread: Optional[threading.Timer] = None
+        self._closed = False
+        if _attach:
+            self._shm = self._open_segment(name)
+            self._read_config()
+        else:
+            if slab_size < _SLAB.size + _ENTRY.size + 16:
+                raise ValueError(f"slab_size deve ser pelo menos {_SLAB.size + _ENTRY.size + 16} bytes")
+            get_codec(codec)
+            self.slab_size = slab_size
+            self.slab_count = int(max_memory_mb * 1024 * 1024) // slab_size
+            if self.slab_count < 1:
+                raise ValueError("max_memory_mb não comporta nenhum slab")
+            self.buckets = buckets or self.slab_count
+            self.lock_stripes = lock_stripes
+            self.max_processes = max_processes
+            self.codec = codec
+            self.compression_threshold = compression_threshold_kb * 1024
+            self._layout()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=self._arena_offset +
+                                                   self.slab_count * self.slab_size)
+            self._initialize()
+        self.name = self._shm.name
+        self._buf = self._shm.buf
+        self._codec = get_codec(self.codec)
+        self._head_capacity = self.slab_size - _SLAB.size - _ENTRY.size
+        self._body_capacity = self.slab_size - _SLAB.size
+        self._segment = _open_segment_locks(self.name, self.lock_stripes)
+        self._lock_fd = self._segment.fd
+        self._thread_locks = self._segment.thread_locks
+        self._counters = self._segment.counters
+        self._allocator_lock = self.lock_stripes
+        self._leader_lock = self.lock_stripes + 1
+        self._reset_process_state()
+        _live_caches.add(self)
+        self._start_monitor = start_monitor
+        if start_monitor:
+            self._start_access_monitor()
+
+    @classmethod
+    def attach(cls, name: str, start_monitor: bool = True, monitor_interval: float = 1.0) -> 'SharedMemoryCache':
+        """Abre um cache já criado por outro processo, com a configuração gravada no segmento."""
+        return cls(0, 0, name=name, start_monitor=start_monitor, monitor_interval=monitor_interval, _attach=True)
+
+    @staticmethod
+    def _open_segment(name: str) -> shared_memory.SharedMemory:
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            pass
+        # Antes do 3.13 quem só abre o segmento também o registra no resource
+        # tracker, que o apagaria ao fim deste processo (ou, se o tracker é o do
+        # criador, desfaria o registro dele).
+        register = resource_tracker.register
+        resource_tracker.register = lambda rname, rtype: None if rtype == 'shared_memory' else register(rname, rtype)
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+    def _layout(self):
+        self._buckets_offset = _PROCESSES_OFFSET + self.max_processes * _PROCESS.size
+        arena = self._buckets_offset + self.buckets * _BUCKET.size
+        self._arena_offset = (arena + 63) // 64 * 64
+
+    def _read_config(self):
+        magic, version, self.buckets, self.slab_size, self.slab_count, self.lock_stripes, self.max_processes, \
+            codec, self.compression_threshold = _CONFIG.unpack_from(self._shm.buf, 0)
+        if magic != MAGIC:
+            self._shm.close()
+            raise ValueError(f"Segmento não é um SharedMemoryCache: '{self._shm.name}'")
+        if version != VERSION:
+            self._shm.close()
+            raise ValueError(f"Versão de SharedMemoryCache não suportada: {version} (esperada {VERSION})")
+        self.codec = codec.rstrip(b'\x00').decode('ascii')
+        self._layout()
+
+    def _initialize(self):
+        buf = self._shm.buf
+        buf[self._buckets_offset:self._buckets_offset + self.buckets * _BUCKET.size] = \
+            b'\xff' * (self.buckets * _BUCKET.size)
+        for slot in range(self.max_processes):
+            _PROCESS.pack_into(buf, _PROCESSES_OFFSET + slot * _PROCESS.size, 0, 0, 0, 0, 0, 0)
+        _TOTALS.pack_into(buf, _TOTALS_OFFSET, 0, 0, 0, 0, 0)
+        # A lista livre começa vazia: slabs nunca usados saem de `unused` em diante,
+        # então as páginas da arena só são tocadas quando recebem dados.
+        _STATE.pack_into(buf, _STATE_OFFSET, NO_SLAB, 0, 0, 0, 0, 0, 0)
+        _CONFIG.pack_into(buf, 0, MAGIC, VERSION, self.buckets, self.slab_size, self.slab_count,
+                          self.lock_stripes, self.max_processes, self.codec.encode('ascii'),
+                          self.compression_threshold)
+
+    def _reset_process_state(self):
+        # Estado local da instância; o do processo fica em `_SegmentLocks`.
+        self.is_leader = False
+
+    def _reset_after_fork(self):
+        if self._closed:
+            return
+        self._reset_process_state()
+        self.monitor_thread = None
+        if self._start_monitor:
+            self._start_access_monitor()
+
+    # Locks entre processos: faixa de bytes i do arquivo de lock (fcntl) mais o
+    # threading.Lock i, porque locks de registro são por processo, não por thread.
+
+    def _lock(self, index: int):
+        self._thread_locks[index].acquire()
+        try:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, index)
+        except BaseException:
+            self._thread_locks[index].release()
+            raise
+
+    def _unlock(self, index: int):
+        fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, index)
+        self._thread_locks[index].release()
+
+    def _bucket_of(self, key_hash: int) -> int:
+        return key_hash % self.buckets
+
+    def _stripe_of(self, bucket: int) -> int:
+        return bucket % self.lock_stripes
+
+    def _bucket_offset(self, bucket: int) -> int:
+        return self._buckets_offset + bucket * _BUCKET.size
+
+    def _slab_offset(self, slab: int) -> int:
+        return self._arena_offset + slab * self.slab_size
+
+    def _slabs_needed(self, length: int) -> int:
+        return 1 + max(0, math.ceil((length - self._head_capacity) / self._body_capacity))
+
+    # Alocador de slabs (sob o lock do alocador).
+
+    def _allocate(self, count: int) -> List[int]:
+        if count > self.slab_count:
+            raise ValueError(f"Valor não cabe no cache: precisa de {count} slabs, a arena tem {self.slab_count}")
+        sweeps = 0
+        while True:
+            self._lock(self._allocator_lock)
+            try:
+                free_head, free_count, hand, entries, cursor, leader, unused = \
+                    _STATE.unpack_from(self._buf, _STATE_OFFSET)
+                if free_count + self.slab_count - unused >= count:
+                    slabs = []
+                    for _ in range(min(count, free_count)):
+                        slabs.append(free_head)
+                        free_head = _SLAB.unpack_from(self._buf, self._slab_offset(free_head))[0]
+                    fresh = count - len(slabs)
+                    slabs.extend(range(unused, unused + fresh))
+                    _STATE.pack_into(self._buf, _STATE_OFFSET, free_head, free_count - count + fresh, hand,
+                                     entries, cursor, leader, unused + fresh)
+                    return slabs
+                _STATE.pack_into(self._buf, _STATE_OFFSET, free_head, free_count, (hand + 1) % self.slab_count,
+                                 entries, cursor, leader, unused)
+            finally:
+                self._unlock(self._allocator_lock)
+            self._clock_step(hand)
+            sweeps += 1
+            if sweeps > 2 * self.slab_count:
+                raise RuntimeError("Não foi possível liberar slabs suficientes na arena compartilhada")
+
+    def _release(self, slabs: List[int], removed_entries: int = 0):
+        """Devolve slabs à lista livre (o chamador segura o lock do alocador)."""
+        free_head, free_count, hand, entries, cursor, leader, unused = _STATE.unpack_from(self._buf, _STATE_OFFSET)
+        for slab in slabs:
+            _SLAB.pack_into(self._buf, self._slab_offset(slab), free_head, 0)
+            free_head = slab
+        _STATE.pack_into(self._buf, _STATE_OFFSET, free_head, free_count + len(slabs), hand,
+                         entries - removed_entries, cursor, leader, unused)
+
+    def _chain(self, head: int) -> List[int]:
+        slabs = [head]
+        next_slab = _SLAB.unpack_from(self._buf, self._slab_offset(head))[0]
+        while next_slab != NO_SLAB:
+            slabs.append(next_slab)
+            next_slab = _SLAB.unpack_from(self._buf, self._slab_offset(next_slab))[0]
+        return slabs
+
+    def _clock_step(self, slab: int):
+        """
+        Uma posição do clock: se o slab é o início de uma entrada lida desde a
+        última passada, apaga o bit de referência; senão despeja a entrada.
+        """
+        offset = self._slab_offset(slab)
+        if not _SLAB.unpack_from(self._buf, offset)[1] & FLAG_HEAD:
+            return
+        key_hash = _ENTRY.unpack_from(self._buf, offset + _SLAB.size)[1]
+        bucket = self._bucket_of(key_hash)
+        stripe = self._stripe_of(bucket)
+        self._lock(stripe)
+        try:
+            # O slab pode ter mudado de dono entre a leitura e o lock.
+            previous = self._find_previous(bucket, slab)
+            if previous is None:
+                return
+            next_slab, flags = _SLAB.unpack_from(self._buf, offset)
+            if flags & FLAG_REFERENCED:
+                _SLAB.pack_into(self._buf, offset, next_slab, flags & ~FLAG_REFERENCED)
+                return
+            self._unlink(bucket, previous, slab)
+            self._counters[stripe][_EVICTIONS] += 1
+        finally:
+            self._unlock(stripe)
+
+    # Índice hash (sob o lock da faixa do bucket).
+
+    def _find_previous(self, bucket: int, target: int) -> Optional[int]:
+        """Slab anterior a `target` na lista do bucket (NO_SLAB se é o primeiro), None se não está lá."""
+        previous = NO_SLAB
+        slab = _BUCKET.unpack_from(self._buf, self._bucket_offset(bucket))[0]
+        while slab != NO_SLAB:
+            if slab == target:
+                return previous
+            previous = slab
+            slab = _ENTRY.unpack_from(self._buf, self._slab_offset(slab) + _SLAB.size)[0]
+        return None
+
+    def _find(self, bucket: int, key_hash: int, key_bytes: bytes) -> Tuple[int, int]:
+        """(slab anterior, slab da entrada) da chave no bucket; slab da entrada é NO_SLAB se não achou."""
+        previous = NO_SLAB
+        slab = _BUCKET.unpack_from(self._buf, self._bucket_offset(bucket))[0]
+        key_start = _SLAB.size + _ENTRY.size
+        while slab != NO_SLAB:
+            offset = self._slab_offset(slab)
+            next_entry, entry_hash, key_length = _ENTRY.unpack_from(self._buf, offset + _SLAB.size)[:3]
+            if entry_hash == key_hash and key_length == len(key_bytes) and \
+                    self._read_bytes(slab, 0, key_length) == key_bytes:
+                return previous, slab
+            previous = slab
+            slab = next_entry
+        return previous, NO_SLAB
+
+    def _unlink(self, bucket: int, previous: int, slab: int):
+        """Tira a entrada da lista do bucket e devolve os slabs dela."""
+        next_entry = _ENTRY.unpack_from(self._buf, self._slab_offset(slab) + _SLAB.size)[0]
+        if previous == NO_SLAB:
+            _BUCKET.pack_into(self._buf, self._bucket_offset(bucket), next_entry)
+        else:
+            self._buf[self._slab_offset(previous) + _SLAB.size:self._slab_offset(previous) + _SLAB.size + 4] = \
+                _BUCKET.pack(next_entry)
+        slabs = self._chain(slab)
+        self._lock(self._allocator_lock)
+        try:
+            self._release(slabs, removed_entries=1)
+        finally:
+            self._unlock(self._allocator_lock)
+
+    def _read_bytes(self, head: int, start: int, length: int) -> bytes:
+        """Lê `length` bytes a partir de `start` nos dados (chave + valor) da cadeia de `head`."""
+        buf = self._buf
+        offset = self._arena_offset + head * self.slab_size
+        begin = offset + _SLAB.size + _ENTRY.size + start
+        if start + length <= self._head_capacity:
+            return bytes(buf[begin:begin + length])
+        parts = []
+        if start < self._head_capacity:
+            take = self._head_capacity - start
+            parts.append(buf[begin:begin + take])
+            length -= take
+            start = 0
+        else:
+            start -= self._head_capacity
+        capacity = self._body_capacity
+        unpack_slab = _SLAB.unpack_from
+        slab = unpack_slab(buf, offset)[0]
+        while length > 0 and slab != NO_SLAB:
+            offset = self._arena_offset + slab * self.slab_size
+            if start < capacity:
+                take = min(capacity - start, length)
+                begin = offset + _SLAB.size + start
+                parts.append(buf[begin:begin + take])
+                length -= take
+                start = 0
+            else:
+                start -= capacity
+            slab = unpack_slab(buf, offset)[0]
+        return b''.join(parts)
+
+    def _write_chain(self, slabs: List[int], key_hash: int, key_bytes: bytes, payload: bytes, kind: int,
+                     compressed: bool, now: float, deadline: float, tti: float, max_access: int):
+        data = key_bytes + payload
+        position = 0
+        for index, slab in enumerate(slabs):
+            offset = self._slab_offset(slab)
+            next_slab = slabs[index + 1] if index + 1 < len(slabs) else NO_SLAB
+            if index == 0:
+                _SLAB.pack_into(self._buf, offset, next_slab, FLAG_HEAD)
+                _ENTRY.pack_into(self._buf, offset + _SLAB.size, NO_SLAB, key_hash, len(key_bytes), len(payload),
+                                 kind, compressed, now, deadline, tti, max_access)
+                start, capacity = offset + _SLAB.size + _ENTRY.size, self._head_capacity
+            else:
+                _SLAB.pack_into(self._buf, offset, next_slab, 0)
+                start, capacity = offset + _SLAB.size, self._body_capacity
+            chunk = data[position:position + capacity]
+            self._buf[start:start + len(chunk)] = chunk
+            position += capacity
+
+    # API pública.
+
+    def __contains__(self, key: str) -> bool:
+        key_bytes = key.encode('utf-8')
+        key_hash = zlib.crc32(key_bytes)
+        bucket = self._bucket_of(key_hash)
+        stripe = self._stripe_of(bucket)
+        self._lock(stripe)
+        try:
+            return self._find(bucket, key_hash, key_bytes)[1] != NO_SLAB
+        finally:
+            self._unlock(stripe)
+
+    def __len__(self) -> int:
+        return _STATE.unpack_from(self._buf, _STATE_OFFSET)[3]
+
+    def get(self, key: str) -> Any:
+        key_bytes = key.encode('utf-8')
+        key_hash = zlib.crc32(key_bytes)
+        bucket = self._bucket_of(key_hash)
+        stripe = self._stripe_of(bucket)
+        now = time.time()
+        self._lock(stripe)
+        try:
+            previous, slab = self._find(bucket, key_hash, key_bytes)
+            if slab == NO_SLAB:
+                self._counters[stripe][_MISSES] += 1
+                return None
+            offset = self._slab_offset(slab)
+            entry_offset = offset + _SLAB.size
+            next_entry, _, key_length, value_length, kind, compressed, last_access, deadline, tti, remaining = \
+                _ENTRY.unpack_from(self._buf, entry_offset)
+            if deadline < now or last_access + tti < now or remaining == 0:
+                self._unlink(bucket, previous, slab)
+                self._counters[stripe][_MISSES] += 1
+                return None
+            payload = self._read_bytes(slab, key_length, value_length)
+            next_slab, flags = _SLAB.unpack_from(self._buf, offset)
+            _SLAB.pack_into(self._buf, offset, next_slab, flags | FLAG_REFERENCED)
+            _ENTRY.pack_into(self._buf, entry_offset, next_entry, key_hash, key_length, value_length, kind,
+                             compressed, now, deadline, tti, remaining - 1 if remaining > 0 else remaining)
+            self._counters[stripe][_HITS] += 1
+        finally:
+            self._unlock(stripe)
+        if compressed:
+            payload = self._codec.decompress(payload)
+        # Aqui o pickle é o formato documentado dos outros tipos (ver o docstring da classe).
+        return decode_value(kind, payload, allow_pickle=True)
+
+    def put(self, key: str, value: Any, policy: Optional[CachePolicy] = None):
+        if policy is not None and (policy.stale_while_revalidate or policy.early_refresh_beta):
+            raise ValueError("SharedMemoryCache não suporta stale_while_revalidate nem early_refresh")
+        key_bytes = key.encode('utf-8')
+        key_hash = zlib.crc32(key_bytes)
+        kind, payload = encode_value(value, False)
+        compressed = False
+        if isinstance(value, (str, bytes)) and len(payload) > self.compression_threshold:
+            encoded = self._codec.compress(payload)
+            if len(encoded) < len(payload):
+                payload, compressed = encoded, True
+        now = time.time()
+        deadline = now + policy.ttl_seconds if policy and policy.ttl else math.inf
+        tti = policy.tti_seconds if policy and policy.tti else math.inf
+        # Acessos restantes; -1 = sem limite.
+        max_access = policy.max_access if policy and policy.max_access else -1
+        # Os slabs são preenchidos antes de pegar o lock do bucket: só o encadeamento fica sob ele.
+        slabs = self._allocate(self._slabs_needed(len(key_bytes) + len(payload)))
+        self._write_chain(slabs, key_hash, key_bytes, payload, kind, compressed, now, deadline, tti, max_access)
+        bucket = self._bucket_of(key_hash)
+        stripe = self._stripe_of(bucket)
+        self._lock(stripe)
+        try:
+            previous, slab = self._find(bucket, key_hash, key_bytes)
+            if slab != NO_SLAB:
+                self._unlink(bucket, previous, slab)
+            head_offset = self._bucket_offset(bucket)
+            first = _BUCKET.unpack_from(self._buf, head_offset)[0]
+            self._buf[self._slab_offset(slabs[0]) + _SLAB.size:self._slab_offset(slabs[0]) + _SLAB.size + 4] = \
+                _BUCKET.pack(first)
+            _BUCKET.pack_into(self._buf, head_offset, slabs[0])
+            self._lock(self._allocator_lock)
+            try:
+                state = list(_STATE.unpack_from(self._buf, _STATE_OFFSET))
+                state[3] += 1
+                _STATE.pack_into(self._buf, _STATE_OFFSET, *state)
+            finally:
+                self._unlock(self._allocator_lock)
+            self._counters[stripe][_PUTS] += 1
+        finally:
+            self._unlock(stripe)
+
+    def delete(self, key: str) -> bool:
+        """Remove a chave. Retorna se ela estava no cache."""
+        key_bytes = key.encode('utf-8')
+        key_hash = zlib.crc32(key_bytes)
+        bucket = self._bucket_of(key_hash)
+        stripe = self._stripe_of(bucket)
+        self._lock(stripe)
+        try:
+            previous, slab = self._find(bucket, key_hash, key_bytes)
+            if slab == NO_SLAB:
+                return False
+            self._unlink(bucket, previous, slab)
+            return True
+        finally:
+            self._unlock(stripe)
+
+    # Monitor: todo processo tenta a liderança a cada tick; só o líder trabalha.
+
+    def _start_access_monitor(self):
+        self.monitor_thread = threading.Timer(self.monitor_interval, self._monitor_tick)
+        self.monitor_thread.daemon = True
+        self.monitor_thread.start()
+
+    def _monitor_tick(self):
+        if self._closed:
+            return
+        self._publish_counters()
+        if self._try_lead():
+            self._collect_dead_processes()
+            self.expire_due_entries(time.time())
+        if not self._closed:
+            self._start_access_monitor()
+
+    def _try_lead(self) -> bool:
+        if not self.is_leader:
+            # O lock fcntl não separa instâncias do mesmo processo: entre elas
+            # a liderança é de quem a registrou no segmento.
+            with self._thread_locks[self._leader_lock]:
+                if self._segment.leader is not None:
+                    return False
+                try:
+                    fcntl.lockf(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self._leader_lock)
+                except OSError:
+                    return False
+                self._segment.leader = self
+            self.is_leader = True
+            self._lock(self._allocator_lock)
+            try:
+                state = list(_STATE.unpack_from(self._buf, _STATE_OFFSET))
+                state[5] = os.getpid()
+                _STATE.pack_into(self._buf, _STATE_OFFSET, *state)
+            finally:
+                self._unlock(self._allocator_lock)
+        return True
+
+    def expire_due_entries(self, now: float, max_buckets: Optional[int] = None) -> int:
+        """
+        Remove as entradas vencidas de uma fatia dos buckets, continuando de onde
+        a varredura anterior parou (o monitor do líder chama a cada tick).
+        Retorna quantas entradas foram removidas.
+        """
+        max_buckets = min(self.buckets, max_buckets or max(1024, self.buckets // 16))
+        self._lock(self._allocator_lock)
+        try:
+            state = list(_STATE.unpack_from(self._buf, _STATE_OFFSET))
+            start = state[4]
+            state[4] = (start + max_buckets) % self.buckets
+            _STATE.pack_into(self._buf, _STATE_OFFSET, *state)
+        finally:
+            self._unlock(self._allocator_lock)
+        expired = 0
+        for step in range(max_buckets):
+            bucket = (start + step) % self.buckets
+            if _BUCKET.unpack_from(self._buf, self._bucket_offset(bucket))[0] == NO_SLAB:
+                continue
+            stripe = self._stripe_of(bucket)
+            self._lock(stripe)
+            try:
+                previous = NO_SLAB
+                slab = _BUCKET.unpack_from(self._buf, self._bucket_offset(bucket))[0]
+                while slab != NO_SLAB:
+                    next_entry, _, _, _, _, _, last_access, deadline, tti, remaining = \
+                        _ENTRY.unpack_from(self._buf, self._slab_offset(slab) + _SLAB.size)
+                    if deadline < now or last_access + tti < now or remaining == 0:
+                        self._unlink(bucket, previous, slab)
+                        expired += 1
+                    else:
+                        previous = slab
+                    slab = next_entry
+            finally:
+                self._unlock(stripe)
+        if expired:
+            self._add_totals(expirations=expired)
+        return expired
+
+    # Contadores: cada processo grava os seus num slot próprio; o líder soma os
+    # slots de processos encerrados aos totais e libera o slot.
+
+    def _process_offset(self, slot: int) -> int:
+        return _PROCESSES_OFFSET + slot * _PROCESS.size
+
+    def _publish_counters(self):
+        pid = os.getpid()
+        segment = self._segment
+        self._lock(self._allocator_lock)
+        try:
+            if segment.slot is None:
+                for slot in range(self.max_processes):
+                    if _PROCESS.unpack_from(self._buf, self._process_offset(slot))[0] == 0:
+                        segment.slot = slot
+                        break
+                else:
+                    return
+            _PROCESS.pack_into(self._buf, self._process_offset(segment.slot), pid, 0,
+                               *(sum(column) for column in zip(*self._counters)))
+        finally:
+            self._unlock(self._allocator_lock)
+
+    def _collect_dead_processes(self):
+        self._lock(self._allocator_lock)
+        try:
+            totals = list(_TOTALS.unpack_from(self._buf, _TOTALS_OFFSET))
+            for slot in range(self.max_processes):
+                pid, _, *counters = _PROCESS.unpack_from(self._buf, self._process_offset(slot))
+                if pid == 0 or _pid_alive(pid):
+                    continue
+                for index, count in enumerate(counters):
+                    totals[index] += count
+                _PROCESS.pack_into(self._buf, self._process_offset(slot), 0, 0, 0, 0, 0, 0)
+            _TOTALS.pack_into(self._buf, _TOTALS_OFFSET, *totals)
+        finally:
+            self._unlock(self._allocator_lock)
+
+    def _add_totals(self, expirations: int):
+        self._lock(self._allocator_lock)
+        try:
+            totals = list(_TOTALS.unpack_from(self._buf, _TOTALS_OFFSET))
+            totals[4] += expirations
+            _TOTALS.pack_into(self._buf, _TOTALS_OFFSET, *totals)
+        finally:
+            self._unlock(self._allocator_lock)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Contadores somados de todos os processos (hits, misses, puts, despejos e
+        expirações), entradas, slabs livres, processos e o pid do líder.
+        """
+        self._publish_counters()
+        self._lock(self._allocator_lock)
+        try:
+            free_head, free_count, hand, entries, cursor, leader, unused = \
+                _STATE.unpack_from(self._buf, _STATE_OFFSET)
+            totals = list(_TOTALS.unpack_from(self._buf, _TOTALS_OFFSET))
+            processes = 0
+            for slot in range(self.max_processes):
+                pid, _, *counters = _PROCESS.unpack_from(self._buf, self._process_offset(slot))
+                if pid:
+                    processes += 1
+                    for index, count in enumerate(counters):
+                        totals[index] += count
+        finally:
+            self._unlock(self._allocator_lock)
+        report = dict(zip(_COUNTERS + ('expirations',), totals))
+        lookups = report['hits'] + report['misses']
+        report.update(hit_ratio=report['hits'] / lookups if lookups else 0.0, entries=entries,
+                      free_slabs=free_count + self.slab_count - unused, slabs=self.slab_count, slab_size=self.slab_size,
+                      processes=processes, leader_pid=leader)
+        return report
+
+    def close(self):
+        """
+        Para o monitor deste processo, libera a liderança e fecha o mapeamento.
+        O segmento continua existindo para os outros processos (ver `unlink`).
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self.monitor_thread:
+            self.monitor_thread.cancel()
+        self._publish_counters()
+        _live_caches.discard(self)
+        self._buf = None
+        self._shm.close()
+        self._release_segment_locks()
+
+    def _release_segment_locks(self):
+        segment = self._segment
+        with _segments_lock:
+            segment.users -= 1
+            if segment.users == 0:
+                # Fechar o descritor libera os locks fcntl deste processo, inclusive a liderança.
+                del _segments[self.name]
+                os.close(segment.fd)
+            elif segment.leader is self:
+                # Outras instâncias seguem usando o descritor: só a liderança é
+                # devolvida, e outra instância ou processo assume no próximo tick.
+                with segment.thread_locks[self._leader_lock]:
+                    fcntl.lockf(segment.fd, fcntl.LOCK_UN, 1, self._leader_lock)
+                    segment.leader = None
+
+    def unlink(self):
+        """Apaga o segmento e o arquivo de lock (normalmente feito por quem criou o cache)."""
+        path = _lock_path(self.name)
+        self.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> 'SharedMemoryCache':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,71 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from concurrent.futures import Future
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes pela mesma chave: só a primeira thread (a líder)
+    executa a função; as demais esperam e recebem o mesmo resultado ou a mesma
+    exceção.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            value = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Versão asyncio do SingleFlight: a corrotina roda uma vez por chave e event
+    loop, e todas as tarefas que pediram a chave aguardam a mesma Task. Cancelar
+    uma das tarefas em espera não cancela o carregamento das outras.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        task = self._calls.get(flight_key)
+        if task is None:
+            task = loop.create_task(fn())
+            self._calls[flight_key] = task
+            task.add_done_callback(lambda done: self._finish(flight_key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: Tuple[asyncio.AbstractEventLoop, str], task: asyncio.Task):
+        self._calls.pop(flight_key, None)
+        if not task.cancelled():
+            # Marca a exceção como lida mesmo se todas as tarefas em espera foram canceladas.
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,206 @@
+from typing import Optional, List, Iterator, NamedTuple, Any, BinaryIO
+import json
+import math
+import mmap
+import os
+import pickle
+import struct
+
+# Layout do arquivo (little-endian):
+#   cabeçalho | payloads | chaves (utf-8) | registros do índice | metadados (JSON)
+# Os payloads são gravados como estão no cache (comprimidos ou não); o índice é
+# uma tabela de registros de tamanho fixo lida direto do mmap.
+MAGIC = b'ACSNAP\x00\x00'
+VERSION = 1
+_HEADER = struct.Struct('<8sHxxxxxxQQQQQ')
+_RECORD = struct.Struct('<QQQIBBBxdddddddq')
+
+KIND_STR = 0
+KIND_BYTES = 1
+KIND_COMPRESSED = 2
+KIND_PICKLE = 3
+
+FLAG_HOT = 1
+FLAG_BINARY = 2
+
+
+class SnapshotRecord(NamedTuple):
+    """Uma entrada do snapshot. Tempos são timestamps de relógio; None = sem limite."""
+    key: str
+    kind: int
+    codec: Optional[str]
+    hot: bool
+    binary: bool
+    creation_time: float
+    last_access: float
+    load_time: float
+    ttl: Optional[float]
+    tti: Optional[float]
+    stale_while_revalidate: Optional[float]
+    early_refresh_beta: Optional[float]
+    max_access: Optional[int]
+    offset: int
+    length: int
+
+
+class SnapshotValue:
+    """Valor ainda não lido do snapshot: aponta para os bytes no arquivo mapeado."""
+
+    __slots__ = ('snapshot', 'offset', 'length', 'kind')
+
+    def __init__(self, snapshot: 'Snapshot', offset: int, length: int, kind: int):
+        self.snapshot = snapshot
+        self.offset = offset
+        self.length = length
+        self.kind = kind
+
+    def raw(self) -> bytes:
+        return self.snapshot.read(self.offset, self.length)
+
+    def load(self) -> Any:
+        """Valor como ele fica guardado no cache (payload comprimido continua comprimido)."""
+        return decode_value(self.kind, self.raw(), self.snapshot.allow_pickle)
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def _or_nan(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def encode_value(stored_value: Any, compressed: bool) -> tuple:
+    """Converte o valor armazenado em (kind, bytes) para gravar no snapshot."""
+    if isinstance(stored_value, SnapshotValue):
+        return stored_value.kind, stored_value.raw()
+    if compressed:
+        return KIND_COMPRESSED, stored_value
+    if isinstance(stored_value, str):
+        return KIND_STR, stored_value.encode('utf-8')
+    if isinstance(stored_value, bytes):
+        return KIND_BYTES, stored_value
+    return KIND_PICKLE, pickle.dumps(stored_value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_value(kind: int, raw: bytes, allow_pickle: bool = False) -> Any:
+    """
+    Inverso de `encode_value`: o valor como ele fica armazenado no cache. Valores
+    em pickle só são lidos com `allow_pickle=True`, porque desserializar pickle
+    de um arquivo adulterado permite executar código.
+    """
+    if kind == KIND_STR:
+        return raw.decode('utf-8')
+    if kind == KIND_PICKLE:
+        if not allow_pickle:
+            raise ValueError("valor em pickle recusado (allow_pickle=False)")
+        return pickle.loads(raw)
+    return raw
+
+
+def write_snapshot(path: str, records: Iterator[tuple]):
+    """
+    Grava o snapshot em `path` de forma atômica (arquivo temporário + rename).
+    `records` produz (SnapshotRecord sem offset/length, payload em bytes), na
+    ordem de recência (mais antiga primeiro).
+    """
+    tmp_path = f"{path}.tmp"
+    codecs: List[str] = []
+    index: List[tuple] = []
+    with open(tmp_path, 'wb') as out:
+        out.write(b'\x00' * _HEADER.size)
+        offset = _HEADER.size
+        for record, payload in records:
+            out.write(payload)
+            index.append((record, offset, len(payload)))
+            offset += len(payload)
+        keys_offset = offset
+        key_offsets = []
+        for record, _, _ in index:
+            encoded_key = record.key.encode('utf-8')
+            key_offsets.append((offset - keys_offset, len(encoded_key)))
+            out.write(encoded_key)
+            offset += len(encoded_key)
+        index_offset = offset
+        for (record, payload_offset, length), (key_offset, key_length) in zip(index, key_offsets):
+            if record.codec is not None and record.codec not in codecs:
+                codecs.append(record.codec)
+            codec_id = codecs.index(record.codec) + 1 if record.codec is not None else 0
+            flags = (FLAG_HOT if record.hot else 0) | (FLAG_BINARY if record.binary else 0)
+            out.write(_RECORD.pack(
+                payload_offset, length, key_offset, key_length, record.kind, codec_id, flags,
+                record.creation_time, record.last_access, record.load_time,
+                _or_nan(record.ttl), _or_nan(record.tti), _or_nan(record.stale_while_revalidate),
+                _or_nan(record.early_refresh_beta),
+                -1 if record.max_access is None else record.max_access,
+            ))
+        meta = json.dumps({'codecs': codecs}).encode('utf-8')
+        meta_offset = index_offset + len(index) * _RECORD.size
+        out.write(meta)
+        out.seek(0)
+        out.write(_HEADER.pack(MAGIC, VERSION, len(index), keys_offset, index_offset, meta_offset, len(meta)))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """
+    Snapshot aberto com mmap. Só o cabeçalho e os metadados são lidos na
+    abertura; os registros são decodificados ao iterar e os payloads só quando
+    um SnapshotValue é lido. Sem `allow_pickle`, iterar um registro em pickle
+    levanta ValueError.
+    """
+
+    def __init__(self, path: str, allow_pickle: bool = False):
+        self.path = path
+        self.allow_pickle = allow_pickle
+        self._file: BinaryIO = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Snapshot vazio ou inválido: '{path}'") from None
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"Snapshot vazio ou inválido: '{path}'")
+        magic, version, count, keys_offset, index_offset, meta_offset, meta_length = \
+            _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Arquivo não é um snapshot do AdaptiveCache: '{path}'")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Versão de snapshot não suportada: {version} (esperada {VERSION})")
+        self.count = count
+        self._keys_offset = keys_offset
+        self._index_offset = index_offset
+        meta = json.loads(self._map[meta_offset:meta_offset + meta_length])
+        self._codecs: List[Optional[str]] = [None] + meta['codecs']
+
+    def read(self, offset: int, length: int) -> bytes:
+        return self._map[offset:offset + length]
+
+    def records(self) -> Iterator[SnapshotRecord]:
+        """Registros na ordem gravada (mais antigo primeiro)."""
+        keys_offset = self._keys_offset
+        view = memoryview(self._map)[self._index_offset:self._index_offset + self.count * _RECORD.size]
+        try:
+            for (offset, length, key_offset, key_length, kind, codec_id, flags, creation_time, last_access,
+                 load_time, ttl, tti, swr, beta, max_access) in _RECORD.iter_unpack(view):
+                start = keys_offset + key_offset
+                if kind == KIND_PICKLE and not self.allow_pickle:
+                    raise ValueError(f"Snapshot '{self.path}' tem valores em pickle; "
+                                     f"use allow_pickle=True só se o arquivo for confiável")
+                yield SnapshotRecord(
+                    self._map[start:start + key_length].decode('utf-8'), kind, self._codecs[codec_id],
+                    bool(flags & FLAG_HOT), bool(flags & FLAG_BINARY), creation_time, last_access, load_time,
+                    _optional(ttl), _optional(tti), _optional(swr), _optional(beta),
+                    None if max_access < 0 else max_access, offset, length,
+                )
+        finally:
+            view.release()
+
+    def close(self):
+        # Entradas ainda não lidas mantêm referência ao mapa; o SO libera quando elas somem.
+        self._file.close()
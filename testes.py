@@ -2,11 +2,35 @@ import unittest
 from datetime import datetime, timedelta
 from freezegun import freeze_time
 import time
+import threading
 import random   
 import string
+import sys
+import os
+import json
+import pickle
+import tempfile
+import asyncio
+import contextlib
 
 # Substitua 'adaptive_cache' pelo nome do seu arquivo.
-from new_adaptive_cache import AdaptiveCache, CachePolicy 
+from new_adaptive_cache import AdaptiveCache, CachePolicy, RecencyIndex, ExpirationQueue, deep_getsizeof
+from frequency import SlidingWindowCounter, CountMinSketch
+from sharded_cache import ShardedAdaptiveCache
+from metrics import CacheMetrics
+from async_cache import AsyncAdaptiveCache
+from compression import CodecSelector, get_codec, probe_compressibility
+from predictive import CoAccessMiner
+from eviction import WTinyLFU, ARC, make_eviction_policy
+from snapshot import SnapshotValue, SnapshotRecord, KIND_BYTES
+from disk_tier import DiskTier
+from key_index import PrefixIndex, TagIndex
+import cluster
+from cluster import HashRing, CacheNode, ClusterClient
+from shared_memory_cache import SharedMemoryCache
+from benchmarks.workloads import WORKLOADS, Op, flash_sale, mixed_sizes
+from benchmarks.trace import TraceRecorder, load_trace
+from benchmarks import suite
 
 # Dados de teste para reutilização
 TEST_KEY = "test_key"
@@ -76,20 +100,20 @@ class TestAdaptiveCache(unittest.TestCase):
         self.cache.put(TEST_KEY, TEST_VALUE, policy=CachePolicy(ttl=300, max_access=5, tti=100))
         self.cache.get(TEST_KEY)  # Primeiro acesso
 
-        initial_count = len(self.cache.access_timestamps[TEST_KEY])
-        initial_time = datetime.fromtimestamp(self.cache.access_timestamps[TEST_KEY][-1])
+        initial_count = self.cache.access_count(TEST_KEY)
+        initial_time = datetime.fromtimestamp(self.cache.cache_data[TEST_KEY].last_access)
 
-        print("VERIFICANDO QUANTIDADE DE ACESSOS...", len(self.cache.access_timestamps[TEST_KEY]))
-        print("VERIFICANDO ULTIMO ACESSO", self.cache.access_timestamps[TEST_KEY][-1])
+        print("VERIFICANDO QUANTIDADE DE ACESSOS...", self.cache.access_count(TEST_KEY))
+        print("VERIFICANDO ULTIMO ACESSO", self.cache.cache_data[TEST_KEY].last_access)
         time.sleep(1)  # Garante que o tempo mude
         self.cache.get(TEST_KEY)
         self.cache.get(TEST_KEY)
 
-        print("VERIFICANDO QUANTIDADE DE ACESSOS POS CLIQUE...", len(self.cache.access_timestamps[TEST_KEY]))
-        print("VERIFICANDO ULTIMO ACESSO POS CLIQUE...", self.cache.access_timestamps[TEST_KEY][-1], '\n')
+        print("VERIFICANDO QUANTIDADE DE ACESSOS POS CLIQUE...", self.cache.access_count(TEST_KEY))
+        print("VERIFICANDO ULTIMO ACESSO POS CLIQUE...", self.cache.cache_data[TEST_KEY].last_access, '\n')
 
-        self.assertEqual(len(self.cache.access_timestamps[TEST_KEY]), initial_count + 2)
-        self.assertGreater(datetime.fromtimestamp(self.cache.access_timestamps[TEST_KEY][-1]), initial_time)
+        self.assertEqual(self.cache.access_count(TEST_KEY), initial_count + 2)
+        self.assertGreater(datetime.fromtimestamp(self.cache.cache_data[TEST_KEY].last_access), initial_time)
 
     def test_put_and_get(self):
         self.cache.put(TEST_KEY, TEST_VALUE)
@@ -131,18 +155,20 @@ class TestAdaptiveCache(unittest.TestCase):
         self.cache.put("large_key", LARGE_VALUE)
         # O valor deve ser comprimido
         data_info = self.cache.cache_data["large_key"]
-        self.assertTrue(data_info['compressed'])
-        self.assertIsInstance(data_info['data'], bytes)
+        self.assertTrue(data_info.compressed)
+        self.assertIsInstance(data_info.data, bytes)
         self.assertEqual(self.cache.get("large_key"), LARGE_VALUE)
         
     def test_no_compression_for_small_data(self):
         self.cache.put("small_key", SMALL_VALUE)
         data_info = self.cache.cache_data["small_key"]
-        self.assertFalse(data_info.get('compressed', False))
-        self.assertIsInstance(data_info['data'], str)
+        self.assertFalse(data_info.compressed)
+        self.assertIsInstance(data_info.data, str)
         self.assertEqual(self.cache.get("small_key"), SMALL_VALUE)
     
     def test_predictive_load_hot_key(self):
+        # As chaves pré-carregadas passam pelo put e sofrem despejo: o cache precisa caber todas.
+        self.cache.max_memory_mb = 1024 * 1024
         self.cache.put("key_tenis", "hot_value")
         self.cache.configure_adaptive_behavior(hot_key_threshold=1, enable_predictive_loading=True, compression_ratio_target=0.7)
         
@@ -154,6 +180,1512 @@ class TestAdaptiveCache(unittest.TestCase):
         
         self.assertIn("key_meia", self.cache.cache_data)
 
+class TestRecencyIndex(unittest.TestCase):
+
+    def test_touch_moves_key_to_most_recent(self):
+        index = RecencyIndex(["a", "b", "c"])
+        index.touch("a")
+        self.assertEqual(list(index), ["b", "c", "a"])
+        self.assertEqual(index.oldest(), "b")
+
+    def test_pop_oldest_and_discard(self):
+        index = RecencyIndex(["a", "b", "c"])
+        self.assertEqual(index.pop_oldest(), "a")
+        self.assertTrue(index.discard("c"))
+        self.assertFalse(index.discard("c"))
+        self.assertEqual(list(index), ["b"])
+
+    def test_eviction_protects_hot_keys(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024)
+        cache.monitor_thread.cancel()
+        cache.max_memory_mb = 3 * cache._charge("hot", "x" * 10)
+        for key in ("hot", "cd1", "cd2"):
+            cache.put(key, "x" * 10)
+        cache.hot_keys.touch("hot")
+        cache.put("cd3", "x" * 10)
+        self.assertIn("hot", cache.cache_data)
+        self.assertNotIn("cd1", cache.cache_data)
+
+    def test_eviction_runs_lru_among_hot_keys(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024)
+        cache.monitor_thread.cancel()
+        cache.max_memory_mb = 2 * cache._charge("ht1", "x" * 10)
+        cache.put("ht1", "x" * 10)
+        cache.put("ht2", "x" * 10)
+        cache.hot_keys.touch("ht2")
+        cache.hot_keys.touch("ht1")
+        cache.put("new", "x" * 10)
+        self.assertNotIn("ht2", cache.cache_data)
+        self.assertIn("ht1", cache.cache_data)
+        self.assertNotIn("ht2", cache.hot_keys)
+
+class TestExpiration(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024)
+        self.cache.monitor_thread.cancel()
+
+    def test_queue_skips_rescheduled_deadlines(self):
+        queue = ExpirationQueue()
+        queue.schedule("a", 10.0)
+        queue.schedule("b", 20.0)
+        queue.schedule("a", 30.0)
+        self.assertEqual(queue.pop_due(25.0), ["b"])
+        self.assertEqual(queue.pop_due(35.0), ["a"])
+        self.assertEqual(len(queue), 0)
+
+    def test_tick_expires_only_due_entries(self):
+        self.cache.put("short", TEST_VALUE, policy=CachePolicy().with_ttl(timedelta(seconds=5)))
+        self.cache.put("long", TEST_VALUE, policy=CachePolicy().with_ttl(timedelta(minutes=5)))
+        self.assertEqual(self.cache._expire_due_entries(time.time() + 10), 1)
+        self.assertNotIn("short", self.cache.cache_data)
+        self.assertIn("long", self.cache.cache_data)
+
+    def test_tti_is_rescheduled_after_access(self):
+        self.cache.put(TEST_KEY, TEST_VALUE, policy=CachePolicy().with_tti(timedelta(seconds=10)))
+        self.cache.cache_data[TEST_KEY].last_access += 8
+        self.assertEqual(self.cache._expire_due_entries(time.time() + 11), 0)
+        self.assertIn(TEST_KEY, self.cache.cache_data)
+        self.assertEqual(self.cache._expire_due_entries(time.time() + 20), 1)
+
+    def test_get_never_returns_stale_value(self):
+        self.cache.put(TEST_KEY, TEST_VALUE, policy=CachePolicy().with_ttl(timedelta(seconds=5)))
+        self.cache.cache_data[TEST_KEY].creation_time -= 6
+        self.assertIsNone(self.cache.get(TEST_KEY))
+        self.assertNotIn(TEST_KEY, self.cache.cache_data)
+
+    def test_max_access_is_enforced_on_get(self):
+        self.cache.put(TEST_KEY, TEST_VALUE, policy=CachePolicy().with_max_access(3))
+        results = [self.cache.get(TEST_KEY) for _ in range(4)]
+        self.assertEqual(results, [TEST_VALUE] * 3 + [None])
+
+    def test_refresh_policy_updates_deadline(self):
+        self.cache.put(TEST_KEY, TEST_VALUE, policy=CachePolicy().with_ttl(timedelta(seconds=5)))
+        self.cache.refresh_policy(TEST_KEY, CachePolicy().with_ttl(timedelta(minutes=10)))
+        self.assertEqual(self.cache._expire_due_entries(time.time() + 60), 0)
+        self.assertGreater(self.cache.expiration_queue.deadline(TEST_KEY), time.time() + 500)
+
+class TestFrequencyEstimators(unittest.TestCase):
+
+    def test_sliding_window_drops_old_buckets(self):
+        counter = SlidingWindowCounter(window_seconds=60, buckets=60)
+        for t in (1000.0, 1000.5, 1030.0):
+            counter.record("k", t)
+        self.assertEqual(counter.estimate("k", 1031.0), 3)
+        self.assertEqual(counter.estimate("k", 1070.0), 1)
+        self.assertEqual(counter.estimate("k", 1200.0), 0)
+
+    def test_count_min_never_underestimates(self):
+        sketch = CountMinSketch(width=64, depth=4)
+        for i in range(500):
+            sketch.record(f"k{i % 50}", 1000.0)
+        for i in range(50):
+            self.assertGreaterEqual(sketch.estimate(f"k{i}", 1000.0), 10)
+
+    def test_count_min_ages_previous_window(self):
+        sketch = CountMinSketch(width=1024, depth=4, window_seconds=60)
+        for _ in range(100):
+            sketch.record("k", 1000.0)
+        self.assertEqual(sketch.estimate("k", 1030.0), 100)
+        self.assertEqual(sketch.estimate("k", 1090.0), 50)
+        self.assertEqual(sketch.estimate("k", 1200.0), 0)
+
+    def test_count_min_top_k_limits_hot_keys(self):
+        sketch = CountMinSketch(width=1024, depth=4, top_k=2)
+        for key, hits in (("a", 30), ("b", 20), ("c", 10)):
+            for _ in range(hits):
+                sketch.record(key, 1000.0)
+        self.assertEqual([key for key, _ in sketch.top_keys()], ["a", "b"])
+        self.assertFalse(sketch.is_hot("c", 10, 5))
+
+    def test_cache_with_count_min_detects_hot_keys(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024,
+                              frequency_estimator=CountMinSketch(width=1024))
+        cache.monitor_thread.cancel()
+        cache.configure_adaptive_behavior(hot_key_threshold=5, enable_predictive_loading=False, compression_ratio_target=0.7)
+        cache.put(TEST_KEY, TEST_VALUE, policy=CachePolicy().with_max_access(8))
+        for _ in range(5):
+            cache.get(TEST_KEY)
+        self.assertIn(TEST_KEY, cache.hot_keys)
+        self.assertEqual(cache.access_count(TEST_KEY), 5)
+
+    def test_max_access_counts_from_reinsertion(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024,
+                              frequency_estimator=CountMinSketch(width=1024))
+        cache.monitor_thread.cancel()
+        cache.put(TEST_KEY, TEST_VALUE, policy=CachePolicy().with_max_access(2))
+        self.assertEqual([cache.get(TEST_KEY) for _ in range(3)], [TEST_VALUE, TEST_VALUE, None])
+        cache.put(TEST_KEY, TEST_VALUE, policy=CachePolicy().with_max_access(2))
+        self.assertEqual(cache.get(TEST_KEY), TEST_VALUE)
+
+class TestShardedAdaptiveCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ShardedAdaptiveCache(max_memory_mb=4, compression_threshold_kb=100, shards=4)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_memory_budget_is_split_across_shards(self):
+        self.assertEqual(len(self.cache.shards), 4)
+        for shard in self.cache.shards:
+            self.assertEqual(shard.max_memory_mb, 1024 * 1024)
+        self.assertEqual(len({id(shard.lock) for shard in self.cache.shards}), 4)
+
+    def test_put_get_and_refresh_route_to_one_shard(self):
+        for i in range(100):
+            self.cache.put(f"key_{i}", f"value_{i}")
+        self.assertEqual(len(self.cache), 100)
+        self.assertEqual(self.cache.get("key_42"), "value_42")
+        owners = [shard for shard in self.cache.shards if "key_42" in shard.cache_data]
+        self.assertEqual(len(owners), 1)
+        self.cache.refresh_policy("key_42", CachePolicy().with_ttl(timedelta(minutes=1)))
+        self.assertIsNotNone(owners[0].expiration_queue.deadline("key_42"))
+
+    def test_batch_operation_spans_shards(self):
+        with self.cache.batch_operation() as batch:
+            for i in range(20):
+                batch.put(f"batch_{i}", "v")
+        self.assertTrue(all(f"batch_{i}" in self.cache for i in range(20)))
+
+    def test_concurrent_access(self):
+        def worker(offset):
+            for i in range(500):
+                self.cache.put(f"t{offset}:{i % 50}", "v")
+                self.cache.get(f"t{offset}:{(i * 7) % 50}")
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.cache), 8 * 50)
+
+class TestMemoryAccounting(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=0.05, compression_threshold_kb=1, debug_accounting=True)
+        self.cache.monitor_thread.cancel()
+
+    def test_overwrite_debits_previous_entry(self):
+        self.cache.put(TEST_KEY, "a" * 500)
+        first = self.cache.current_memory_usage
+        self.cache.put(TEST_KEY, "b" * 10)
+        self.assertLess(self.cache.current_memory_usage, first)
+        self.assertEqual(self.cache.current_memory_usage, self.cache._charge(TEST_KEY, "b" * 10))
+
+    def test_compressed_entry_is_charged_by_stored_size(self):
+        value = "a" * 4096
+        self.cache.put(TEST_KEY, value)
+        data_info = self.cache.cache_data[TEST_KEY]
+        self.assertTrue(data_info.compressed)
+        self.assertLess(self.cache.current_memory_usage, len(value))
+
+    def test_entries_are_slotted_and_share_policies(self):
+        self.cache.put("a", TEST_VALUE, policy=CachePolicy().with_ttl(timedelta(seconds=30)))
+        self.cache.put("b", TEST_VALUE, policy=CachePolicy().with_ttl(timedelta(seconds=30)))
+        first, second = self.cache.cache_data["a"], self.cache.cache_data["b"]
+        self.assertFalse(hasattr(first, '__dict__'))
+        self.assertIsInstance(first.creation_time, float)
+        self.assertIs(first.policy, second.policy)
+
+    def test_expiry_and_eviction_debit(self):
+        self.cache.put("short", TEST_VALUE, policy=CachePolicy().with_ttl(timedelta(seconds=1)))
+        self.cache._expire_due_entries(time.time() + 5)
+        self.assertEqual(self.cache.current_memory_usage, 0)
+        for i in range(500):
+            self.cache.put(f"key_{i}", generate_random_data(size_kb=1))
+        self.assertLessEqual(self.cache.current_memory_usage, self.cache.max_memory_mb)
+        self.assertEqual(self.cache.verify_memory_accounting(), self.cache.current_memory_usage)
+
+    def test_deep_size_estimator(self):
+        value = {"items": [str(i) * 100 for i in range(10)]}
+        self.assertGreater(deep_getsizeof(value), 1000)
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, size_estimator=deep_getsizeof)
+        cache.monitor_thread.cancel()
+        cache.put(TEST_KEY, value)
+        self.assertEqual(cache._payload_size(value), deep_getsizeof(value))
+        self.assertGreater(cache.current_memory_usage, deep_getsizeof(value))
+        self.assertEqual(cache.get(TEST_KEY), value)
+
+    def test_counter_matches_after_mixed_operations(self):
+        rng = random.Random(7)
+        policies = [None, CachePolicy().with_ttl(timedelta(seconds=2)), CachePolicy().with_max_access(3)]
+        now = time.time()
+        for step in range(5000):
+            key = f"k{rng.randrange(200)}"
+            op = rng.random()
+            if op < 0.5:
+                self.cache.put(key, rng.choice(["v", "x" * 2000, generate_random_data(size_kb=2)]), policy=rng.choice(policies))
+            elif op < 0.85:
+                self.cache.get(key)
+            elif op < 0.95:
+                self.cache.refresh_policy(key, rng.choice(policies[1:]))
+            else:
+                self.cache._expire_due_entries(now + step / 100)
+        self.assertEqual(self.cache.verify_memory_accounting(), self.cache.current_memory_usage)
+
+class TestCompressionCodecs(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=10, compression_threshold_kb=1)
+        self.cache.monitor_thread.cancel()
+
+    def test_stdlib_codecs_round_trip(self):
+        data = b"adaptive cache " * 200
+        for name in ('zlib-1', 'zlib-6', 'zlib-9', 'lzma', 'bz2'):
+            codec = get_codec(name)
+            self.assertEqual(codec.decompress(codec.compress(data)), data)
+        with self.assertRaises(ValueError):
+            get_codec('snappy')
+
+    def test_binary_values_are_stored_natively(self):
+        value = bytes(range(256)) * 40
+        self.cache.put("blob", value)
+        self.assertTrue(self.cache.cache_data["blob"].compressed)
+        self.assertEqual(self.cache.get("blob"), value)
+
+    def test_incompressible_payload_skips_full_compression(self):
+        self.assertGreater(probe_compressibility(os.urandom(64 * 1024)), 0.9)
+        self.cache.put("random", os.urandom(64 * 1024))
+        self.assertFalse(self.cache.cache_data["random"].compressed)
+        self.assertEqual(self.cache.compression_stats(), {})
+
+    def test_selector_learns_per_prefix(self):
+        selector = CodecSelector(['zlib-1', 'lzma'], warmup=1, explore=0.0)
+        for name in ('zlib-1', 'lzma'):
+            self.assertEqual(selector.choose("user:1", 0.7), name)
+            selector.record("user:1", name, 1000, 100 if name == 'zlib-1' else 900, 0.001)
+        self.assertEqual(selector.choose("user:2", 0.7), 'zlib-1')
+        self.assertEqual(selector.choose("product:1", 0.7), 'zlib-1')
+        self.assertIn("user", selector.report())
+
+    def test_cache_records_codec_per_entry(self):
+        cache = AdaptiveCache(max_memory_mb=10, compression_threshold_kb=1, codecs=['bz2'])
+        cache.monitor_thread.cancel()
+        cache.put("doc:1", "texto repetido " * 500)
+        self.assertEqual(cache.cache_data["doc:1"].codec, 'bz2')
+        self.assertEqual(cache.get("doc:1"), "texto repetido " * 500)
+        self.assertIn('bz2', cache.compression_stats()["doc"])
+
+class TestHotTier(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=10, compression_threshold_kb=1, hot_tier_mb=1)
+        self.cache.monitor_thread.cancel()
+        self.cache.configure_adaptive_behavior(hot_key_threshold=3, enable_predictive_loading=False, compression_ratio_target=0.7)
+        self.value = "valor comprimido " * 500
+        self.cache.put("hot", self.value)
+        for _ in range(3):
+            self.cache.get("hot")
+        self.cache._run_maintenance(time.time())
+
+    def test_hot_compressed_key_is_promoted_and_served_without_decompressing(self):
+        self.assertIn("hot", self.cache.hot_tier)
+        calls = []
+        original = self.cache._decompress_data
+        self.cache._decompress_data = lambda *args: calls.append(args) or original(*args)
+        self.assertEqual(self.cache.get("hot"), self.value)
+        self.assertEqual(calls, [])
+
+    def test_put_and_expiry_invalidate_tier(self):
+        self.cache.put("hot", "novo valor " * 500, policy=CachePolicy().with_ttl(timedelta(seconds=1)))
+        self.assertNotIn("hot", self.cache.hot_tier)
+        self.assertEqual(self.cache.get("hot"), "novo valor " * 500)
+        self.cache._run_maintenance(time.time())
+        self.assertIn("hot", self.cache.hot_tier)
+        self.cache._run_maintenance(time.time() + 5)
+        self.assertNotIn("hot", self.cache.hot_tier)
+        self.assertEqual(self.cache.hot_tier_usage, 0)
+
+    def test_cooled_keys_are_demoted(self):
+        self.cache._run_maintenance(time.time() + 120)
+        self.assertNotIn("hot", self.cache.hot_tier)
+
+    def test_tier_budget_is_enforced(self):
+        self.cache.hot_tier_budget = sys.getsizeof(self.value) + 10
+        self.cache.put("hot2", "outro valor " * 600)
+        for _ in range(3):
+            self.cache.get("hot2")
+        self.cache._run_maintenance(time.time())
+        self.assertEqual(list(self.cache.hot_tier), ["hot2"])
+        self.assertLessEqual(self.cache.hot_tier_usage, self.cache.hot_tier_budget)
+
+class TestCompressionOffLock(unittest.TestCase):
+
+    def setUp(self):
+        self.value = "payload grande " * 2000
+
+    def test_encode_and_decode_run_outside_the_lock(self):
+        cache = AdaptiveCache(max_memory_mb=10, compression_threshold_kb=1)
+        cache.monitor_thread.cancel()
+        held = []
+        compress, decompress = cache._compress_data, cache._decompress_data
+        cache._compress_data = lambda *args: held.append(cache.lock._is_owned()) or compress(*args)
+        cache._decompress_data = lambda *args: held.append(cache.lock._is_owned()) or decompress(*args)
+        cache.put("big", self.value)
+        self.assertEqual(cache.get("big"), self.value)
+        self.assertEqual(held, [False, False])
+
+    def test_background_pool_swaps_raw_entry_for_compressed(self):
+        cache = AdaptiveCache(max_memory_mb=10, compression_threshold_kb=1, debug_accounting=True,
+                              compression_workers=2, background_compression_threshold_kb=16)
+        cache.monitor_thread.cancel()
+        cache.put("big", self.value)
+        cache.close()
+        self.assertTrue(cache.cache_data["big"].compressed)
+        self.assertEqual(cache.get("big"), self.value)
+        metrics = cache.compression_queue_metrics()
+        self.assertEqual((metrics['submitted'], metrics['completed'], metrics['pending']), (1, 1, 0))
+        cache.verify_memory_accounting()
+
+    def test_background_result_is_discarded_after_overwrite(self):
+        cache = AdaptiveCache(max_memory_mb=10, compression_threshold_kb=1,
+                              compression_workers=1, background_compression_threshold_kb=16)
+        cache.monitor_thread.cancel()
+        gate = threading.Event()
+        cache.compression_pool.submit(gate.wait)
+        cache.put("big", self.value)
+        cache.put("big", "pequeno")
+        gate.set()
+        cache.close()
+        self.assertEqual(cache.get("big"), "pequeno")
+        self.assertEqual(cache.compression_queue_metrics()['discarded'], 1)
+
+class TestPredictiveLoading(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self._write({"key_tenis": [{"key": "key_meia", "value": "meia"}, {"key": "key_calca", "value": "calca"}]})
+        self.cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=100,
+                                   predictive_file=self.path, max_prefetch_per_tick=1)
+        self.cache.monitor_thread.cancel()
+        self.cache.configure_adaptive_behavior(hot_key_threshold=2, enable_predictive_loading=True, compression_ratio_target=0.7)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _write(self, data):
+        with open(self.path, "w") as arquivo:
+            json.dump(data, arquivo)
+
+    def test_only_newly_hot_keys_trigger_bounded_prefetch(self):
+        self.cache.put("key_tenis", "tenis")
+        self.cache.get("key_tenis")
+        self.cache.predictive_load()
+        self.assertNotIn("key_meia", self.cache.cache_data)
+        self.cache.get("key_tenis")
+        self.cache.predictive_load()
+        self.assertIn("key_meia", self.cache.cache_data)
+        self.assertNotIn("key_calca", self.cache.cache_data)
+        self.cache.predictive_load()
+        self.assertIn("key_calca", self.cache.cache_data)
+
+    def test_prefetched_entries_use_put_path(self):
+        self.cache.put("key_tenis", "tenis")
+        self.cache.get("key_tenis")
+        self.cache.get("key_tenis")
+        self.cache.predictive_load()
+        self.assertIn("key_meia", self.cache.lru_queue)
+        self.assertEqual(self.cache.verify_memory_accounting(), self.cache.current_memory_usage)
+
+    def test_index_reloads_only_when_mtime_changes(self):
+        loader = self.cache.predictive_loader
+        self.assertEqual(loader.related("key_tenis")[0], ("key_meia", "meia"))
+        index = loader._index
+        loader.related("key_tenis")
+        self.assertIs(loader._index, index)
+        self._write({"key_bola": [{"key": "key_meiao", "value": "meiao"}]})
+        os.utime(self.path, (time.time() + 10, time.time() + 10))
+        self.assertEqual(loader.related("key_tenis"), [])
+        self.assertEqual(loader.related("key_bola"), [("key_meiao", "meiao")])
+
+class TestCoAccessMining(unittest.TestCase):
+
+    def test_learns_successor_within_window(self):
+        miner = CoAccessMiner(window_ms=50, min_support=2)
+        for i in range(3):
+            miner.record("key_tenis", 1000.0 + i)
+            miner.record("key_meia", 1000.0 + i + 0.01)
+            miner.record("key_outro", 1000.0 + i + 0.5)
+        self.assertEqual(miner.predict("key_tenis", 1003.0), ["key_meia"])
+
+    def test_sequential_keys_predict_next_pages(self):
+        miner = CoAccessMiner(sequential_lookahead=2)
+        self.assertEqual(miner.record("page:7", 1000.0), [])
+        self.assertEqual(miner.record("page:8", 1001.0), ["page:9", "page:10"])
+
+    def test_successors_are_bounded_and_decay(self):
+        miner = CoAccessMiner(window_ms=1000, history=2, max_successors=2, half_life=10, min_support=1)
+        for target in ("a", "b", "c"):
+            miner.record("src", 1000.0)
+            miner.record(target, 1000.1)
+        self.assertEqual(len(miner._successors["src"].scores), 2)
+        self.assertEqual(miner.predict("src", 1100.0), [])
+
+    def test_mined_keys_are_prefetched_through_loader(self):
+        backend = {"key_meia": "meia", "key_tenis": "tenis"}
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=100)
+        cache.monitor_thread.cancel()
+        cache.enable_association_mining(backend.get, CoAccessMiner(window_ms=60_000, min_support=2), prefetch_async=False)
+        cache.put("key_tenis", "tenis")
+        for _ in range(2):
+            cache.get("key_tenis")
+            cache.get("key_meia")
+            cache.get("key_sem_valor")
+        cache.get("key_tenis")
+        cache.predictive_load()
+        self.assertEqual(cache.get("key_meia"), "meia")
+        self.assertNotIn("key_sem_valor", cache.cache_data)
+
+class TestReadThrough(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1)
+        self.cache.monitor_thread.cancel()
+
+    def test_concurrent_misses_call_loader_once(self):
+        calls = []
+        release = threading.Event()
+
+        def loader(key):
+            calls.append(key)
+            release.wait(5)
+            return f"valor de {key}"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_load("key_tenis", loader)))
+                   for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, ["key_tenis"])
+        self.assertEqual(results, ["valor de key_tenis"] * 16)
+        self.assertEqual(self.cache.get("key_tenis"), "valor de key_tenis")
+        self.assertEqual(self.cache._load_flights.in_flight(), 0)
+
+    def test_loader_error_reaches_every_waiter(self):
+        release = threading.Event()
+
+        def loader(key):
+            release.wait(5)
+            raise ConnectionError("banco fora do ar")
+
+        errors = []
+
+        def reader():
+            try:
+                self.cache.get_or_load("key_tenis", loader)
+            except ConnectionError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=reader) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 8)
+        self.assertEqual(len({id(exc) for exc in errors}), 1)
+        self.assertNotIn("key_tenis", self.cache.cache_data)
+
+    def test_loaded_value_goes_through_put(self):
+        value = "tenis " * 2000
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            self.assertEqual(self.cache.get_or_load("key_tenis", lambda key: value), value)
+        self.assertTrue(self.cache.cache_data["key_tenis"].compressed)
+        self.assertEqual(self.cache.verify_memory_accounting(), self.cache.current_memory_usage)
+        self.assertIsNone(self.cache.get_or_load("key_vazia", lambda key: None))
+        self.assertNotIn("key_vazia", self.cache.cache_data)
+
+    def test_async_misses_are_coalesced(self):
+        calls = []
+
+        async def loader(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return "tenis"
+
+        async def main():
+            return await asyncio.gather(*(self.cache.aget_or_load("key_tenis", loader) for _ in range(20)))
+
+        self.assertEqual(asyncio.run(main()), ["tenis"] * 20)
+        self.assertEqual(calls, ["key_tenis"])
+        self.assertEqual(self.cache.get("key_tenis"), "tenis")
+
+    def test_async_loader_error_propagates(self):
+        async def loader(key):
+            await asyncio.sleep(0.01)
+            raise KeyError(key)
+
+        async def main():
+            return await asyncio.gather(*(self.cache.aget_or_load("key_tenis", loader) for _ in range(3)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, KeyError) for result in results))
+
+    def test_async_load_does_not_block_the_loop_on_the_lock(self):
+        held, release = threading.Event(), threading.Event()
+
+        def holder():
+            with self.cache.lock:
+                held.set()
+                release.wait(2)
+
+        async def loader(key):
+            return "tenis " * 2000
+
+        async def main():
+            thread = threading.Thread(target=holder)
+            thread.start()
+            held.wait(2)
+            load = asyncio.ensure_future(self.cache.aget_or_load("key_tenis", loader))
+            ticks = 0
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+            pending = not load.done()
+            release.set()
+            value = await load
+            thread.join()
+            return ticks, pending, value
+
+        ticks, pending, value = asyncio.run(main())
+        self.assertEqual(ticks, 5)
+        self.assertTrue(pending)
+        self.assertEqual(value, "tenis " * 2000)
+        self.assertEqual(self.cache.get("key_tenis"), "tenis " * 2000)
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024)
+        self.cache.monitor_thread.cancel()
+
+    def tearDown(self):
+        self.cache.close()
+
+    def _wait_refreshes(self):
+        deadline = time.time() + 5
+        while self.cache.refresh_metrics()['in_flight'] and time.time() < deadline:
+            time.sleep(0.005)
+
+    def test_entry_states_follow_ttl_and_window(self):
+        # Loader que não acha valor novo: a entrada fica como está até morrer.
+        self.cache.register_loader(lambda key: None)
+        policy = CachePolicy().with_ttl(timedelta(seconds=10)).with_stale_while_revalidate(timedelta(seconds=5))
+        with freeze_time("2025-01-01 12:00:00") as frozen:
+            self.cache.put("key_tenis", "tenis", policy)
+            self.assertEqual(self.cache.entry_state("key_tenis"), 'fresh')
+            frozen.tick(timedelta(seconds=12))
+            self.assertEqual(self.cache.entry_state("key_tenis"), 'stale')
+            self.assertEqual(self.cache.get("key_tenis"), "tenis")
+            frozen.tick(timedelta(seconds=4))
+            self.assertEqual(self.cache.entry_state("key_tenis"), 'dead')
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                self.cache._run_maintenance(time.time())
+        self.assertIsNone(self.cache.entry_state("key_tenis"))
+
+    def test_without_loader_the_stale_window_does_not_apply(self):
+        policy = CachePolicy().with_ttl(timedelta(seconds=10)).with_stale_while_revalidate(timedelta(seconds=5))
+        with freeze_time("2025-01-01 12:00:00") as frozen:
+            with self.assertLogs('new_adaptive_cache', level='WARNING') as logs:
+                self.cache.put("key_tenis", "tenis", policy)
+                self.cache.put("key_meia", "meia", policy)
+            self.assertEqual(len(logs.records), 1)
+            frozen.tick(timedelta(seconds=12))
+            self.assertEqual(self.cache.entry_state("key_tenis"), 'dead')
+            self.assertIsNone(self.cache.get("key_tenis"))
+            # Com o loader registrado depois, a janela volta a valer.
+            self.cache.register_loader(lambda key: None)
+            self.assertEqual(self.cache.entry_state("key_meia"), 'stale')
+
+    def test_stale_read_returns_old_value_and_refreshes_in_background(self):
+        release = threading.Event()
+        calls = []
+
+        def loader(key):
+            calls.append(key)
+            release.wait(5)
+            return "tenis novo"
+
+        self.cache.register_loader(loader)
+        policy = CachePolicy().with_ttl(timedelta(milliseconds=50)).with_stale_while_revalidate(timedelta(seconds=5))
+        self.cache.put("key_tenis", "tenis velho", policy)
+        time.sleep(0.1)
+
+        start = time.perf_counter()
+        for _ in range(10):
+            self.assertEqual(self.cache.get("key_tenis"), "tenis velho")
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(calls, ["key_tenis"])
+
+        release.set()
+        self._wait_refreshes()
+        self.assertEqual(self.cache.get("key_tenis"), "tenis novo")
+        self.assertEqual(self.cache.entry_state("key_tenis"), 'fresh')
+        self.assertEqual(self.cache.refresh_metrics(), {'started': 1, 'completed': 1, 'failed': 0, 'in_flight': 0})
+
+    def test_refresh_does_not_resurrect_removed_keys(self):
+        release = threading.Event()
+        self.cache.register_loader(lambda key: (release.wait(5), "tenis novo")[1])
+        policy = CachePolicy().with_ttl(timedelta(milliseconds=50)).with_stale_while_revalidate(timedelta(seconds=5))
+        removals = {
+            'delete': lambda key: self.cache.delete(key),
+            'tag': lambda key: self.cache.invalidate_tag("promo"),
+            'prefix': lambda key: self.cache.invalidate_prefix(key),
+        }
+        for name, remove in removals.items():
+            key = f"key_{name}"
+            release.clear()
+            self.cache.put(key, "tenis velho", policy, tags="promo")
+            time.sleep(0.1)
+            self.assertEqual(self.cache.get(key), "tenis velho")
+            self.assertTrue(remove(key))
+            release.set()
+            self._wait_refreshes()
+            self.assertNotIn(key, self.cache.cache_data, name)
+            self.assertIsNone(self.cache.get(key), name)
+        self.assertEqual(self.cache.refresh_metrics()['completed'], 0)
+
+    def test_refresh_failure_keeps_serving_stale_value(self):
+        def loader(key):
+            raise ConnectionError("banco fora do ar")
+
+        self.cache.register_loader(loader)
+        policy = CachePolicy().with_ttl(timedelta(milliseconds=10)).with_stale_while_revalidate(timedelta(seconds=5))
+        self.cache.put("key_tenis", "tenis", policy)
+        time.sleep(0.05)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            self.assertEqual(self.cache.get("key_tenis"), "tenis")
+            self._wait_refreshes()
+        self.assertEqual(self.cache.get("key_tenis"), "tenis")
+        self.assertEqual(self.cache.refresh_metrics()['failed'], 1)
+
+    def test_refresh_does_not_clobber_newer_put(self):
+        release = threading.Event()
+        self.cache.register_loader(lambda key: release.wait(5) and "recarregado")
+        policy = CachePolicy().with_ttl(timedelta(milliseconds=10)).with_stale_while_revalidate(timedelta(seconds=5))
+        self.cache.put("key_tenis", "velho", policy)
+        time.sleep(0.05)
+        self.cache.get("key_tenis")
+        self.cache.put("key_tenis", "escrito", policy)
+        release.set()
+        self._wait_refreshes()
+        self.assertEqual(self.cache.cache_data["key_tenis"].data, "escrito")
+
+    def test_early_refresh_fires_before_ttl_for_costly_loads(self):
+        self.cache.register_loader(lambda key: "tenis novo")
+        policy = CachePolicy().with_ttl(timedelta(seconds=10)).with_early_refresh(beta=1.0)
+        with freeze_time("2025-01-01 12:00:00") as frozen:
+            self.cache.get_or_load("key_tenis", lambda key: "tenis", policy)
+            self.cache.cache_data["key_tenis"].load_time = 5.0
+            frozen.tick(timedelta(seconds=9, milliseconds=900))
+            for _ in range(200):
+                self.cache.get("key_tenis")
+        self._wait_refreshes()
+        self.assertEqual(self.cache.refresh_metrics()['completed'], 1)
+        self.assertEqual(self.cache.cache_data["key_tenis"].data, "tenis novo")
+
+    def test_without_loader_ttl_is_still_a_hard_cliff(self):
+        policy = CachePolicy().with_ttl(timedelta(seconds=10)).with_early_refresh()
+        with freeze_time("2025-01-01 12:00:00") as frozen:
+            self.cache.put("key_tenis", "tenis", policy)
+            frozen.tick(timedelta(seconds=11))
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                self.assertIsNone(self.cache.get("key_tenis"))
+
+class TestAsyncAdaptiveCache(unittest.TestCase):
+
+    def run_async(self, coro_fn):
+        async def main():
+            async with AsyncAdaptiveCache(max_memory_mb=1, compression_threshold_kb=1,
+                                          monitor_interval=0.01) as cache:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    return await coro_fn(cache)
+        return asyncio.run(main())
+
+    def test_put_and_get_share_the_sync_structures(self):
+        value = "tenis " * 2000
+
+        async def scenario(cache):
+            await cache.put("key_tenis", value)
+            await cache.put("key_meia", "meia")
+            self.assertTrue(cache.cache.cache_data["key_tenis"].compressed)
+            self.assertEqual(list(cache.cache.lru_queue), ["key_tenis", "key_meia"])
+            self.assertEqual(await cache.get("key_tenis"), value)
+            self.assertEqual(await cache.get("key_meia"), "meia")
+            self.assertIsNone(await cache.get("key_vazia"))
+            return cache.cache.verify_memory_accounting() == cache.cache.current_memory_usage
+
+        self.assertTrue(self.run_async(scenario))
+
+    def test_contended_lock_does_not_block_the_loop(self):
+        held, release = threading.Event(), threading.Event()
+
+        def holder(lock):
+            with lock:
+                held.set()
+                release.wait(2)
+
+        async def scenario(cache):
+            await cache.put("key_tenis", "tenis")
+            thread = threading.Thread(target=holder, args=(cache.cache.lock,))
+            thread.start()
+            held.wait(2)
+            operations = [asyncio.ensure_future(operation) for operation in
+                          (cache.get("key_tenis"), cache.put("key_meia", "meia"), cache.delete("key_vazia"),
+                           cache.get_many(["key_tenis"]), cache.invalidate_prefix("nada"))]
+            ticks = 0
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+            pending = not any(operation.done() for operation in operations)
+            release.set()
+            results = await asyncio.gather(*operations)
+            thread.join()
+            return ticks, pending, results
+
+        ticks, pending, results = self.run_async(scenario)
+        self.assertEqual(ticks, 5)
+        self.assertTrue(pending)
+        self.assertEqual(results, ["tenis", None, False, {"key_tenis": "tenis"}, 0])
+
+    def test_disk_tier_sections_run_in_the_executor(self):
+        threads = []
+
+        async def scenario():
+            cache = AsyncAdaptiveCache(max_memory_mb=0.005, compression_threshold_kb=1024, disk_tier=DiskTier(1))
+            lookup = cache.cache._lookup
+            cache.cache._lookup = lambda key: (threads.append(threading.current_thread()), lookup(key))[1]
+            for n in range(10):
+                await cache.put(f"key_{n}", "x" * 900)
+            value = await cache.get("key_0")
+            await cache.close()
+            return value
+
+        self.assertEqual(asyncio.run(scenario()), "x" * 900)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_compression_runs_in_the_executor(self):
+        threads = []
+
+        async def scenario(cache):
+            encode = cache.cache._encode
+
+            def spy(key, value):
+                threads.append(threading.current_thread())
+                return encode(key, value)
+
+            cache.cache._encode = spy
+            await cache.put("key_tenis", "tenis " * 2000)
+            await cache.put("key_meia", "meia")
+
+        self.run_async(scenario)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_monitor_task_expires_entries(self):
+        async def scenario(cache):
+            await cache.put("key_tenis", "tenis", CachePolicy().with_ttl(timedelta(milliseconds=20)))
+            await asyncio.sleep(0.1)
+            return "key_tenis" in cache
+
+        self.assertFalse(self.run_async(scenario))
+
+    def test_get_or_load_coalesces_async_loaders(self):
+        calls = []
+
+        async def loader(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return "tenis"
+
+        async def scenario(cache):
+            return await asyncio.gather(*(cache.get_or_load("key_tenis", loader) for _ in range(20)))
+
+        self.assertEqual(self.run_async(scenario), ["tenis"] * 20)
+        self.assertEqual(calls, ["key_tenis"])
+
+    def test_async_batch_and_refresh_loader(self):
+        async def loader(key):
+            return "recarregado"
+
+        async def scenario(cache):
+            cache.register_loader(loader)
+            policy = CachePolicy().with_ttl(timedelta(milliseconds=10)).with_stale_while_revalidate(timedelta(seconds=5))
+            async with cache.batch_operation() as batch:
+                batch.put("key_tenis", "tenis", policy)
+                batch.put("key_meia", "meia")
+                batch.get("key_meia")
+            self.assertEqual(batch.results, [None, None, "meia"])
+            self.assertEqual(await cache.get_many(["key_meia", "key_vazia"]), {"key_meia": "meia"})
+            await asyncio.sleep(0.02)
+            self.assertEqual(await cache.get("key_tenis"), "tenis")
+            for _ in range(100):
+                if cache.cache.refresh_metrics()['completed']:
+                    break
+                await asyncio.sleep(0.01)
+            return await cache.get("key_tenis")
+
+        self.assertEqual(self.run_async(scenario), "recarregado")
+
+class TestEvictionPolicies(unittest.TestCase):
+
+    def make_cache(self, policy, entries=20):
+        entry = sys.getsizeof("key_00") + sys.getsizeof("v" * 100) + 200
+        return AdaptiveCache(max_memory_mb=entries * entry / (1024 * 1024), compression_threshold_kb=1024,
+                             start_monitor=False, eviction_policy=policy)
+
+    def read_through(self, cache, keys):
+        hits = 0
+        for key in keys:
+            if cache.get(key) is not None:
+                hits += 1
+            else:
+                cache.put(key, "v" * 100)
+        return hits
+
+    def test_unknown_policy_is_rejected(self):
+        self.assertIsNone(make_eviction_policy('lru'))
+        self.assertIsInstance(make_eviction_policy('wtinylfu'), WTinyLFU)
+        with self.assertRaises(ValueError):
+            make_eviction_policy('mru')
+
+    def test_policy_instance_cannot_be_shared(self):
+        policy = WTinyLFU()
+        self.make_cache(policy)
+        with self.assertRaises(ValueError):
+            self.make_cache(policy)
+
+    def test_wtinylfu_keeps_warm_keys_through_a_scan(self):
+        warm = [f"key_{n:02d}" for n in range(10)]
+        cache = self.make_cache('wtinylfu')
+        for _ in range(5):
+            self.read_through(cache, warm)
+        self.read_through(cache, [f"scan_{n}" for n in range(200)])
+        self.assertEqual(self.read_through(cache, warm), 10)
+        self.assertLessEqual(cache.current_memory_usage, cache.max_memory_mb)
+        self.assertEqual(cache.verify_memory_accounting(), cache.current_memory_usage)
+
+    def test_lru_loses_warm_keys_to_the_same_scan(self):
+        warm = [f"key_{n:02d}" for n in range(10)]
+        cache = self.make_cache('lru')
+        for _ in range(5):
+            self.read_through(cache, warm)
+        self.read_through(cache, [f"scan_{n}" for n in range(200)])
+        self.assertEqual(self.read_through(cache, warm), 0)
+
+    def test_arc_moves_reused_keys_to_t2(self):
+        cache = self.make_cache('arc')
+        self.read_through(cache, ["key_00", "key_01", "key_00"])
+        policy = cache.eviction_policy
+        self.assertIn("key_00", policy.t2)
+        self.assertIn("key_01", policy.t1)
+        self.read_through(cache, [f"scan_{n}" for n in range(100)])
+        self.assertIn("key_00", cache.cache_data)
+        self.assertLessEqual(cache.current_memory_usage, cache.max_memory_mb)
+
+    def test_removal_and_expiry_leave_the_policy(self):
+        cache = self.make_cache('wtinylfu')
+        cache.put("key_00", "v")
+        cache.put("key_01", "v", CachePolicy().with_ttl(timedelta(seconds=1)))
+        cache.delete("key_00")
+        with freeze_time(datetime.now() + timedelta(seconds=5)):
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                self.assertIsNone(cache.get("key_01"))
+        policy = cache.eviction_policy
+        self.assertEqual(len(policy.window) + len(policy.probation) + len(policy.protected), 0)
+
+    def test_overwrite_in_a_full_cache_keeps_the_tags(self):
+        for name in ('wtinylfu', 'arc'):
+            cache = self.make_cache(name)
+            cache.put("key_a", "v" * 100, tags=["t"])
+            cache.put("key_b", "v" * 100, tags=["t"])
+            n = 0
+            while cache.current_memory_usage + cache._charge("key", "v" * 100) <= cache.max_memory_mb:
+                cache.put(f"key_{n:02d}", "v" * 100)
+                n += 1
+            self.assertIn("key_a", cache.cache_data)
+            # Sobrescrita maior, pelo caminho do refresh e da promoção do L2 (tags mantidas).
+            with cache.lock:
+                cache._store("key_a", "w" * 300, "w" * 300, None, None)
+            self.assertEqual(cache.get("key_a"), "w" * 300)
+            expected = 1 + ("key_b" in cache.cache_data)
+            self.assertEqual(cache.invalidate_tag("t"), expected, name)
+            self.assertNotIn("key_a", cache.cache_data)
+            self.assertEqual(cache.verify_memory_accounting(), cache.current_memory_usage)
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False,
+                                   debug_accounting=True)
+        self.path = os.path.join(tempfile.mkdtemp(), "cache.snap")
+
+    def test_round_trip_is_lazy_and_keeps_payloads(self):
+        value = "tenis " * 2000
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            self.cache.put("key_tenis", value, CachePolicy().with_ttl(timedelta(minutes=5)))
+        self.cache.put("key_bytes", b"\x00\x01")
+        self.cache.put("key_dict", {"preco": 10})
+        compressed = self.cache.cache_data["key_tenis"].data
+        self.assertEqual(self.cache.save_snapshot(self.path), 3)
+
+        restored = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False,
+                                 debug_accounting=True)
+        self.assertEqual(restored.load_snapshot(self.path, allow_pickle=True), 3)
+        self.assertEqual(list(restored.lru_queue), ["key_tenis", "key_bytes", "key_dict"])
+        self.assertIsInstance(restored.cache_data["key_tenis"].data, SnapshotValue)
+        self.assertEqual(restored.get("key_tenis"), value)
+        self.assertEqual(restored.cache_data["key_tenis"].data, compressed)
+        self.assertEqual(restored.cache_data["key_tenis"].codec, self.cache.cache_data["key_tenis"].codec)
+        self.assertEqual(restored.get("key_bytes"), b"\x00\x01")
+        self.assertEqual(restored.get("key_dict"), {"preco": 10})
+        self.assertEqual(restored.verify_memory_accounting(), restored.current_memory_usage)
+
+    def test_remaining_ttl_and_hot_status_survive(self):
+        with freeze_time("2025-01-01 12:00:00") as frozen:
+            self.cache.put("key_tenis", "tenis", CachePolicy().with_ttl(timedelta(seconds=60)))
+            self.cache.put("key_meia", "meia", CachePolicy().with_ttl(timedelta(seconds=10)))
+            self.cache.hot_keys.touch("key_tenis")
+            self.cache.save_snapshot(self.path)
+            frozen.tick(timedelta(seconds=30))
+            restored = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False)
+            self.assertEqual(restored.load_snapshot(self.path), 1)
+            self.assertIn("key_tenis", restored.hot_keys)
+            self.assertEqual(restored.cache_data["key_tenis"].policy.ttl, timedelta(seconds=60))
+            self.assertEqual(restored.expiration_queue.deadline("key_tenis"), time.time() + 30)
+
+    def test_only_newest_entries_are_restored_when_over_budget(self):
+        for n in range(10):
+            self.cache.put(f"key_{n}", "x" * 900)
+        self.cache.save_snapshot(self.path)
+        small = AdaptiveCache(max_memory_mb=0.005, compression_threshold_kb=1024, start_monitor=False)
+        restored = small.load_snapshot(self.path)
+        self.assertTrue(0 < restored < 10)
+        self.assertIn("key_9", small.cache_data)
+        self.assertNotIn("key_0", small.cache_data)
+        self.assertLessEqual(small.current_memory_usage, small.max_memory_mb)
+
+    def test_rejects_other_files_and_versions(self):
+        with open(self.path, 'wb') as out:
+            out.write(b"nao e um snapshot" * 10)
+        with self.assertRaises(ValueError):
+            self.cache.load_snapshot(self.path)
+
+    def test_pickle_values_need_allow_pickle(self):
+        self.cache.put("key_tenis", "tenis")
+        self.cache.put("key_dict", {"preco": 10})
+        self.cache.save_snapshot(self.path)
+        restored = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False)
+        with self.assertRaises(ValueError):
+            restored.load_snapshot(self.path)
+        self.assertEqual(len(restored.cache_data), 0)
+        self.assertEqual(restored.load_snapshot(self.path, allow_pickle=True), 2)
+        self.assertEqual(restored.get("key_dict"), {"preco": 10})
+
+    def test_restored_value_is_read_outside_the_lock(self):
+        self.cache.put("key_tenis", "tenis")
+        self.cache.put("key_meia", "meia")
+        self.cache.save_snapshot(self.path)
+        restored = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False)
+        restored.load_snapshot(self.path)
+        snapshot = restored.cache_data["key_tenis"].data.snapshot
+        read = snapshot.read
+        locked = []
+        snapshot.read = lambda offset, length: (locked.append(restored.lock._is_owned()), read(offset, length))[1]
+        self.assertEqual(restored.get("key_tenis"), "tenis")
+        self.assertEqual(restored.get_many(["key_meia"]), {"key_meia": "meia"})
+        self.assertEqual(locked, [False, False])
+
+    def test_sharded_snapshot_reroutes_keys(self):
+        sharded = ShardedAdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024, shards=4)
+        other = ShardedAdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024, shards=2)
+        try:
+            sharded.put_many((f"key_{n}", n) for n in range(40))
+            self.assertEqual(sharded.save_snapshot(self.path), 40)
+            self.assertEqual(other.load_snapshot(self.path, allow_pickle=True), 40)
+            self.assertEqual(other.get_many(f"key_{n}" for n in range(40)), {f"key_{n}": n for n in range(40)})
+        finally:
+            sharded.close()
+            other.close()
+
+class TestDiskTier(unittest.TestCase):
+
+    def setUp(self):
+        self.tier = DiskTier(max_disk_mb=1, segment_mb=0.01, write_buffer_kb=4)
+        self.cache = AdaptiveCache(max_memory_mb=0.005, compression_threshold_kb=1, start_monitor=False,
+                                   disk_tier=self.tier, debug_accounting=True)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def fill(self, count, size=900):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for n in range(count):
+                self.cache.put(f"key_{n}", f"{n:04d}" + "x" * size)
+
+    def quiet_get(self, key):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return self.cache.get(key)
+
+    @staticmethod
+    def record(key):
+        return SnapshotRecord(key, KIND_BYTES, None, False, True, time.time(), time.time(), 0.0,
+                              None, None, None, None, None, 0, 0)
+
+    def test_evicted_entries_are_demoted_and_promoted_back(self):
+        self.fill(10)
+        self.assertNotIn("key_0", self.cache.cache_data)
+        self.assertIn("key_0", self.tier)
+        self.assertEqual(self.quiet_get("key_0"), "0000" + "x" * 900)
+        self.assertIn("key_0", self.cache.cache_data)
+        self.assertNotIn("key_0", self.tier)
+        self.assertEqual(self.tier.stats()['hits'], 1)
+        self.assertEqual(self.cache.verify_memory_accounting(), self.cache.current_memory_usage)
+
+    def test_pickle_values_need_allow_pickle(self):
+        self.cache.put("key_dict", {"preco": 10})
+        self.fill(10)
+        self.assertNotIn("key_dict", self.cache.cache_data)
+        self.assertNotIn("key_dict", self.tier)
+        tier = DiskTier(max_disk_mb=1, segment_mb=0.01, write_buffer_kb=4, allow_pickle=True)
+        cache = AdaptiveCache(max_memory_mb=0.005, compression_threshold_kb=1, start_monitor=False, disk_tier=tier)
+        try:
+            cache.put("key_dict", {"preco": 10})
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                for n in range(10):
+                    cache.put(f"key_{n}", "x" * 900)
+            self.assertIn("key_dict", tier)
+            self.assertEqual(cache.get("key_dict"), {"preco": 10})
+        finally:
+            cache.close()
+
+    def test_compressed_payload_is_written_as_is(self):
+        value = "tenis " * 2000
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            self.cache.put("key_tenis", value)
+        compressed = self.cache.cache_data["key_tenis"].data
+        codec = self.cache.cache_data["key_tenis"].codec
+        self.fill(10)
+        record, payload = self.tier.pop("key_tenis")
+        self.assertEqual(payload, compressed)
+        self.assertEqual(record.codec, codec)
+
+    def test_ttl_is_kept_across_tiers(self):
+        with freeze_time("2025-01-01 12:00:00") as frozen:
+            self.cache.put("key_tenis", "tenis", CachePolicy().with_ttl(timedelta(seconds=30)))
+            self.fill(10)
+            self.assertIn("key_tenis", self.tier)
+            frozen.tick(timedelta(seconds=10))
+            self.assertEqual(self.quiet_get("key_tenis"), "tenis")
+            self.assertAlmostEqual(self.cache.expiration_queue.deadline("key_tenis"), time.time() + 20)
+            frozen.tick(timedelta(seconds=21))
+            self.assertIsNone(self.quiet_get("key_tenis"))
+
+    def test_delete_and_put_invalidate_disk_copy(self):
+        self.fill(10)
+        self.assertTrue(self.cache.delete("key_0"))
+        self.assertNotIn("key_0", self.tier)
+        self.cache.put("key_1", "novo")
+        self.assertNotIn("key_1", self.tier)
+        self.assertIsNone(self.quiet_get("key_0"))
+        self.assertEqual(self.quiet_get("key_1"), "novo")
+
+    def test_disk_io_runs_outside_the_cache_lock(self):
+        held = []
+        write, pread = os.write, os.pread
+        os.write = lambda *args: held.append(self.cache.lock._is_owned()) or write(*args)
+        os.pread = lambda *args: held.append(self.cache.lock._is_owned()) or pread(*args)
+        try:
+            self.fill(40)
+            values = [self.quiet_get(f"key_{n}") for n in range(40)]
+        finally:
+            os.write, os.pread = write, pread
+        self.assertEqual(values, [f"{n:04d}" + "x" * 900 for n in range(40)])
+        self.assertGreater(self.tier.stats()['flushes'], 0)
+        self.assertTrue(held)
+        self.assertNotIn(True, held)
+
+    def test_promotion_rechecks_the_disk_entry(self):
+        self.fill(10)
+        found = self.cache._read_disk("key_0")
+        self.cache.put("key_0", "novo")
+        for n in range(10):
+            self.cache.put(f"other_{n}", "x" * 900)
+        self.assertIn("key_0", self.tier)
+        # O registro lido antes da sobrescrita não pode voltar para a memória.
+        with self.cache.lock:
+            self.assertEqual(self.cache._read_entry("key_0", time.time(), found), (None, None))
+        self.assertEqual(self.quiet_get("key_0"), "novo")
+
+    def test_put_pop_churn_does_not_leave_segments(self):
+        tier = DiskTier(max_disk_mb=1, segment_mb=0.01, write_buffer_kb=4)
+        for n in range(50):
+            tier.put(self.record(f"key_{n}"), b"x" * 6000)
+            self.assertIsNotNone(tier.pop(f"key_{n}"))
+        self.assertEqual(len(os.listdir(tier.directory)), 1)
+        stats = tier.stats()
+        self.assertEqual((stats['entries'], stats['segments']), (0, 1))
+        self.assertLessEqual(stats['disk_bytes'], tier.segment_bytes)
+        tier.close()
+
+    def test_budget_drops_lru_entries_and_empty_segments(self):
+        tier = DiskTier(max_disk_mb=0.01, segment_mb=0.004, write_buffer_kb=1)
+        for n in range(40):
+            tier.put(self.record(f"key_{n}"), b"x" * 1000)
+        stats = tier.stats()
+        self.assertLessEqual(stats['live_bytes'], tier.max_disk_bytes)
+        self.assertLessEqual(stats['disk_bytes'], 2 * tier.max_disk_bytes)
+        self.assertGreater(stats['dropped'], 0)
+        self.assertLess(stats['segments'], 10)
+        self.assertNotIn("key_0", tier)
+        self.assertEqual(tier.pop("key_39")[1], b"x" * 1000)
+        tier.close()
+        self.assertFalse(os.path.exists(tier.directory))
+
+    def test_dead_space_drops_only_the_oldest_segment_keys(self):
+        tier = DiskTier(max_disk_mb=0.01, segment_mb=0.004, write_buffer_kb=1)
+        dropped = []
+        tier.on_drop = dropped.append
+        # Cada segmento fica com uma chave viva e três versões mortas de "x".
+        for n in range(8):
+            tier.put(self.record(f"key_{n}"), b"k" * 1000)
+            for _ in range(3):
+                tier.put(self.record("x"), b"x" * 1000)
+        self.assertLessEqual(tier.stats()['disk_bytes'], 2 * tier.max_disk_bytes)
+        self.assertIn("key_0", dropped)
+        self.assertNotIn("key_0", tier)
+        self.assertNotIn("x", dropped)
+        self.assertEqual(tier.pop("key_7")[1], b"k" * 1000)
+        self.assertEqual(tier.pop("x")[1], b"x" * 1000)
+        tier.close()
+
+class TestSharedMemoryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SharedMemoryCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False)
+
+    def tearDown(self):
+        self.cache.unlink()
+
+    def run_in_child(self, action):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                action()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+    def test_put_and_get_values(self):
+        self.cache.put("texto", "tenis " * 1000)
+        self.cache.put("bytes", b"\x00\x01")
+        self.cache.put("objeto", {"id": 1, "tags": ["promo"]})
+        self.assertEqual(self.cache.get("texto"), "tenis " * 1000)
+        self.assertEqual(self.cache.get("bytes"), b"\x00\x01")
+        self.assertEqual(self.cache.get("objeto"), {"id": 1, "tags": ["promo"]})
+        self.assertIsNone(self.cache.get("ausente"))
+        self.assertEqual(len(self.cache), 3)
+        self.assertTrue(self.cache.delete("bytes"))
+        self.assertNotIn("bytes", self.cache)
+
+    def test_overwrite_returns_slabs(self):
+        free = self.cache.stats()['free_slabs']
+        self.cache.put(TEST_KEY, "x" * 3000)
+        self.cache.put(TEST_KEY, TEST_VALUE)
+        self.assertEqual(self.cache.get(TEST_KEY), TEST_VALUE)
+        self.assertEqual(self.cache.stats()['free_slabs'], free - 1)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_clock_evicts_unreferenced_entries_first(self):
+        self.cache.put("quente", "valor")
+        for n in range(5000):
+            self.cache.put(f"key_{n}", os.urandom(300))
+            self.cache.get("quente")
+        stats = self.cache.stats()
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(stats['entries'], len(self.cache))
+        self.assertEqual(self.cache.get("quente"), "valor")
+        self.assertEqual(self.cache.get("key_4999"), self.cache.get("key_4999"))
+
+    def test_policies(self):
+        with freeze_time("2025-01-01 12:00:00") as frozen:
+            self.cache.put("ttl", "v", CachePolicy().with_ttl(timedelta(seconds=5)))
+            self.cache.put("tti", "v", CachePolicy().with_tti(timedelta(seconds=5)))
+            self.cache.put("max", "v", CachePolicy().with_max_access(2))
+            frozen.tick(timedelta(seconds=4))
+            self.assertEqual(self.cache.get("tti"), "v")
+            self.assertEqual([self.cache.get("max") for _ in range(3)], ["v", "v", None])
+            frozen.tick(timedelta(seconds=2))
+            self.assertIsNone(self.cache.get("ttl"))
+            self.assertEqual(self.cache.get("tti"), "v")
+            self.cache.put("ttl", "v", CachePolicy().with_ttl(timedelta(seconds=1)))
+            frozen.tick(timedelta(seconds=6))
+            self.assertEqual(self.cache.expire_due_entries(time.time(), max_buckets=self.cache.buckets), 2)
+        self.assertEqual(len(self.cache), 0)
+        with self.assertRaises(ValueError):
+            self.cache.put("swr", "v", CachePolicy().with_stale_while_revalidate(timedelta(seconds=1)))
+
+    def test_processes_share_entries(self):
+        self.cache.put("do_pai", "1")
+        self.run_in_child(lambda: self.cache.put("do_filho", self.cache.get("do_pai") + "2"))
+        self.assertEqual(self.cache.get("do_filho"), "12")
+
+        other = SharedMemoryCache.attach(self.cache.name, start_monitor=False)
+        try:
+            other.put("pelo_nome", "3")
+            self.assertEqual(self.cache.get("pelo_nome"), "3")
+        finally:
+            other.close()
+
+    def test_single_leader_and_counters_of_dead_processes(self):
+        self.assertTrue(self.cache._try_lead())
+        read, write = os.pipe()
+
+        def child():
+            self.cache.get("ausente")
+            self.cache._publish_counters()
+            os.write(write, b"1" if self.cache._try_lead() else b"0")
+
+        self.run_in_child(child)
+        self.assertEqual(os.read(read, 1), b"0")
+        os.close(read)
+        os.close(write)
+        self.cache._collect_dead_processes()
+        stats = self.cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['processes'], 1)
+        self.assertEqual(stats['leader_pid'], os.getpid())
+
+    def test_instances_in_one_process_share_locks(self):
+        other = SharedMemoryCache.attach(self.cache.name, start_monitor=False)
+
+        def work(cache, offset):
+            for n in range(2000):
+                cache.put(f"key_{(n + offset) % 200}", "v")
+                cache.get(f"key_{n % 300}")
+
+        threads = [threading.Thread(target=work, args=(cache, n))
+                   for n, cache in enumerate((self.cache, other) * 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = other.stats()
+        self.assertEqual(stats['puts'], 8000)
+        self.assertEqual(stats['hits'] + stats['misses'], 8000)
+        self.assertEqual(stats['processes'], 1)
+        self.assertEqual(stats['entries'], 200)
+
+        self.assertTrue(self.cache._try_lead())
+        self.assertFalse(other._try_lead())
+        other.close()
+        # Fechar a outra instância não pode soltar os locks fcntl desta.
+        read, write = os.pipe()
+        self.run_in_child(lambda: os.write(write, b"1" if self.cache._try_lead() else b"0"))
+        self.assertEqual(os.read(read, 1), b"0")
+        os.close(read)
+        os.close(write)
+        self.assertEqual(self.cache.get("key_0"), "v")
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=0.01, compression_threshold_kb=1, start_monitor=False, metrics=True)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_finished_threads_are_folded(self):
+        metrics = CacheMetrics()
+
+        def tick():
+            metrics.incr('hits')
+            metrics.observe('monitor_tick', 0.001)
+
+        for _ in range(300):
+            thread = threading.Thread(target=tick)
+            thread.start()
+            thread.join()
+        self.assertLess(len(metrics._threads), 64)
+        stats = metrics.snapshot()
+        self.assertLessEqual(len(metrics._threads), 1)
+        self.assertEqual(stats['hits'], 300)
+        self.assertEqual(stats['latency']['monitor_tick']['count'], 300)
+
+    def test_disabled_by_default(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False)
+        cache.put(TEST_KEY, TEST_VALUE)
+        stats = cache.stats()
+        self.assertIsNone(cache.metrics)
+        self.assertNotIn('hits', stats)
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['memory_bytes'], cache.current_memory_usage)
+        cache.close()
+
+    def test_hits_misses_and_latency(self):
+        self.cache.put(TEST_KEY, TEST_VALUE)
+        self.cache.get(TEST_KEY)
+        self.cache.get("ausente")
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+        self.assertEqual(stats['latency']['get']['count'], 2)
+        self.assertEqual(stats['latency']['put']['count'], 1)
+        self.assertGreater(stats['latency']['lock_hold']['count'], 0)
+        self.assertEqual(stats['latency']['lock_wait']['count'], stats['latency']['lock_hold']['count'])
+
+    def test_evictions_and_expirations_by_reason(self):
+        with freeze_time("2025-01-01 12:00:00") as frozen:
+            self.cache.put("ttl", "v", CachePolicy().with_ttl(timedelta(seconds=1)))
+            self.cache.put("tti", "v", CachePolicy().with_tti(timedelta(seconds=1)))
+            frozen.tick(timedelta(seconds=2))
+            self.assertIsNone(self.cache.get("ttl"))
+            self.cache._expire_due_entries(time.time())
+        for n in range(20):
+            self.cache.put(f"key_{n}", f"{n}" * 300)
+        stats = self.cache.stats()
+        self.assertEqual(stats['expirations'], {'TTL': 1, 'TTI': 1})
+        self.assertGreater(stats['evictions']['lru'], 0)
+
+    def test_compression_counters(self):
+        self.cache.put("comprimivel", "tenis " * 500)
+        self.cache.put("aleatorio", generate_random_data(2))
+        stats = self.cache.stats()
+        self.assertEqual(stats['compressions'], 1)
+        self.assertGreater(stats['compression_bytes_saved'], 2000)
+
+    def test_predictive_hit_rate(self):
+        self.cache.prefetch_loader = lambda key: f"valor de {key}"
+        self.cache.configure_adaptive_behavior(100, True, 0.7)
+        self.cache.predictive_loader.enqueue_keys(["produto:1", "produto:2"])
+        self.cache.predictive_load()
+        self.cache.get("produto:1")
+        self.cache.get("produto:1")
+        self.cache.delete("produto:2")
+        stats = self.cache.stats()
+        self.assertEqual(stats['predictive_loads'], 2)
+        self.assertEqual(stats['predictive_hits'], 1)
+        self.assertEqual(stats['predictive_unused'], 1)
+        self.assertEqual(stats['predictive_hit_ratio'], 0.5)
+
+    def test_prometheus_text(self):
+        self.cache.put(TEST_KEY, TEST_VALUE)
+        self.cache.get(TEST_KEY)
+        for n in range(20):
+            self.cache.put(f"key_{n}", f"{n}" * 300)
+        text = self.cache.prometheus_text()
+        self.assertIn("# TYPE adaptive_cache_hits_total counter\nadaptive_cache_hits_total 1\n", text)
+        self.assertIn('adaptive_cache_evictions_total{reason="lru"}', text)
+        self.assertIn('adaptive_cache_get_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn(f"adaptive_cache_memory_bytes {self.cache.current_memory_usage}\n", text)
+
+    def test_sampled_latency_keeps_exact_counters(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False,
+                              metrics=CacheMetrics(sample_rate=0.1))
+        for n in range(200):
+            cache.put(f"key_{n}", n)
+            cache.get(f"key_{n}")
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 200)
+        self.assertLess(stats['latency']['get']['count'], 200)
+        self.assertEqual(stats['latency']['lock_wait']['count'], stats['latency']['lock_hold']['count'])
+        self.assertRaises(ValueError, CacheMetrics, 0)
+        cache.close()
+
+    def test_messages_go_to_logging(self):
+        with self.assertLogs('new_adaptive_cache', level='DEBUG') as logs:
+            self.cache.put("comprimivel", "tenis " * 500)
+        self.assertIn("Comprimindo chave 'comprimivel'", logs.output[0])
+
+    def test_sharded_stats_sum_shards(self):
+        sharded = ShardedAdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, shards=4, metrics=True)
+        try:
+            for n in range(10):
+                sharded.put(f"key_{n}", n)
+                sharded.get(f"key_{n}")
+            sharded.get("ausente")
+            stats = sharded.stats()
+            self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (10, 1, 10))
+            self.assertEqual(stats['latency']['get']['count'], 11)
+            self.assertIn("adaptive_cache_hits_total 10\n", sharded.prometheus_text())
+        finally:
+            sharded.close()
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_workloads_are_reproducible(self):
+        for name, generate in WORKLOADS.items():
+            self.assertEqual(generate(keys=500, accesses=2000), generate(keys=500, accesses=2000), name)
+        self.assertNotEqual(mixed_sizes(keys=500, accesses=2000, seed=1), mixed_sizes(keys=500, accesses=2000, seed=2))
+
+    def test_flash_sale_bursts_hit_promo_keys(self):
+        ops = flash_sale(keys=500, accesses=7000, bursts=3)
+        promo = [op for op in ops if op.key.startswith("promo:")]
+        self.assertGreater(len(promo), 2000)
+        self.assertTrue(any(op.op == 'put' for op in promo))
+        self.assertFalse(any(op.key.startswith("promo:") for op in ops[:1000]))
+
+    def test_mixed_sizes_straddle_threshold(self):
+        sizes = {op.size for op in mixed_sizes(keys=500, accesses=2000, threshold_kb=1)}
+        self.assertTrue(any(size < 1024 for size in sizes) and any(size > 1024 for size in sizes))
+
+    def test_recorder_round_trip(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False)
+        path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+        with TraceRecorder(cache, path) as recorder:
+            cache.get("a")
+            cache.put("a", "x" * 10)
+            cache.get("a")
+            cache.delete("a")
+        self.assertEqual(recorder.operations, 4)
+        self.assertNotIn('get', cache.__dict__)
+        self.assertEqual(load_trace(path), [Op('get', 'a', 10), Op('put', 'a', 10), Op('get', 'a', 10), Op('delete', 'a', 0)])
+        with open(path) as trace:
+            self.assertEqual([json.loads(line).get('hit') for line in trace], [False, None, True, None])
+        cache.close()
+
+    def test_replay_report(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False)
+        ops = [Op('get', 'a', 100), Op('get', 'a', 100), Op('get', 'b', 300), Op('get', 'b', 300)]
+        report = suite.replay(cache, ops, tick_every=2)
+        self.assertEqual(report['hit_ratio'], 0.5)
+        self.assertEqual(report['byte_hit_ratio'], 0.5)
+        self.assertEqual(report['entries'], 2)
+        self.assertIsNotNone(report['latency_us']['put']['p50'])
+        self.assertIsNotNone(report['monitor_pause_us']['max'])
+        cache.close()
+
+    def test_compare_flags_regressions(self):
+        def report(throughput, p99, hit_ratio):
+            return {'meta': {}, 'results': {'zipf': {'lru': {
+                'throughput': throughput, 'latency_us': {'get': {'p99': p99}}, 'hit_ratio': hit_ratio}}}}
+        base = report(1000, 10, 0.8)
+        self.assertFalse(suite.compare(base, report(950, 10.5, 0.8), 0.1)[0]['regression'])
+        self.assertTrue(suite.compare(base, report(800, 10, 0.8), 0.1)[0]['regression'])
+        self.assertTrue(suite.compare(base, report(1000, 10, 0.7), 0.1)[0]['regression'])
+
+    def test_compare_uses_the_median_p99_with_its_own_tolerance(self):
+        def report(p99, median_p99):
+            return {'meta': {}, 'results': {'zipf': {'lru': {
+                'throughput': 1000, 'latency_us': {'get': {'p99': p99}}, 'get_p99_median_us': median_p99,
+                'hit_ratio': 0.8}}}}
+        base = report(10, 10)
+        # O p99 da execução de vazão mediana é ignorado quando há a mediana das repetições.
+        self.assertFalse(suite.compare(base, report(30, 10), 0.1, 0.5)[0]['regression'])
+        self.assertFalse(suite.compare(base, report(10, 14), 0.1, 0.5)[0]['regression'])
+        self.assertTrue(suite.compare(base, report(10, 16), 0.1, 0.5)[0]['regression'])
+        self.assertTrue(suite.compare(base, report(10, 14), 0.1)[0]['regression'])
+
 class TestCachePolicy(unittest.TestCase):
     
     def test_with_ttl(self):
@@ -168,6 +1700,29 @@ class TestCachePolicy(unittest.TestCase):
         policy = CachePolicy().with_max_access(50)
         self.assertEqual(policy.max_access, 50)
     
+    def test_identical_policies_are_shared(self):
+        policy = CachePolicy().with_ttl(timedelta(seconds=10)).with_max_access(3)
+        self.assertIs(policy, CachePolicy(ttl=timedelta(seconds=10), max_access=3))
+        self.assertIs(CachePolicy(ttl=10), CachePolicy(ttl=timedelta(seconds=10)))
+        self.assertIsNot(policy.with_tti(timedelta(seconds=5)), policy)
+        self.assertIsNone(policy.tti)
+
+    def test_policy_is_immutable(self):
+        policy = CachePolicy().with_ttl(timedelta(seconds=10))
+        with self.assertRaises(AttributeError):
+            policy.ttl = timedelta(seconds=20)
+        self.assertIs(pickle.loads(pickle.dumps(policy)), policy)
+        self.assertRaises(ValueError, CachePolicy, ttl="10s")
+        self.assertRaises(ValueError, CachePolicy, max_access=2.5)
+
+    def test_policy_as_pydantic_field(self):
+        from pydantic import BaseModel
+
+        class Config(BaseModel):
+            policy: CachePolicy
+
+        self.assertIs(Config(policy={'ttl': 60, 'max_access': 3}).policy, CachePolicy(ttl=60, max_access=3))
+
     def test_is_expired_ttl(self):
         # Congela o tempo para testar a expiração
         with freeze_time("2025-01-01 12:00:00"):
@@ -191,6 +1746,278 @@ class TestCachePolicy(unittest.TestCase):
         with freeze_time("2025-01-01 12:01:01"):
             self.assertTrue(last_access_time + policy.tti < datetime.now())
 
+class TestInvalidation(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024, start_monitor=False,
+                                   debug_accounting=True)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_prefix_index_matches_a_sorted_scan(self):
+        index, keys = PrefixIndex(load=4), set()
+        rng = random.Random(7)
+        for _ in range(2000):
+            key = f"{rng.choice('abc')}:{rng.randrange(300)}"
+            if rng.random() < 0.7:
+                index.add(key)
+                keys.add(key)
+            else:
+                index.discard(key)
+                keys.discard(key)
+        self.assertEqual(list(index), sorted(keys))
+        self.assertEqual(len(index), len(keys))
+        self.assertEqual(list(PrefixIndex(keys, load=4)), sorted(keys))
+        for prefix in ('a:', 'b:1', 'c:29', 'd', ''):
+            self.assertEqual(index.with_prefix(prefix), sorted(k for k in keys if k.startswith(prefix)))
+
+    def test_tag_index_replaces_tags(self):
+        index = TagIndex()
+        index.set("k", ["a", "b", "a"])
+        index.set("k", "c")
+        self.assertEqual(index.tags("k"), ("c",))
+        self.assertEqual(index.keys("a"), [])
+        index.discard("k")
+        self.assertEqual(len(index), 0)
+
+    def test_invalidate_tag(self):
+        self.cache.put("product:1", "tenis", tags=["category:shoes", "brand:x"])
+        self.cache.put("product:2", "meia", tags=["category:socks", "brand:x"])
+        self.cache.put("product:3", "bota", tags="category:shoes")
+        self.assertEqual(self.cache.invalidate_tag("category:shoes"), 2)
+        self.assertEqual(list(self.cache.cache_data), ["product:2"])
+        self.assertEqual(self.cache.invalidate_tag("category:shoes"), 0)
+        self.assertEqual(self.cache.invalidate_tag("brand:x"), 1)
+        self.assertEqual(len(self.cache.tag_index), 0)
+
+    def test_put_without_tags_clears_them_and_refresh_keeps_them(self):
+        self.cache.put("a", 1, tags=["t"])
+        self.assertTrue(self.cache.refresh_policy("a", CachePolicy(ttl=60)))
+        self.assertEqual(self.cache.tag_index.tags("a"), ("t",))
+        self.cache.put("a", 2)
+        self.assertEqual(self.cache.invalidate_tag("t"), 0)
+        self.assertEqual(self.cache.get("a"), 2)
+
+    def test_invalidate_prefix(self):
+        for key in ("user:42:profile", "user:42:cart", "user:421:profile", "product:42"):
+            self.cache.put(key, key)
+        self.assertEqual(self.cache.invalidate_prefix("user:42:"), 2)
+        self.assertEqual(sorted(self.cache.cache_data), ["product:42", "user:421:profile"])
+        self.assertEqual(list(self.cache.prefix_index), ["product:42", "user:421:profile"])
+        self.assertEqual(self.cache.verify_memory_accounting(), self.cache.current_memory_usage)
+
+    def test_removed_keys_leave_the_indexes(self):
+        cache = AdaptiveCache(max_memory_mb=0.005, compression_threshold_kb=1024, start_monitor=False)
+        self.assertEqual(cache.invalidate_prefix("nada:"), 0)  # monta o índice de prefixos
+        cache.put("expira", "x", policy=CachePolicy(ttl=5), tags="t")
+        cache.put("apagada", "x", tags="t")
+        cache.delete("apagada")
+        cache.cache_data["expira"].creation_time -= 6
+        self.assertIsNone(cache.get("expira"))
+        for n in range(20):
+            cache.put(f"key_{n}", "y" * 1000, tags="t")
+        self.assertEqual(sorted(cache.prefix_index), sorted(cache.cache_data))
+        self.assertEqual(sorted(cache.tag_index.keys("t")), sorted(cache.cache_data))
+        remaining = len(cache.cache_data)
+        self.assertEqual(cache.invalidate_tag("t"), remaining)
+        self.assertEqual(len(cache.cache_data), 0)
+        cache.close()
+
+    def test_invalidation_reaches_the_disk_tier(self):
+        tier = DiskTier(max_disk_mb=1, segment_mb=0.01, write_buffer_kb=4)
+        cache = AdaptiveCache(max_memory_mb=0.005, compression_threshold_kb=1024, start_monitor=False,
+                              disk_tier=tier, metrics=True)
+        for n in range(10):
+            cache.put(f"user:{n}", "x" * 900, tags=f"group:{n % 2}")
+        self.assertIn("user:0", tier)
+        self.assertEqual(cache.invalidate_tag("group:0"), 5)
+        self.assertEqual(cache.invalidate_prefix("user:"), 5)
+        self.assertEqual(len(tier), 0)
+        self.assertEqual(len(cache.cache_data), 0)
+        self.assertEqual(cache.stats()['invalidations'], {'tag': 5, 'prefix': 5})
+        cache.close()
+
+    def test_disk_drops_leave_the_indexes(self):
+        tier = DiskTier(max_disk_mb=0.002, segment_mb=0.01, write_buffer_kb=4)
+        cache = AdaptiveCache(max_memory_mb=0.005, compression_threshold_kb=1024, start_monitor=False,
+                              disk_tier=tier)
+        cache.invalidate_prefix("nada:")
+        for n in range(10):
+            cache.put(f"user:{n}", "x" * 900, tags="t")
+        self.assertGreater(tier.stats()['dropped'], 0)
+        indexed = set(cache.cache_data) | set(tier.keys())
+        self.assertEqual(set(cache.prefix_index), indexed)
+        self.assertEqual(set(cache.tag_index.keys("t")), indexed)
+        cache.close()
+
+    def test_namespace_quota_evicts_within_namespace(self):
+        cache = AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024, start_monitor=False,
+                              namespace_quotas={'search': 0.005}, debug_accounting=True)
+        cache.put("user:1", "u" * 1000)
+        for n in range(10):
+            cache.put(f"search:{n}", "s" * 1000)
+        stats = cache.stats()['namespaces']['search']
+        self.assertLessEqual(stats['memory_bytes'], stats['quota_bytes'])
+        self.assertLess(stats['entries'], 10)
+        self.assertIn("search:9", cache.cache_data)
+        self.assertNotIn("search:0", cache.cache_data)
+        self.assertIn("user:1", cache.cache_data)
+        self.assertEqual(stats['memory_bytes'],
+                         sum(info.size for key, info in cache.cache_data.items() if key.startswith("search:")))
+        cache.delete("search:9")
+        self.assertEqual(cache.namespace_stats()['search']['entries'], stats['entries'] - 1)
+        cache.close()
+
+    def test_sharded_invalidation_and_quotas(self):
+        cache = ShardedAdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024, shards=4, start_monitor=False,
+                                     namespace_quotas={'search': 0.4})
+        try:
+            cache.put_many({f"product:{n}": n for n in range(40)}, tags=["catalog"])
+            cache.put("product:extra", "x", tags="promo")
+            self.assertEqual(cache.shards[0].namespace_quotas['search'], int(0.1 * 1024 * 1024))
+            self.assertEqual(cache.invalidate_prefix("product:1"), 11)
+            self.assertEqual(cache.invalidate_tag("catalog"), 29)
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(cache.stats()['namespaces']['search']['entries'], 0)
+        finally:
+            cache.close()
+
+
+class TestCluster(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [CacheNode(cache=AdaptiveCache(max_memory_mb=1, compression_threshold_kb=1, start_monitor=False)).start()
+                      for _ in range(3)]
+        self.client = ClusterClient([node.address for node in self.nodes], start_monitor=False)
+
+    def tearDown(self):
+        self.client.close()
+        for node in self.nodes:
+            node.close()
+
+    def node_for(self, key):
+        return next(node for node in self.nodes if node.address == self.client.ring.node_for(key))
+
+    def test_hash_ring_balances_and_moves_few_keys(self):
+        keys = [f"key:{n}" for n in range(20000)]
+        ring = HashRing([f"node{n}" for n in range(4)])
+        before = {key: ring.node_for(key) for key in keys}
+        counts = {node: list(before.values()).count(node) for node in ring.nodes}
+        self.assertLess(max(counts.values()) / min(counts.values()), 1.5)
+        ring.add("node4")
+        moved = [key for key in keys if ring.node_for(key) != before[key]]
+        self.assertTrue(all(ring.node_for(key) == "node4" for key in moved))
+        self.assertLess(len(moved) / len(keys), 0.3)
+        ring.remove("node4")
+        self.assertEqual({key: ring.node_for(key) for key in keys}, before)
+        replicas = ring.nodes_for("key:1", 3)
+        self.assertEqual(len(set(replicas)), 3)
+        self.assertEqual(replicas[0], ring.node_for("key:1"))
+
+    def test_get_put_delete_through_owner(self):
+        values = {"texto": "tenis " * 500, "binario": b"\x00\x01"}
+        for key, value in values.items():
+            self.client.put(key, value)
+        for key, value in values.items():
+            self.assertEqual(self.client.get(key), value)
+            self.assertIn(key, self.node_for(key).cache.cache_data)
+        self.assertTrue(self.client.delete("texto"))
+        self.assertFalse(self.client.delete("texto"))
+        self.assertIsNone(self.client.get("texto"))
+
+    def test_pickle_is_refused_unless_both_sides_opt_in(self):
+        with self.assertRaises(TypeError):
+            self.client.put("objeto", {"preco": 10})
+        frame = cluster._put_frame("objeto", {"preco": 10}, None, None, allow_pickle=True)
+        with self.assertRaises(RuntimeError):
+            self.client._call(self.client.ring.node_for("objeto"), [frame])
+        self.assertNotIn("objeto", self.node_for("objeto").cache.cache_data)
+        self.node_for("nativo").cache.put("nativo", {"preco": 1})
+        with self.assertRaises(RuntimeError):
+            self.client.get("nativo")
+
+        with CacheNode(max_memory_mb=1, start_monitor=False, allow_pickle=True) as node:
+            with ClusterClient([node.address], allow_pickle=True) as client:
+                client.put("objeto", {"preco": 10})
+                self.assertEqual(client.get("objeto"), {"preco": 10})
+
+    def test_oversized_key_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.client.put("k" * 70000, "v")
+        with self.assertRaises(ValueError):
+            self.client.get_many(["k" * 70000])
+
+    def test_policy_and_tags_travel_with_the_put(self):
+        self.client.put("promo:1", "x", policy=CachePolicy(ttl=5), tags=["promo"])
+        self.client.put("promo:2", "y", tags="promo")
+        cache = self.node_for("promo:1").cache
+        self.assertEqual(cache.cache_data["promo:1"].policy.ttl_seconds, 5)
+        cache.cache_data["promo:1"].creation_time -= 6
+        self.assertIsNone(self.client.get("promo:1"))
+        self.assertEqual(self.client.invalidate_tag("promo"), 1)
+        self.client.put_many({f"user:{n}": str(n) for n in range(10)})
+        self.assertEqual(self.client.invalidate_prefix("user:"), 10)
+
+    def test_pipelined_get_many_and_put_many(self):
+        self.client.pipeline_depth = 16
+        self.client.put_many({f"key:{n}": str(n) for n in range(300)})
+        self.assertEqual(sum(len(node.cache.cache_data) for node in self.nodes), 300)
+        self.assertTrue(all(node.cache.cache_data for node in self.nodes))
+        keys = [f"key:{n}" for n in range(320)]
+        self.assertEqual(self.client.get_many(keys), {f"key:{n}": str(n) for n in range(300)})
+
+    def test_connections_are_pooled(self):
+        for n in range(50):
+            self.client.put(f"key:{n}", str(n))
+            self.client.get(f"key:{n}")
+        self.assertTrue(all(len(pool._idle) <= 1 for pool in self.client.pools.values()))
+        self.assertEqual(sum(node.cache.stats()['entries'] for node in self.nodes), 50)
+
+    def test_node_errors_raise(self):
+        with self.assertRaises(RuntimeError):
+            self.client._call(self.nodes[0].address, [b"\xff\x00\x00\x00\x00\x00\x00"])
+        self.assertEqual(self.client.get("ausente"), None)
+
+    def test_unix_socket_node(self):
+        path = os.path.join(tempfile.mkdtemp(), "node.sock")
+        with CacheNode(path, max_memory_mb=1, start_monitor=False) as node:
+            with ClusterClient([path]) as client:
+                client.put("a", "b")
+                self.assertEqual(client.get("a"), "b")
+                self.assertEqual(list(client.stats()), [path])
+        self.assertFalse(os.path.exists(path))
+
+    def test_hot_keys_are_replicated_and_dropped_when_cold(self):
+        client = ClusterClient([node.address for node in self.nodes], replicate_hot=True, replicas=2,
+                               start_monitor=False)
+        for node in self.nodes:
+            node.cache.hot_key_threshold = 5
+        client.put("promo:tenis", "tenis", policy=CachePolicy(ttl=60), tags="promo")
+        for _ in range(10):
+            self.assertEqual(client.get("promo:tenis"), "tenis")
+        self.assertEqual(client.refresh_hot_keys(), {"promo:tenis"})
+        owner, replica = [next(node for node in self.nodes if node.address == address)
+                          for address in client.ring.nodes_for("promo:tenis", 2)]
+        copy = replica.cache.cache_data["promo:tenis"]
+        self.assertEqual(copy.creation_time, owner.cache.cache_data["promo:tenis"].creation_time)
+        self.assertEqual(copy.policy.ttl_seconds, 60)
+        self.assertEqual(replica.cache.tag_index.tags("promo:tenis"), ("promo",))
+
+        client.put("promo:tenis", "tenis 2")
+        self.assertEqual(replica.cache.get("promo:tenis"), "tenis 2")
+        self.assertEqual({client.get("promo:tenis") for _ in range(20)}, {"tenis 2"})
+
+        for node in self.nodes:
+            node.cache.hot_key_threshold = 10 ** 6
+        client.refresh_hot_keys()
+        self.assertNotIn("promo:tenis", client.hot_keys)
+        self.assertNotIn("promo:tenis", replica.cache.cache_data)
+        self.assertEqual(client.get("promo:tenis"), "tenis 2")
+        self.assertTrue(client.delete("promo:tenis"))
+        client.close()
+
+
 class TestBatchOperation(unittest.TestCase):
     
     def setUp(self):
@@ -211,6 +2038,54 @@ class TestBatchOperation(unittest.TestCase):
             batch.put("batch_key1", "new_value")
             
         self.assertEqual(self.cache.get("batch_key1"), "new_value")
+
+    def test_batch_returns_results_in_order(self):
+        self.cache.put("batch_key1", "value1")
+        policy = CachePolicy().with_ttl(timedelta(seconds=30))
+        with self.cache.batch_operation() as batch:
+            batch.get("batch_key1")
+            batch.put("batch_key2", "value2")
+            batch.get("batch_key2")
+            batch.refresh("batch_key1", policy)
+            batch.delete("batch_key1")
+            batch.delete("batch_key1")
+            batch.get("batch_key1")
+        self.assertEqual(batch.results, ["value1", None, "value2", True, True, False, None])
+        self.assertNotIn("batch_key1", self.cache.cache_data)
+
+    def test_get_put_delete_many(self):
+        value = "tenis " * 2000
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            self.cache.put_many({"key_tenis": value, "key_meia": "meia"})
+        self.assertTrue(self.cache.cache_data["key_tenis"].compressed)
+        self.assertEqual(self.cache.get_many(["key_tenis", "key_meia", "key_vazia"]),
+                         {"key_tenis": value, "key_meia": "meia"})
+        self.assertEqual(self.cache.delete_many(["key_tenis", "key_vazia"]), 1)
+        self.assertEqual(list(self.cache.cache_data), ["key_meia"])
+        self.assertEqual(self.cache.verify_memory_accounting(), self.cache.current_memory_usage)
+
+    def test_put_many_evicts_once_within_budget(self):
+        cache = AdaptiveCache(max_memory_mb=0.01, compression_threshold_kb=1024, start_monitor=False)
+        cache.put("antiga", "x" * 100)
+        evictions = []
+        evict = cache._evict_until_fits
+        cache._evict_until_fits = lambda size: (evictions.append(size), evict(size))
+        cache.put_many((f"key_{n}", "y" * 1000) for n in range(20))
+        self.assertEqual(evictions, [0])
+        self.assertLessEqual(cache.current_memory_usage, cache.max_memory_mb)
+        self.assertNotIn("antiga", cache.cache_data)
+        self.assertIn("key_19", cache.cache_data)
+
+    def test_sharded_batch_keeps_operation_order(self):
+        cache = ShardedAdaptiveCache(max_memory_mb=1, compression_threshold_kb=1024, shards=4)
+        try:
+            cache.put_many((f"key_{n}", n) for n in range(50))
+            keys = [f"key_{n}" for n in range(60)]
+            self.assertEqual(cache.get_many(keys), {f"key_{n}": n for n in range(50)})
+            self.assertEqual(cache.delete_many(keys), 50)
+            self.assertEqual(len(cache), 0)
+        finally:
+            cache.close()
         
 if __name__ == '__main__':
     unittest.main()